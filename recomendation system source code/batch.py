@@ -0,0 +1,175 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+import zlib
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+from favorites import close_shared
+from main import Catalogue
+from metrics import log_to_stderr
+from server import EXPORT_DIR, ChatServer, SessionManager
+
+DEFAULT_SESSION = "batch"
+# Requests travel to workers, and replies back, in chunks of this many lines.
+CHUNK = 256
+# Unsent chunks allowed per worker before the reader waits (bounds memory).
+QUEUE_DEPTH = 8
+
+
+def read_requests(lines: Iterable[str]) -> Iterator[tuple]:
+    """``(seq, session, message)`` per non-blank line; message is None if the line is malformed.
+
+    A line is either plain text for the default session or a JSON object
+    ``{"session": id, "message": text}``, as the server accepts.
+    """
+    for seq, line in enumerate(lines, 1):
+        text = line.strip()
+        if text:
+            yield (seq,) + ChatServer.parse_request(text, DEFAULT_SESSION)
+
+
+def run_request(manager: SessionManager, seq: int, session: str, message: Optional[str]) -> dict:
+    if message is None:
+        return {"seq": seq, "session": session, "error": "Expected a text line or {\"session\": ..., \"message\": ...}"}
+    start = time.perf_counter()
+    try:
+        reply = manager.handle(session, message)
+    except Exception as e:
+        return {"seq": seq, "session": session, "message": message, "error": f"{type(e).__name__}: {e}"}
+    bot = manager.get(session)
+    return {
+        "seq": seq,
+        "session": session,
+        "message": message,
+        "reply": reply,
+        "ms": round((time.perf_counter() - start) * 1000, 3),
+        "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in bot.timings.items()},
+    }
+
+
+def _worker(catalogue: Optional[Catalogue], data_file: str, use_snapshot: bool, max_sessions: int, export_dir: str, inbox, outbox):
+    try:
+        catalogue = catalogue or Catalogue.load(data_file, use_snapshot=use_snapshot)
+        manager = SessionManager(catalogue, max_sessions=max_sessions, export_dir=export_dir)
+        while True:
+            chunk = inbox.get()
+            if chunk is None:
+                break
+            outbox.put([run_request(manager, *request) for request in chunk])
+    finally:
+        # Worker processes skip atexit, so favorites written behind are flushed here.
+        close_shared()
+        outbox.put(None)
+
+
+class BatchRunner:
+    """Runs a stream of requests against one catalogue and streams the replies.
+
+    With ``workers`` > 0, each session is pinned to one worker process (by a
+    hash of its id), so a session's commands still run in order while
+    different sessions run in parallel. Replies are written as JSON lines as
+    soon as their chunk finishes; ``seq`` gives the input line, since
+    replies from different sessions may interleave.
+    """
+
+    def __init__(
+        self, data_file="properties.csv", use_snapshot=True, workers: int = 0, max_sessions: int = 100000, export_dir=EXPORT_DIR
+    ):
+        self.data_file = data_file
+        self.use_snapshot = use_snapshot
+        self.workers = workers
+        self.max_sessions = max_sessions
+        self.export_dir = export_dir
+        self.count = 0
+
+    def run(self, lines: Iterable[str], out: TextIO) -> int:
+        requests = read_requests(lines)
+        if self.workers <= 0:
+            catalogue = Catalogue.load(self.data_file, self.use_snapshot)
+            manager = SessionManager(catalogue, max_sessions=self.max_sessions, export_dir=self.export_dir)
+            for request in requests:
+                self._write(out, [run_request(manager, *request)])
+        else:
+            self._run_parallel(requests, out)
+        return self.count
+
+    def _run_parallel(self, requests: Iterator[tuple], out: TextIO):
+        context = multiprocessing.get_context()
+        # Forked workers inherit the parent's catalogue pages instead of loading
+        # their own copy; other start methods would pickle it, so they load.
+        catalogue = Catalogue.load(self.data_file, self.use_snapshot) if context.get_start_method() == "fork" else None
+        outbox = context.Queue()
+        inboxes = [context.Queue(QUEUE_DEPTH) for _ in range(self.workers)]
+        processes = [
+            context.Process(
+                target=_worker,
+                args=(catalogue, self.data_file, self.use_snapshot, self.max_sessions, self.export_dir, inbox, outbox),
+                daemon=True,
+            )
+            for inbox in inboxes
+        ]
+        for process in processes:
+            process.start()
+        writer = threading.Thread(target=self._drain, args=(outbox, out, len(processes)))
+        writer.start()
+        try:
+            pending: List[list] = [[] for _ in inboxes]
+            for request in requests:
+                i = zlib.crc32(request[1].encode("utf-8")) % len(inboxes)
+                pending[i].append(request)
+                if len(pending[i]) >= CHUNK:
+                    inboxes[i].put(pending[i])
+                    pending[i] = []
+            for inbox, chunk in zip(inboxes, pending):
+                if chunk:
+                    inbox.put(chunk)
+        finally:
+            for inbox in inboxes:
+                inbox.put(None)
+            writer.join()
+            for process in processes:
+                process.join()
+
+    def _drain(self, outbox, out: TextIO, producers: int):
+        while producers:
+            replies = outbox.get()
+            if replies is None:
+                producers -= 1
+                continue
+            self._write(out, replies)
+
+    def _write(self, out: TextIO, replies: List[dict]):
+        out.writelines(json.dumps(reply, ensure_ascii=False) + "\n" for reply in replies)
+        out.flush()
+        self.count += len(replies)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Run chatbot commands from a file or stdin and print JSON lines.")
+    parser.add_argument("input", nargs="?", default="-", help="file of commands, one per line (default: stdin)")
+    parser.add_argument("--data", default="properties.csv", help="catalogue file, directory or glob")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes; 0 runs everything in this process")
+    parser.add_argument("--max-sessions", type=int, default=100000, help="sessions kept per worker")
+    parser.add_argument("--export-dir", default=EXPORT_DIR, help="directory exports are written to")
+    parser.add_argument("--no-snapshot", action="store_true", help="always parse the source file")
+    args = parser.parse_args(argv)
+    # Slow-request warnings go to stderr; stdout is the JSON lines only.
+    log_to_stderr()
+
+    runner = BatchRunner(args.data, not args.no_snapshot, args.workers, args.max_sessions, args.export_dir)
+    start = time.perf_counter()
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        count = runner.run(source, sys.stdout)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    elapsed = time.perf_counter() - start
+    print(f"{count} commands in {elapsed:.2f}s ({count / elapsed if elapsed else 0:,.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
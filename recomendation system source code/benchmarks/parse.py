@@ -0,0 +1,38 @@
+import argparse
+import timeit
+
+from commands import parse_command
+
+MESSAGES = [
+    "list",
+    "next",
+    "sort by price descending",
+    "details 3",
+    "compare 1 and 2",
+    "favorite 4",
+    "remove 2 from favorites",
+    "user alice",
+    "filter zayed apartment price under 2000000",
+    "filter new cairo area between 100 and 200 bedrooms at least 3",
+    "find cairo apartment bathrooms at least 2 bedrooms over 2 price from 1,000,000 to 3,500,000",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parse_command cost per message.")
+    parser.add_argument("--number", type=int, default=20000, help="parses per message per repeat")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    total = 0.0
+    print(f"{'message':<95} {'us/parse':>9}")
+    for message in MESSAGES:
+        best = min(timeit.repeat(lambda: parse_command(message), number=args.number, repeat=args.repeat))
+        per_call = best / args.number * 1e6
+        total += per_call
+        print(f"{message:<95} {per_call:>9.2f}")
+    print(f"{'mean':<95} {total / len(MESSAGES):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import time
+
+import numpy as np
+
+from main import DataLoader
+from similarity import SimilarityIndex, brute_force_similar
+from store import CATEGORY_FIELDS, PropertyStore
+
+
+def tiled_store(source: PropertyStore, rows: int, seed: int = 0) -> PropertyStore:
+    """Repeat ``source`` up to ``rows`` rows, jittering price and area so rows stay distinct."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, source.n_rows, rows)
+    columns = {f: [source.value_at(int(r), f) for r in picks] for f in CATEGORY_FIELDS}
+    columns["price"] = source.column("price")[picks] * rng.uniform(0.8, 1.2, rows)
+    columns["area"] = source.column("area")[picks] * rng.uniform(0.9, 1.1, rows)
+    columns["bedrooms"] = source.column("bedrooms")[picks]
+    columns["bathrooms"] = source.column("bathrooms")[picks]
+    store = PropertyStore(capacity=rows)
+    store.append_columns([f"row_{i}" for i in range(rows)], columns)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SimilarityIndex lookups against a brute-force scan.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    store = tiled_store(DataLoader.load_properties("properties.csv"), args.rows)
+    start = time.perf_counter()
+    index = SimilarityIndex(store)
+    print(f"index build: {time.perf_counter() - start:.3f}s for {args.rows} rows")
+
+    targets = np.random.default_rng(1).integers(0, store.n_rows, args.queries)
+    start = time.perf_counter()
+    indexed = [index.similar(int(r), args.k) for r in targets]
+    index_time = (time.perf_counter() - start) / args.queries
+    brute_queries = targets[: max(1, args.queries // 10)]
+    start = time.perf_counter()
+    brute = [brute_force_similar(store, index.encoder, int(r), args.k) for r in brute_queries]
+    brute_time = (time.perf_counter() - start) / len(brute_queries)
+    agree = np.mean([np.allclose(a[1], b[1]) for a, b in zip(indexed, brute)])
+    print(f"indexed lookup: {index_time * 1e3:.3f} ms/query")
+    print(f"brute force:    {brute_time * 1e3:.3f} ms/query ({brute_time / index_time:.0f}x slower)")
+    print(f"same neighbour distances as brute force: {agree:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from benchmarks.synthetic import parse_size, write_synthetic_csv
+from commands import parse_command
+from export import export_rows
+from main import Catalogue, DataLoader, RealEstateChatbot
+from results import ResultSet
+from scoring import top_matches
+from snapshot import load_snapshot, write_snapshot
+from sorting import SortOrders
+
+SIZES = "1k,100k"
+SELECTIVITIES = (0.001, 0.01, 0.1, 0.5)
+QUIZ_ANSWERS = ["3000000", "3+", "cairo, zayed", "New", "Area size", "Apartment", "Pool", "Living"]
+# A benchmark whose median time grows by more than this share counts as a regression.
+REGRESSION_THRESHOLD = 0.2
+
+
+class Runner:
+    """Times each case, optionally re-runs it once under tracemalloc for peak memory."""
+
+    def __init__(self, repeat: int = 5, memory: bool = True):
+        self.repeat = repeat
+        self.memory = memory
+        self.results: Dict[str, dict] = {}
+
+    def measure(self, name: str, func: Callable, rows: Optional[int] = None, repeat: Optional[int] = None, setup=None):
+        times = []
+        for _ in range(repeat or self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        entry = {"seconds": statistics.median(times), "best": min(times)}
+        if rows:
+            entry["rows"] = rows
+            entry["rows_per_s"] = rows / entry["seconds"] if entry["seconds"] else float("inf")
+        if self.memory:
+            if setup:
+                setup()
+            tracemalloc.start()
+            func()
+            entry["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        self.results[name] = entry
+        print(format_row(name, entry), flush=True)
+        return entry
+
+
+def format_row(name: str, entry: dict) -> str:
+    throughput = f"{entry['rows_per_s']:>14,.0f}" if "rows_per_s" in entry else f"{'':>14}"
+    peak = f"{entry['peak_mb']:>9.1f}" if "peak_mb" in entry else f"{'':>9}"
+    return f"{name:<40} {entry['seconds'] * 1e3:>11.3f} {throughput} {peak}"
+
+
+def run_size(runner: Runner, rows: int, label: str, workdir: str):
+    prefix = f"{label}/"
+    path = write_synthetic_csv(os.path.join(workdir, f"catalogue_{label}.csv"), rows)
+    heavy = 1 if rows >= 1000000 else None
+
+    store = DataLoader.load_properties(path, use_snapshot=False)
+    runner.measure(prefix + "load/csv", lambda: DataLoader.load_properties(path, use_snapshot=False), rows, heavy)
+    runner.measure(prefix + "load/snapshot_write", lambda: write_snapshot(store, path), rows, heavy)
+    runner.measure(prefix + "load/snapshot", lambda: load_snapshot(path), rows)
+
+    price = store.column("price")
+    for selectivity in SELECTIVITIES:
+        query = parse_command(f"filter price under {int(np.quantile(price, selectivity))}").query()
+        runner.measure(prefix + f"filter/price_{selectivity:g}", lambda: query.evaluate(store), rows)
+    combined = parse_command("filter cairo apartment bedrooms at least 3 price under 5000000").query()
+    runner.measure(prefix + "filter/combined", lambda: combined.evaluate(store), rows)
+    catalogue = Catalogue(store)
+    catalogue.query_cache.evaluate(combined, store)
+    runner.measure(prefix + "filter/cached", lambda: catalogue.query_cache.evaluate(combined, store), rows)
+
+    tenth = parse_command(f"filter price under {int(np.quantile(price, 0.1))}").query().evaluate(store)
+    orders = SortOrders(store)
+    for name, spec in (("price", [("price", False)]), ("multi", [("bedrooms", True), ("price", False)])):
+        fresh = {}
+        runner.measure(
+            prefix + f"sort/{name}_cold",
+            lambda: fresh["orders"].sort(ResultSet(tenth), spec).window(0, 10),
+            len(tenth),
+            setup=lambda: fresh.update(orders=SortOrders(store)),
+        )
+        orders.order(spec)
+        runner.measure(prefix + f"sort/{name}_warm", lambda: orders.sort(ResultSet(tenth), spec).window(0, 10), len(tenth))
+
+    bot = RealEstateChatbot(catalogue=catalogue)
+    bot.process_input("list")
+    bot.process_input("sort by bedrooms desc then price")
+    pages = max(1, -(-len(bot.last_results) // bot.page_size))
+    for name, page in (("first", 0), ("middle", pages // 2), ("last", pages - 1)):
+        def show(page=page):
+            bot.page = page
+            return bot.show_page()
+
+        runner.measure(prefix + f"page/{name}", show)
+
+    runner.measure(prefix + "quiz/top_matches", lambda: top_matches(store, QUIZ_ANSWERS), rows)
+
+    for suffix in ("csv", "jsonl.gz"):
+        out = os.path.join(workdir, f"export_{label}.{suffix}")
+        runner.measure(prefix + f"export/{suffix}", lambda: export_rows(store, tenth, out), len(tenth), heavy)
+
+
+def compare(results: Dict[str, dict], baseline_path: str, threshold: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    print(f"\n{'benchmark':<40} {'baseline ms':>11} {'now ms':>11} {'change':>8}")
+    for name, entry in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        change = entry["seconds"] / old["seconds"] - 1 if old["seconds"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<40} {old['seconds'] * 1e3:>11.3f} {entry['seconds'] * 1e3:>11.3f} {change:>+8.0%}{flag}")
+    print(f"{regressions} regression(s) over {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark load, filter, sort, paging, quiz and export on synthetic catalogues.")
+    parser.add_argument("--sizes", default=SIZES, help="comma-separated catalogue sizes, e.g. 1k,100k,1m")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (the median is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--save", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="compare against results saved earlier with --save")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    runner = Runner(repeat=args.repeat, memory=not args.no_memory)
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    print(f"{'benchmark':<40} {'median ms':>11} {'rows/s':>14} {'peak MB':>9}")
+    try:
+        for label in args.sizes.split(","):
+            run_size(runner, parse_size(label), label.strip().lower(), workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        meta = {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": runner.results}, f, indent=2)
+        print(f"saved results to {args.save}")
+    if args.compare and compare(runner.results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
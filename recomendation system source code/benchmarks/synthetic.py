@@ -0,0 +1,119 @@
+import argparse
+import csv
+from typing import Dict, Iterator
+
+import numpy as np
+
+from store import FIELDS, PropertyStore
+
+# Cities with a relative listing share and a price-per-m2 level (EGP).
+CITIES = {
+    "New Cairo - El Tagamoa": (0.30, 22000),
+    "Sheikh Zayed": (0.15, 20000),
+    "6th of October": (0.15, 14000),
+    "Madinaty": (0.10, 16000),
+    "New Capital City": (0.10, 15000),
+    "Rehab City": (0.08, 17000),
+    "Maadi": (0.07, 25000),
+    "Badr City": (0.05, 7000),
+}
+TYPES = {"Apartment": 0.70, "Duplex": 0.12, "Penthouse": 0.06, "Studio": 0.07, "Villa": 0.05}
+FURNISHED = {"No": 0.6, "Yes": 0.15, "Unknown": 0.25}
+LEVELS = ["Ground", "1", "2", "3", "4", "5", "6", "7", "8", "10+", "Highest"]
+PAYMENT_OPTIONS = {"Cash": 0.2, "Installment": 0.3, "Cash or Installment": 0.4, "Unknown Payment": 0.1}
+DELIVERY_DATES = {"Ready to move": 0.35, "soon": 0.05, "within 6 months": 0.05, "2025": 0.2, "2026": 0.2, "2027": 0.1, "Unknown": 0.05}
+DELIVERY_TERMS = {"Finished": 0.35, "Semi Finished": 0.25, "Core & Shell": 0.15, "Not Finished": 0.15, "Unknown": 0.1}
+COMPOUNDS_PER_CITY = 40
+CHUNK = 100000
+
+
+def _choose(rng, names, weights, n: int) -> np.ndarray:
+    weights = np.asarray(weights, dtype=np.float64)
+    return rng.choice(len(names), n, p=weights / weights.sum())
+
+
+def _pick(rng, table: Dict[str, float], n: int) -> np.ndarray:
+    return np.array(list(table), dtype=object)[_choose(rng, table, list(table.values()), n)]
+
+
+def synthetic_columns(rows: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Columns for ``rows`` plausible listings; the same seed gives the same catalogue."""
+    rng = np.random.default_rng(seed)
+    city_codes = _choose(rng, CITIES, [share for share, _ in CITIES.values()], rows)
+    city = np.array(list(CITIES), dtype=object)[city_codes]
+    level_per_m2 = np.array([per_m2 for _, per_m2 in CITIES.values()], dtype=np.float64)
+    kind = _pick(rng, TYPES, rows)
+    area = np.round(rng.lognormal(np.log(150), 0.4, rows))
+    area[kind == "Studio"] = np.round(area[kind == "Studio"] * 0.4)
+    area[kind == "Villa"] = np.round(area[kind == "Villa"] * 2.2)
+    area = np.maximum(area, 30)
+    bedrooms = np.clip(np.round(area / 55 + rng.normal(0, 0.6, rows)), 1, 7).astype(np.int32)
+    bathrooms = np.clip(bedrooms - rng.integers(0, 2, rows), 1, 6).astype(np.int32)
+    price = np.round(area * level_per_m2[city_codes] * rng.lognormal(0, 0.35, rows), -3)
+    compound = np.array(
+        [f"{c.split(' ')[0]} Compound {i}" for c, i in zip(city, rng.integers(0, COMPOUNDS_PER_CITY, rows))],
+        dtype=object,
+    )
+    unknown = rng.random(rows) < 0.1
+    compound[unknown] = "Unknown"
+    return {
+        "type": kind,
+        "price": price,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "area": area,
+        "furnished": _pick(rng, FURNISHED, rows),
+        "level": np.array(LEVELS, dtype=object)[rng.integers(0, len(LEVELS), rows)],
+        "compound": compound,
+        "payment_option": _pick(rng, PAYMENT_OPTIONS, rows),
+        "delivery_date": _pick(rng, DELIVERY_DATES, rows),
+        "delivery_term": _pick(rng, DELIVERY_TERMS, rows),
+        "city": city,
+    }
+
+
+def synthetic_chunks(rows: int, seed: int = 0, chunk_size: int = CHUNK) -> Iterator[Dict[str, np.ndarray]]:
+    for i, start in enumerate(range(0, rows, chunk_size)):
+        yield synthetic_columns(min(chunk_size, rows - start), seed=seed * 1000003 + i)
+
+
+def synthetic_store(rows: int, seed: int = 0) -> PropertyStore:
+    store = PropertyStore(capacity=rows)
+    offset = 0
+    for columns in synthetic_chunks(rows, seed):
+        n = len(columns["price"])
+        store.append_columns([f"listing_{offset + i}" for i in range(n)], columns)
+        offset += n
+    store.build_indexes()
+    return store
+
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 0) -> str:
+    """Write the catalogue a ``synthetic_store`` of the same size and seed holds, as CSV."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for columns in synthetic_chunks(rows, seed):
+            writer.writerows(zip(*(columns[field].tolist() for field in FIELDS)))
+    return path
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic property catalogue as CSV.")
+    parser.add_argument("path")
+    parser.add_argument("--rows", default="100k", help="row count, e.g. 1k, 100k, 1m")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rows = parse_size(args.rows)
+    write_synthetic_csv(args.path, rows, args.seed)
+    print(f"wrote {rows} rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
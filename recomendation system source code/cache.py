@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from typing import Dict
+
+import numpy as np
+
+from query import Query
+from store import PropertyStore
+
+MAX_ENTRIES = 256
+# Upper bound on row ids held across all cached results (int32, so ~4 bytes each).
+MAX_ROWS = 4_000_000
+
+
+class QueryCache:
+    """LRU cache of query results keyed by ``Query.cache_key()``.
+
+    Results are stored as read-only compact row-id arrays. Any change to
+    the store (its ``version`` moves) drops every entry, since a single
+    upsert can add or remove rows from any result.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_rows: int = MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._rows = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def evaluate(self, query: Query, store: PropertyStore) -> np.ndarray:
+        if self._version != store.version:
+            self.clear()
+            self._version = store.version
+        key = query.cache_key()
+        rows = self._entries.get(key)
+        if rows is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rows
+        self.misses += 1
+        rows = query.evaluate(store)
+        rows = rows.astype(np.int32 if store.n_rows < 2**31 else np.int64)
+        rows.flags.writeable = False
+        self._put(key, rows)
+        return rows
+
+    def _put(self, key: tuple, rows: np.ndarray):
+        if len(rows) > self.max_rows:
+            return
+        self._entries[key] = rows
+        self._rows += len(rows)
+        while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+            _, evicted = self._entries.popitem(last=False)
+            self._rows -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._rows = 0
+
+    def info(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "rows": self._rows,
+        }
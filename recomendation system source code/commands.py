@@ -0,0 +1,377 @@
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from query import Query
+
+# One scanner for every message: numbers (with optional thousands commas),
+# words and the two symbolic comparators.
+TOKEN_RE = re.compile(r"(?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)|(?P<word>[a-z_][a-z0-9_]*)|(?P<op>>=|<=)")
+
+# Surface words folded onto the canonical keyword the grammar works with.
+KEYWORDS = {
+    "list": "list",
+    "find": "filter",
+    "filter": "filter",
+    "search": "filter",
+    "searches": "searches",
+    "run": "run",
+    "delete": "remove",
+    "sort": "sort",
+    "next": "next",
+    "previous": "previous",
+    "prev": "previous",
+    "compare": "compare",
+    "similar": "similar",
+    "detail": "details",
+    "details": "details",
+    "show": "show",
+    "remove": "remove",
+    "favorite": "favorite",
+    "favorites": "favorite",
+    "favourite": "favorite",
+    "favourites": "favorite",
+    "save": "save",
+    "load": "load",
+    "export": "export",
+    "user": "user",
+    "help": "help",
+    "stats": "stats",
+    "refine": "refine",
+    "narrow": "refine",
+    "only": "only",
+    "within": "only",
+    "undo": "undo",
+    "value": "value",
+    "deal": "value",
+    "worth": "value",
+    "statistics": "stats",
+    "summary": "stats",
+    "desc": "desc",
+    "descending": "desc",
+    "asc": "asc",
+    "ascending": "asc",
+    "delivery": "delivery",
+    "price": "price",
+    "area": "area",
+    "bedroom": "bedrooms",
+    "bedrooms": "bedrooms",
+    "bathroom": "bathrooms",
+    "bathrooms": "bathrooms",
+    "between": "between",
+    "from": "between",
+    "over": "min",
+    "above": "min",
+    ">=": "min",
+    "under": "max",
+    "below": "max",
+    "<=": "max",
+}
+# Two-word comparators ("greater than", "at least", ...).
+PHRASES = {
+    ("greater", "than"): "min",
+    ("more", "than"): "min",
+    ("at", "least"): "min",
+    ("less", "than"): "max",
+    ("at", "most"): "max",
+}
+PHRASE_STARTS = {first for first, _ in PHRASES}
+LOCATIONS = ("zayed", "madinaty", "cairo")
+TYPES = {"apartment": "apartment", "apartments": "apartment", "villa": "villa", "villas": "villa"}
+RANGE_FIELDS = ("price", "area", "bedrooms", "bathrooms")
+# Filler words never reported as unknown, and never the first or last word of
+# a fuzzy match; only a name spelled out in full ("The Square", "Taj City")
+# may start or end with one. Every word that is not a keyword is resolved
+# against the catalogue (see vocabulary.py).
+STOPWORDS = frozenset(
+    """a an the in at on of for to with and or but me my i we us want need looking look like some any
+    is are it its that this those these them ones there what which where how many much by near around
+    now please new st nd rd th per m2 sqm sq m meter meters metre metres square egp le pounds million k than least
+    most greater more less property properties listing listings home homes house houses unit units
+    place places result results city cities town compound compounds type types cheap cheaper
+    expensive good best great nice all catalogue catalog everything furnished finishing term terms""".split()
+)
+# Room counts are whole numbers, so "under 3" means at most 2.
+EXCLUSIVE_MAX_FIELDS = ("bedrooms", "bathrooms")
+# The name in "save search as NAME", "run search NAME", ...; kept as typed.
+SEARCH_NAME_RE = re.compile(r"\bsearch(?:es)?\s+(?:as\s+|named\s+)?(.+)$", re.IGNORECASE)
+# "export [favorites] to PATH [with COMPRESSION]"; the path is cut out before
+# tokenising so words inside it ("list.csv") are not read as commands.
+EXPORT_TARGET_RE = re.compile(
+    r"^\s*export\b.*?\s(?:to|as|into)\s+(?P<path>\S+)(?:\s+with\s+(?P<compression>[a-z0-9]+)\b)?",
+    re.IGNORECASE,
+)
+SORT_FIELDS = RANGE_FIELDS + ("delivery", "value")
+# "stats by FIELD" groups by one facet; "stats all" ignores the current results.
+STATS_BY_RE = re.compile(r"\bby\s+(city|cities|type|types|compounds?|furnish\w*|delivery[\s_]+terms?|finishing)\b", re.IGNORECASE)
+STATS_FIELDS = {"cit": "city", "typ": "type", "com": "compound", "fur": "furnished", "del": "delivery_term", "fin": "delivery_term"}
+STATS_SCOPE_WORDS = ("all", "catalogue", "catalog", "everything")
+
+
+class Command:
+    def __init__(
+        self,
+        intent: str,
+        text: str = "",
+        numbers: Optional[List[float]] = None,
+        terms: Optional[Dict[str, List[str]]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        sort_keys: Optional[List[Tuple[str, bool]]] = None,
+        argument: Optional[str] = None,
+        options: Optional[Dict[str, str]] = None,
+        phrases: Optional[List[List[str]]] = None,
+        values: Optional[Dict[str, List[str]]] = None,
+    ):
+        self.intent = intent
+        self.text = text
+        self.numbers = numbers or []
+        self.terms = terms or {}
+        self.ranges = ranges or {}
+        self.sort_keys = sort_keys or [("price", False)]
+        self.argument = argument
+        self.options = options or {}
+        # Runs of free words as typed, resolved into exact ``values`` against a
+        # catalogue; ``terms`` are then re-derived from the words left over.
+        self.phrases = phrases or []
+        self.values = values or {}
+        self.unmatched: Optional[List[str]] = None
+
+    @property
+    def sort_field(self) -> str:
+        return self.sort_keys[0][0]
+
+    @property
+    def descending(self) -> bool:
+        return self.sort_keys[0][1]
+
+    def indices(self) -> List[int]:
+        return [int(n) for n in self.numbers]
+
+    def query(self) -> "Query":
+        # Imported here so parsing alone never pulls in numpy.
+        from query import Query
+
+        return Query(terms=self.terms, ranges=self.ranges, values=self.values)
+
+    def __repr__(self):
+        return (
+            f"Command(intent={self.intent!r}, numbers={self.numbers!r}, terms={self.terms!r}, "
+            f"ranges={self.ranges!r}, sort_keys={self.sort_keys!r}, "
+            f"argument={self.argument!r}, options={self.options!r}, phrases={self.phrases!r})"
+        )
+
+
+def tokenize(message: str) -> List[Tuple[str, object]]:
+    tokens = []
+    for match in TOKEN_RE.finditer(message.lower()):
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "number":
+            value = float(text.replace(",", ""))
+            tokens.append(("number", int(value) if value.is_integer() else value))
+        else:
+            tokens.append(("word", text))
+    return tokens
+
+
+def parse_command(message: str) -> Command:
+    words = set()
+    pairs = set()
+    numbers = []
+    ranges: Dict[str, list] = {}
+    sort_keys: List[list] = []
+    pending_descending = False
+    argument = None
+    options = {}
+    field = comparator = pending_low = None
+    previous_word = None
+    # A number no constraint consumed; "3 bedrooms" then means exactly three.
+    loose_number = None
+    # Runs of words and loose numbers between keywords ("taj city", "zayed 2000").
+    phrases = [[]]
+
+    text = message
+    target = EXPORT_TARGET_RE.match(message)
+    if target:
+        argument = target.group("path")
+        if target.group("compression"):
+            options["compression"] = target.group("compression").lower()
+        message = message[: target.start("path")]
+
+    for kind, value in tokenize(message):
+        if previous_word == "user" and argument is None:
+            argument = str(value)
+        if kind == "number":
+            numbers.append(value)
+            if field and comparator == "between" and pending_low is None:
+                pending_low = value
+                continue
+            if field and comparator == "between":
+                ranges[field] = [pending_low, value]
+            elif field and comparator:
+                _set_bound(ranges, field, comparator, value)
+            else:
+                loose_number = value
+                phrases[-1].append(str(value))
+            if field and comparator:
+                phrases.append([])
+            field = comparator = pending_low = None
+            previous_word = None
+            continue
+
+        word = value
+        keyword = KEYWORDS.get(word)
+        if keyword:
+            words.add(keyword)
+            if previous_word:
+                pairs.add((KEYWORDS.get(previous_word, previous_word), keyword))
+        # Constraint grammar: FIELD COMPARATOR NUMBER [... NUMBER], or NUMBER ROOMS
+        if keyword in EXCLUSIVE_MAX_FIELDS and loose_number is not None and keyword not in ranges:
+            ranges[keyword] = [loose_number, loose_number]
+        loose_number = None
+        if keyword in RANGE_FIELDS:
+            field, comparator, pending_low = keyword, None, None
+        elif field and comparator is None:
+            phrase = PHRASES.get((previous_word, word))
+            if phrase or keyword in ("min", "max", "between"):
+                comparator = phrase or keyword
+            elif word not in PHRASE_STARTS:
+                field = None
+
+        # Sort grammar: KEY [desc|asc] [then KEY [desc|asc] ...]; "price per m2" is its own key.
+        if keyword in SORT_FIELDS:
+            sort_keys.append([keyword, pending_descending])
+            pending_descending = False
+        elif word == "per" and previous_word == "price" and sort_keys:
+            sort_keys[-1][0] = "price_per_m2"
+        elif keyword in ("desc", "asc"):
+            if sort_keys:
+                sort_keys[-1][1] = keyword == "desc"
+            else:
+                pending_descending = keyword == "desc"
+
+        if keyword:
+            phrases.append([])
+        else:
+            phrases[-1].append(word)
+        previous_word = word
+
+    phrases = [p for p in phrases if p]
+    terms = free_terms(phrases)
+    intent = _intent(words, pairs, numbers)
+    if intent in ("save_search", "run_search", "delete_search"):
+        name = SEARCH_NAME_RE.search(text)
+        argument = name.group(1).strip() if name else None
+    elif intent in ("filter", "list", "unknown") and (terms or ranges or any(is_content(w) for p in phrases for w in p)) and (
+        # "refine"/"narrow" always narrow; "only"/"within" only when no search verb
+        # asks for a new search ("filter only apartments in madinaty").
+        "refine" in words or ("only" in words and intent == "unknown")
+    ):
+        intent = "refine"
+    elif intent == "stats":
+        by = STATS_BY_RE.search(text)
+        argument = STATS_FIELDS[by.group(1)[:3].lower()] if by else None
+        if any(word in STATS_SCOPE_WORDS for _, word in tokenize(text)):
+            options["scope"] = "catalogue"
+    return Command(
+        intent,
+        text=text,
+        numbers=numbers,
+        terms=terms,
+        ranges={f: (r[0], r[1]) for f, r in ranges.items()},
+        sort_keys=_dedupe([tuple(k) for k in sort_keys]) or [("price", pending_descending)],
+        argument=argument,
+        options=options,
+        phrases=phrases,
+    )
+
+
+def is_content(word: str) -> bool:
+    """Whether a free word could name something: not filler and not a number."""
+    return word not in STOPWORDS and not word[0].isdigit()
+
+
+def free_terms(phrases: List[List[str]]) -> Dict[str, List[str]]:
+    """City and type substrings for the well-known words in runs of free words."""
+    terms: Dict[str, List[str]] = {"city": [], "type": []}
+    for words in phrases:
+        previous_word = None
+        for word in words:
+            if word in LOCATIONS:
+                terms["city"].append("new cairo" if word == "cairo" and previous_word == "new" else word)
+            elif word in TYPES:
+                terms["type"].append(TYPES[word])
+            previous_word = word
+    return {f: _dedupe(t) for f, t in terms.items() if t}
+
+
+def _intent(words, pairs, numbers) -> str:
+    # "search" doubles as a filter verb, so saved-search commands go first.
+    if ("save", "filter") in pairs:
+        return "save_search"
+    if ("run", "filter") in pairs:
+        return "run_search"
+    if ("remove", "filter") in pairs:
+        return "delete_search"
+    if "searches" in words:
+        return "list_searches"
+    if "stats" in words:
+        return "stats"
+    if "undo" in words:
+        return "undo"
+    if "list" in words:
+        return "list"
+    if "filter" in words:
+        return "filter"
+    if "sort" in words:
+        return "sort"
+    if "next" in words:
+        return "next"
+    if "previous" in words:
+        return "previous"
+    if "compare" in words:
+        return "compare"
+    if "similar" in words:
+        return "similar"
+    if "value" in words:
+        return "value"
+    if "details" in words:
+        return "details"
+    if ("show", "favorite") in pairs:
+        return "show_favorites"
+    if "remove" in words and "favorite" in words:
+        return "remove_favorite"
+    if ("export", "favorite") in pairs:
+        return "export_favorites"
+    # "save favorite 3" adds #3, as it always has; without a number it saves the list.
+    if ("save", "favorite") in pairs and not numbers:
+        return "save_favorites"
+    if ("load", "favorite") in pairs:
+        return "load_favorites"
+    if "favorite" in words or "save" in words:
+        return "add_favorite"
+    if "export" in words:
+        return "export"
+    if "user" in words:
+        return "user"
+    if "help" in words:
+        return "help"
+    return "unknown"
+
+
+def _set_bound(ranges, field, comparator, value):
+    bounds = ranges.setdefault(field, [None, None])
+    if comparator == "min":
+        bounds[0] = value
+    elif field in EXCLUSIVE_MAX_FIELDS:
+        bounds[1] = value - 1
+    else:
+        bounds[1] = value
+
+
+def _dedupe(values):
+    seen = []
+    for v in values:
+        if v not in seen:
+            seen.append(v)
+    return seen
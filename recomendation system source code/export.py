@@ -0,0 +1,107 @@
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import os
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from store import FIELDS, NUMERIC_FIELDS, PropertyStore
+
+EXPORT_CHUNK = 10000
+FORMATS = ("csv", "jsonl", "parquet")
+FORMAT_SUFFIXES = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "jsonl", ".parquet": "parquet"}
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+PARQUET_COMPRESSION = ("snappy", "gzip", "zstd", "brotli", "lz4", "none")
+
+
+def detect_output(path: str, fmt: Optional[str] = None, compression: Optional[str] = None):
+    """``(format, compression)`` for ``path``, from its suffixes unless given."""
+    stem, suffix = os.path.splitext(path.lower())
+    if compression is None and suffix in COMPRESSION_SUFFIXES:
+        compression = COMPRESSION_SUFFIXES[suffix]
+        suffix = os.path.splitext(stem)[1]
+    fmt = fmt or FORMAT_SUFFIXES.get(suffix, "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; use one of {', '.join(FORMATS)}")
+    allowed = PARQUET_COMPRESSION if fmt == "parquet" else tuple(OPENERS) + ("none",)
+    if compression is not None and compression not in allowed:
+        raise ValueError(f"{fmt} exports support {', '.join(allowed)} compression, not {compression!r}")
+    return fmt, None if compression == "none" else compression
+
+
+def column_chunks(store: PropertyStore, rows: np.ndarray, chunk_size: int = EXPORT_CHUNK) -> Iterator[Dict[str, np.ndarray]]:
+    """Decoded column slices for ``rows``, ``chunk_size`` rows at a time."""
+    tables = {f: np.asarray(store.categories(f), dtype=object) for f in FIELDS if f not in NUMERIC_FIELDS}
+    rows = np.asarray(rows, dtype=np.intp)
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start : start + chunk_size]
+        yield {
+            f: store.column(f)[chunk] if f in NUMERIC_FIELDS else tables[f][store.column(f)[chunk]]
+            for f in FIELDS
+        }
+
+
+def export_rows(
+    store: PropertyStore,
+    rows: np.ndarray,
+    path: str,
+    fmt: Optional[str] = None,
+    compression: Optional[str] = None,
+    chunk_size: int = EXPORT_CHUNK,
+) -> int:
+    """Write ``rows`` of ``store`` to ``path`` and return how many were written.
+
+    Rows are decoded straight from the columns one chunk at a time, so memory
+    stays bounded by ``chunk_size`` whatever the size of the export. The
+    output is written under a temporary name and renamed into place.
+    """
+    fmt, compression = detect_output(path, fmt, compression)
+    tmp = f"{path}.part"
+    try:
+        chunks = column_chunks(store, rows, chunk_size)
+        if fmt == "parquet":
+            _write_parquet(chunks, tmp, compression)
+        else:
+            opener = OPENERS.get(compression, open)
+            with opener(tmp, "wt", encoding="utf-8", newline="") as f:
+                if fmt == "csv":
+                    _write_csv(chunks, f)
+                else:
+                    _write_jsonl(chunks, f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return len(rows)
+
+
+def _write_csv(chunks, f):
+    writer = csv.writer(f)
+    writer.writerow(FIELDS)
+    for columns in chunks:
+        writer.writerows(zip(*(columns[field].tolist() for field in FIELDS)))
+
+
+def _write_jsonl(chunks, f):
+    for columns in chunks:
+        values = [columns[field].tolist() for field in FIELDS]
+        f.writelines(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n" for row in zip(*values))
+
+
+def _write_parquet(chunks, path: str, compression: Optional[str]):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export requires the 'pyarrow' package") from e
+    schema = pa.schema(
+        [(f, pa.from_numpy_dtype(np.dtype(NUMERIC_FIELDS[f])) if f in NUMERIC_FIELDS else pa.string()) for f in FIELDS]
+    )
+    with pq.ParquetWriter(path, schema, compression=compression or "snappy") as writer:
+        for columns in chunks:
+            writer.write_table(pa.table({f: columns[f] for f in FIELDS}, schema=schema))
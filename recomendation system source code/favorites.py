@@ -0,0 +1,250 @@
+import atexit
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DB_FILE = "favorites.db"
+# Pending writes are flushed this often, or sooner once BATCH_SIZE pile up.
+FLUSH_INTERVAL = 1.0
+BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS favorites (
+    user TEXT NOT NULL,
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (user, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS favorites_by_position ON favorites (user, position);
+CREATE TABLE IF NOT EXISTS saved_searches (
+    user TEXT NOT NULL,
+    name TEXT NOT NULL,
+    query TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (user, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS legacy_imports (
+    user TEXT PRIMARY KEY,
+    imported REAL NOT NULL
+) WITHOUT ROWID;
+"""
+ADD_FAVORITE = (
+    "INSERT OR IGNORE INTO favorites (user, key, position) "
+    "SELECT ?, ?, COALESCE(MAX(position), 0) + 1 FROM favorites WHERE user = ?"
+)
+REMOVE_FAVORITE = "DELETE FROM favorites WHERE user = ? AND key = ?"
+CLEAR_FAVORITES = "DELETE FROM favorites WHERE user = ?"
+SAVE_SEARCH = "INSERT OR REPLACE INTO saved_searches (user, name, query, created) VALUES (?, ?, ?, ?)"
+DELETE_SEARCH = "DELETE FROM saved_searches WHERE user = ? AND name = ?"
+MARK_IMPORTED = "INSERT OR IGNORE INTO legacy_imports (user, imported) VALUES (?, ?)"
+
+_shared: Dict[str, "FavoritesDB"] = {}
+_shared_lock = threading.Lock()
+
+
+class FavoritesDB:
+    """Per-user favorites and saved searches in one SQLite file.
+
+    Reads are served from an in-memory copy of each user's rows, loaded on
+    first use. Writes update that copy at once and are queued; a background
+    thread commits the queue in batches (write-behind), so callers never
+    wait on disk unless they ask to with ``flush``.
+
+    Several processes may share the file (batch workers, more than one
+    server). Writes are row by row, so their flushes merge rather than
+    overwrite, and a read first checks whether another connection has
+    committed since; if so the copy is reloaded. Another process's changes
+    therefore show up once it has flushed them, within ``flush_interval``.
+    """
+
+    def __init__(self, path: str = DB_FILE, flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._favorites: Dict[str, List[str]] = {}
+        self._searches: Dict[str, Dict[str, str]] = {}
+        self._imported: Dict[str, bool] = {}
+        self._pending: List[Tuple[str, tuple]] = []
+        # _lock guards the in-memory state and _db_lock the connection; either
+        # may be taken while holding _flush_lock, and _db_lock inside _lock.
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+        self._data_version = self._read_data_version()
+
+    @classmethod
+    def shared(cls, path: str = DB_FILE) -> "FavoritesDB":
+        """One instance per file, flushed at interpreter exit."""
+        with _shared_lock:
+            db = _shared.get(path)
+            if db is None:
+                db = _shared[path] = cls(path)
+                atexit.register(db.close)
+            return db
+
+    def favorites(self, user: str) -> List[str]:
+        self._refresh()
+        with self._lock:
+            return list(self._load_favorites(user))
+
+    def add_favorite(self, user: str, key: str):
+        with self._lock:
+            keys = self._load_favorites(user)
+            if key in keys:
+                return
+            keys.append(key)
+            self._queue(ADD_FAVORITE, (user, key, user))
+
+    def remove_favorite(self, user: str, key: str):
+        with self._lock:
+            keys = self._load_favorites(user)
+            if key in keys:
+                keys.remove(key)
+                self._queue(REMOVE_FAVORITE, (user, key))
+
+    def set_favorites(self, user: str, keys: Sequence[str]):
+        with self._lock:
+            self._favorites[user] = list(dict.fromkeys(keys))
+            self._queue(CLEAR_FAVORITES, (user,))
+            for key in self._favorites[user]:
+                self._queue(ADD_FAVORITE, (user, key, user))
+
+    def legacy_imported(self, user: str) -> bool:
+        """Whether the old favorites file has already been considered for ``user``."""
+        self._refresh()
+        with self._lock:
+            imported = self._imported.get(user)
+            if imported is None:
+                with self._db_lock:
+                    row = self._conn.execute("SELECT 1 FROM legacy_imports WHERE user = ?", (user,)).fetchone()
+                imported = self._imported[user] = row is not None
+            return imported
+
+    def mark_legacy_imported(self, user: str):
+        with self._lock:
+            if not self._imported.get(user):
+                self._imported[user] = True
+                self._queue(MARK_IMPORTED, (user, time.time()))
+
+    def saved_searches(self, user: str) -> Dict[str, str]:
+        self._refresh()
+        with self._lock:
+            return dict(self._load_searches(user))
+
+    def save_search(self, user: str, name: str, query: str):
+        with self._lock:
+            searches = self._load_searches(user)
+            searches.pop(name, None)
+            searches[name] = query
+            self._queue(SAVE_SEARCH, (user, name, query, time.time()))
+
+    def delete_search(self, user: str, name: str) -> bool:
+        with self._lock:
+            searches = self._load_searches(user)
+            if name not in searches:
+                return False
+            del searches[name]
+            self._queue(DELETE_SEARCH, (user, name))
+            return True
+
+    def flush(self):
+        """Commit every queued write in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            with self._db_lock, self._conn:
+                for sql, params in batch:
+                    self._conn.execute(sql, params)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def _read_data_version(self) -> int:
+        # Changes only when another connection commits, never for our own commits.
+        with self._db_lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _refresh(self):
+        """Drop the in-memory copy if another connection has committed since we last looked."""
+        if self._closed:
+            return
+        version = self._read_data_version()
+        if version == self._data_version:
+            return
+        # Our own queued writes land first, so the reloaded rows include them.
+        self.flush()
+        with self._lock:
+            if self._pending:
+                # Written meanwhile by another thread; reload on the next read instead.
+                return
+            self._favorites.clear()
+            self._searches.clear()
+            self._imported.clear()
+            self._data_version = version
+
+    def _load_favorites(self, user: str) -> List[str]:
+        keys = self._favorites.get(user)
+        if keys is None:
+            with self._db_lock:
+                rows = self._conn.execute(
+                    "SELECT key FROM favorites WHERE user = ? ORDER BY position", (user,)
+                ).fetchall()
+            keys = self._favorites[user] = [key for key, in rows]
+        return keys
+
+    def _load_searches(self, user: str) -> Dict[str, str]:
+        searches = self._searches.get(user)
+        if searches is None:
+            with self._db_lock:
+                rows = self._conn.execute(
+                    "SELECT name, query FROM saved_searches WHERE user = ? ORDER BY created", (user,)
+                ).fetchall()
+            searches = self._searches[user] = dict(rows)
+        return searches
+
+    def _queue(self, sql: str, params: tuple):
+        if self._closed:
+            raise RuntimeError("favorites database is closed")
+        self._pending.append((sql, params))
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def close_shared():
+    """Flush and close every shared instance.
+
+    For processes that exit without running atexit handlers, such as
+    multiprocessing workers.
+    """
+    with _shared_lock:
+        dbs = list(_shared.values())
+        _shared.clear()
+    for db in dbs:
+        db.close()
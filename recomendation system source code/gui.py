@@ -1,29 +1,148 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, simpledialog
+from commands import parse_command
 from main import RealEstateChatbot
-
-QUIZ_QUESTIONS = [
-    {"q": "What's your maximum budget (EGP)?", "type": "numeric"},
-    {"q": "How many bedrooms do you need?", "type": "choice", "choices": ["1", "2", "3+"]},
-    {"q": "Preferred area(s)? (comma separated)", "type": "text"},
-    {"q": "Are you looking for a new or resale unit?", "type": "choice", "choices": ["New", "Resale", "Doesn’t matter"]},
-    {"q": "What's more important to you?", "type": "choice", "choices": ["Area size", "Price", "Location", "Amenities"]},
-    {"q": "Preferred type?", "type": "choice", "choices": ["Apartment", "Villa", "Duplex", "Studio"]},
-    {"q": "Minimum required amenities? (comma separated, e.g. Garden, Parking, Pool, Elevator)", "type": "text"},
-    {"q": "What's your intended use?", "type": "choice", "choices": ["Living", "Investment", "Rental"]},
-]
+from quiz import QUIZ_QUESTIONS, TOP_K
+
+POLL_MS = 50
+# A new search makes any still-pending command that only reshapes the old results moot.
+REPLACING_INTENTS = ("list", "filter")
+RESULT_INTENTS = ("list", "filter", "sort", "next", "previous")
+
+class Job:
+    def __init__(self, func, on_done, on_error=None):
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.finished = False
+
+    def cancel(self):
+        # A job already running still finishes; its result is just dropped.
+        self.cancelled = True
+
+class BackgroundWorker:
+    """Runs jobs one at a time on a daemon thread and hands results back to Tk.
+
+    Jobs run in submission order, so the chatbot is never used from two
+    threads at once. Callbacks run on the Tk thread: finished jobs are
+    queued and picked up by a ``root.after`` poll.
+    """
+
+    def __init__(self, root, on_change=None, poll_ms=POLL_MS):
+        self.root = root
+        self.on_change = on_change
+        self.poll_ms = poll_ms
+        self.pending = 0
+        self._jobs = queue.Queue()
+        self._done = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, func, on_done, on_error=None) -> Job:
+        job = Job(func, on_done, on_error)
+        self.pending += 1
+        self._jobs.put(job)
+        if self.on_change:
+            self.on_change()
+        return job
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if not job.cancelled:
+                try:
+                    job.result = job.func()
+                except Exception as e:
+                    job.error = e
+            self._done.put(job)
+
+    def _poll(self):
+        changed = False
+        while True:
+            try:
+                job = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            job.finished = changed = True
+            if job.cancelled:
+                continue
+            if job.error is not None:
+                if job.on_error:
+                    job.on_error(job.error)
+                else:
+                    messagebox.showerror("Error", str(job.error))
+            else:
+                job.on_done(job.result)
+        if changed and self.on_change:
+            self.on_change()
+        self.root.after(self.poll_ms, self._poll)
 
 class RealEstateChatbotGUI:
-    def __init__(self, root):
+    def __init__(self, root, profile=None):
         self.root = root
+        self.profile = profile
         self.root.title("Real Estate Chatbot")
         self.root.geometry("900x700")
         self.root.resizable(False, False)
-        self.chatbot = RealEstateChatbot()
+        self.chatbot = None
+        self.load_error = None
+        self.result_jobs = []
         self.dark_mode = False
+        self.top_k = TOP_K
         self.create_widgets()
         self.set_light_mode()
+        self.worker = BackgroundWorker(self.root, on_change=self.update_status)
         self.display_response("Welcome to the Real Estate Chatbot! Type your command or use the buttons below.")
+        # Commands typed while this runs queue up behind it on the worker.
+        self.worker.submit(self.load_chatbot, self.chatbot_loaded, self.chatbot_failed)
+
+    def load_chatbot(self):
+        chatbot = RealEstateChatbot()
+        # The catalogue is loaded lazily; pull it in here, off the Tk thread.
+        try:
+            if self.profile is not None:
+                self.profile.run(lambda: chatbot.store)
+            else:
+                chatbot.store
+        except Exception as e:
+            # Set here rather than in the callback, so jobs queued behind the load see it.
+            self.load_error = f"{type(e).__name__}: {e}"
+            raise
+        self.chatbot = chatbot
+        return chatbot
+
+    def chatbot_loaded(self, chatbot):
+        self.display_response(f"Catalogue loaded: {len(chatbot.store):,} properties.")
+        if self.profile is not None:
+            self.profile.mark("catalogue loaded (worker thread)")
+            self.profile.report()
+
+    def chatbot_failed(self, error):
+        self.display_response(f"Could not load the catalogue: {self.load_error}")
+        self.update_status()
+
+    def reply(self, command):
+        # Runs on the worker thread, after the load job.
+        if self.chatbot is None:
+            return f"Commands are unavailable because the catalogue could not be loaded ({self.load_error})."
+        return self.chatbot.process_input(command)
+
+    def update_status(self):
+        if self.load_error is not None:
+            text = f"Catalogue failed to load: {self.load_error}"
+        elif self.chatbot is None:
+            text = "Loading catalogue..."
+        elif self.worker.pending:
+            text = "Working..."
+        else:
+            text = f"Ready - {len(self.chatbot.store):,} properties"
+        self.status_label.config(text=text)
 
     def create_widgets(self):
         # Title label
@@ -48,6 +167,10 @@ class RealEstateChatbotGUI:
         self.submit_button = tk.Button(self.input_frame, text="Submit", command=self.process_command, font=("Arial", 12))
         self.submit_button.pack(side=tk.LEFT, padx=5)
 
+        # Loading / busy indicator
+        self.status_label = tk.Label(self.root, text="Loading catalogue...", font=("Arial", 10), anchor="w")
+        self.status_label.pack(fill=tk.X, padx=12)
+
         # Feature buttons frame
         self.feature_frame = tk.Frame(self.root)
         self.feature_frame.pack(pady=10)
@@ -119,15 +242,22 @@ class RealEstateChatbotGUI:
                 self.start_quiz()
                 self.input_entry.delete(0, tk.END)
                 return
-            self.display_response(f"You: {user_input}")
-            response = self.chatbot.process_input(user_input)
-            self.display_response(f"Bot: {response}")
+            self.quick_command(user_input)
             self.input_entry.delete(0, tk.END)
 
     def quick_command(self, command):
         self.display_response(f"You: {command}")
-        response = self.chatbot.process_input(command)
-        self.display_response(f"Bot: {response}")
+        intent = parse_command(command).intent
+        if intent in REPLACING_INTENTS:
+            for job in self.result_jobs:
+                job.cancel()
+            self.result_jobs = []
+        job = self.worker.submit(
+            lambda: self.reply(command),
+            lambda response: self.display_response(f"Bot: {response}"),
+        )
+        if intent in RESULT_INTENTS:
+            self.result_jobs = [j for j in self.result_jobs if not j.finished] + [job]
 
     def filter_dialog(self):
         filter_str = simpledialog.askstring("Filter", "Enter filter (e.g. filter bedrooms at least 3 price under 2000000):", parent=self.root)
@@ -172,8 +302,8 @@ class RealEstateChatbotGUI:
         self.output_area.config(state='disabled')
 
     def show_help(self):
-        help_message = self.chatbot.help_message()
-        messagebox.showinfo("Help", help_message)
+        # Help needs no catalogue, so it doesn't wait behind the load.
+        messagebox.showinfo("Help", RealEstateChatbot.help_message())
 
     def toggle_theme(self):
         if self.dark_mode:
@@ -188,6 +318,7 @@ class RealEstateChatbotGUI:
         self.output_area.config(bg="#23272e", fg="#e0e0e0", insertbackground="#e0e0e0")
         self.input_frame.config(bg="#181818")
         self.input_label.config(bg="#181818", fg="#e0e0e0")
+        self.status_label.config(bg="#181818", fg="#9e9e9e")
         self.input_entry.config(bg="#23272e", fg="#e0e0e0", insertbackground="#e0e0e0")
         self.feature_frame.config(bg="#181818")
         self.button_frame.config(bg="#181818")
@@ -201,6 +332,7 @@ class RealEstateChatbotGUI:
         self.output_area.config(bg="#ffffff", fg="#222222", insertbackground="#222222")
         self.input_frame.config(bg="#f0f0f0")
         self.input_label.config(bg="#f0f0f0", fg="#222222")
+        self.status_label.config(bg="#f0f0f0", fg="#555555")
         self.input_entry.config(bg="#ffffff", fg="#222222", insertbackground="#222222")
         self.feature_frame.config(bg="#f0f0f0")
         self.button_frame.config(bg="#f0f0f0")
@@ -229,64 +361,25 @@ class RealEstateChatbotGUI:
         self.input_entry.focus_set()
 
     def finish_quiz(self):
-        matches = []
-        for key, prop in self.chatbot.properties.items():
-            score = 0
-            # Q1: Budget
-            try:
-                if self.quiz_answers[0] and prop.price <= int(self.quiz_answers[0]):
-                    score += 1
-            except:
-                pass
-            # Q2: Bedrooms
-            if self.quiz_answers[1]:
-                if self.quiz_answers[1] == "3+" and prop.bedrooms >= 3:
-                    score += 1
-                elif self.quiz_answers[1].isdigit() and prop.bedrooms == int(self.quiz_answers[1]):
-                    score += 1
-            # Q3: Area/Location
-            if self.quiz_answers[2]:
-                areas = [a.strip().lower() for a in self.quiz_answers[2].split(",")]
-                if any(area in prop.city.lower() or area in prop.compound.lower() for area in areas):
-                    score += 1
-            # Q4: New/Resale
-            if self.quiz_answers[3]:
-                if self.quiz_answers[3].lower() == "new" and ("ready" in prop.delivery_date.lower() or "202" in prop.delivery_date):
-                    score += 1
-                elif self.quiz_answers[3].lower() == "resale" and "ready" in prop.delivery_date.lower():
-                    score += 1
-                elif self.quiz_answers[3].lower() == "doesn’t matter":
-                    score += 1
-            # Q5: Key preference (boost score)
-            if self.quiz_answers[4]:
-                if self.quiz_answers[4].lower() == "area size" and prop.area >= 150:
-                    score += 1
-                elif self.quiz_answers[4].lower() == "price":
-                    score += 1
-                elif self.quiz_answers[4].lower() == "location":
-                    score += 1
-                elif self.quiz_answers[4].lower() == "amenities":
-                    score += 1
-            # Q6: Type
-            if self.quiz_answers[5]:
-                if self.quiz_answers[5].lower() in prop.type.lower():
-                    score += 1
-            # Q7: Amenities (not in data, so just skip or always +1)
-            if self.quiz_answers[6]:
-                score += 1
-            # Q8: Intended use (not in data, so just skip or always +1)
-            if self.quiz_answers[7]:
-                score += 1
-            matches.append((score, prop))
-
-        matches.sort(key=lambda x: (-x[0], x[1].price))
-        top_matches = matches[:3]
-        if not top_matches or top_matches[0][0] == 0:
+        answers = list(self.quiz_answers)
+        self.worker.submit(lambda: self.quiz_matches(answers), self.show_quiz_matches)
+
+    def quiz_matches(self, answers):
+        # Runs on the worker thread; returns (score, Property) pairs.
+        from scoring import top_matches
+
+        if self.chatbot is None:
+            raise RuntimeError(f"The catalogue could not be loaded ({self.load_error}).")
+        store = self.chatbot.store
+        return [(score, store.property_at(row)) for score, row in top_matches(store, answers, k=self.top_k)]
+
+    def show_quiz_matches(self, matches):
+        if not matches or matches[0][0] == 0:
             self.display_response("Sorry, no properties match your preferences.")
             return
 
         msg = "🏅 Top property matches for you:\n"
-        for i, (score, prop) in enumerate(top_matches, 1):
+        for i, (_, prop) in enumerate(matches, 1):
             msg += (
                 f"\n{i}. {prop.compound} | {prop.type} | {prop.city}\n"
                 f"   Price: {prop.price:,.0f} EGP | Bedrooms: {prop.bedrooms} | Area: {prop.area}m²\n"
@@ -296,6 +389,16 @@ class RealEstateChatbotGUI:
         self.display_response("You can retake the quiz anytime by clicking 'Top Matched'.")
 
 if __name__ == "__main__":
+    import argparse
+
+    from startup import StartupProfile
+
+    parser = argparse.ArgumentParser(description="Real estate chatbot (GUI).")
+    parser.add_argument("--profile-startup", action="store_true", help="report where start-up time goes")
+    args = parser.parse_args()
+    profile = StartupProfile(args.profile_startup)
     root = tk.Tk()
-    app = RealEstateChatbotGUI(root)
+    app = RealEstateChatbotGUI(root, profile=profile if args.profile_startup else None)
+    profile.mark("window built")
+    root.after_idle(lambda: profile.mark("window shown"))
     root.mainloop()
\ No newline at end of file
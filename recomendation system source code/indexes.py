@@ -0,0 +1,114 @@
+from typing import Optional
+
+import numpy as np
+
+
+class SortedIndex:
+    """Row ids of a numeric column ordered by value, for binary-searched ranges."""
+
+    def __init__(self, values: np.ndarray, rows: Optional[np.ndarray] = None):
+        if rows is None:
+            self.order = np.argsort(values, kind="stable")
+        else:
+            self.order = rows[np.argsort(values[rows], kind="stable")]
+        self.values = values[self.order]
+
+    @classmethod
+    def from_arrays(cls, order: np.ndarray, values: np.ndarray) -> "SortedIndex":
+        index = cls.__new__(cls)
+        index.order = order
+        index.values = values
+        return index
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def bounds(self, low: Optional[float], high: Optional[float]):
+        start = 0 if low is None else int(np.searchsorted(self.values, low, side="left"))
+        stop = len(self.values) if high is None else int(np.searchsorted(self.values, high, side="right"))
+        return start, max(start, stop)
+
+    def count(self, low: Optional[float], high: Optional[float]) -> int:
+        start, stop = self.bounds(low, high)
+        return stop - start
+
+    def rows(self, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        start, stop = self.bounds(low, high)
+        return self.order[start:stop]
+
+    def remove(self, rows: np.ndarray):
+        keep = ~np.isin(self.order, rows)
+        self.order = self.order[keep]
+        self.values = self.values[keep]
+
+    def add(self, rows: np.ndarray, values: np.ndarray):
+        # Sorting the batch first keeps ties among new rows in value order
+        # when several land on the same insertion point.
+        batch = np.argsort(values, kind="stable")
+        rows, values = rows[batch], values[batch]
+        positions = np.searchsorted(self.values, values, side="right")
+        self.order = np.insert(self.order, positions, rows)
+        self.values = np.insert(self.values, positions, values)
+
+
+class InvertedIndex:
+    """Posting lists (ascending row ids) for each code of a category column."""
+
+    def __init__(self, codes: np.ndarray, n_categories: int, rows: Optional[np.ndarray] = None):
+        if rows is None:
+            rows = np.arange(len(codes))
+        codes = codes[rows]
+        self.rows_by_code = rows[np.argsort(codes, kind="stable")]
+        counts = np.bincount(codes, minlength=n_categories)
+        self.offsets = np.zeros(len(counts) + 1, dtype=np.intp)
+        np.cumsum(counts, out=self.offsets[1:])
+
+    @classmethod
+    def from_arrays(cls, rows_by_code: np.ndarray, offsets: np.ndarray) -> "InvertedIndex":
+        index = cls.__new__(cls)
+        index.rows_by_code = rows_by_code
+        index.offsets = offsets
+        return index
+
+    def __len__(self) -> int:
+        return len(self.rows_by_code)
+
+    def postings(self, code: int) -> np.ndarray:
+        if code < 0 or code + 1 >= len(self.offsets):
+            return self.rows_by_code[:0]
+        return self.rows_by_code[self.offsets[code] : self.offsets[code + 1]]
+
+    def count(self, codes) -> int:
+        codes = np.asarray(codes, dtype=np.intp)
+        codes = codes[(codes >= 0) & (codes + 1 < len(self.offsets))]
+        return int((self.offsets[codes + 1] - self.offsets[codes]).sum())
+
+    def rows(self, codes) -> np.ndarray:
+        lists = [self.postings(int(c)) for c in codes]
+        if not lists:
+            return self.rows_by_code[:0]
+        if len(lists) == 1:
+            return lists[0]
+        return np.sort(np.concatenate(lists))
+
+    def remove(self, rows: np.ndarray, codes: np.ndarray):
+        keep = ~np.isin(self.rows_by_code, rows)
+        self.rows_by_code = self.rows_by_code[keep]
+        removed = np.bincount(codes, minlength=len(self.offsets) - 1)
+        self.offsets[1:] -= np.cumsum(removed)
+
+    def add(self, rows: np.ndarray, codes: np.ndarray, n_categories: int):
+        if n_categories + 1 > len(self.offsets):
+            grown = np.full(n_categories + 1, self.offsets[-1], dtype=np.intp)
+            grown[: len(self.offsets)] = self.offsets
+            self.offsets = grown
+        batch = np.lexsort((rows, codes))
+        rows, codes = rows[batch], codes[batch]
+        positions = np.empty(len(rows), dtype=np.intp)
+        for code in np.unique(codes):
+            members = codes == code
+            start, stop = self.offsets[code], self.offsets[code + 1]
+            positions[members] = start + np.searchsorted(self.rows_by_code[start:stop], rows[members])
+        self.rows_by_code = np.insert(self.rows_by_code, positions, rows)
+        added = np.bincount(codes, minlength=len(self.offsets) - 1)
+        self.offsets[1:] += np.cumsum(added)
@@ -0,0 +1,343 @@
+import csv
+import glob
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from store import CATEGORY_FIELDS, NUMERIC_FIELDS, PropertyStore, records_to_columns
+
+CHUNK_SIZE = 10000
+ROOM_FIELDS = ("bedrooms", "bathrooms")
+# Columns that carry a feed's stable listing id, in order of preference.
+ID_FIELDS = ("id", "listing_id", "key")
+
+
+class RowError(ValueError):
+    """A source row that cannot be turned into a property; ``reason`` is counted."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class IngestStats:
+    def __init__(self, source: str):
+        self.source = source
+        self.total_bytes = os.path.getsize(source) if os.path.exists(source) else 0
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.chunks = 0
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.errors: Counter = Counter()
+        # Set when the whole file could not be read (e.g. a missing reader package).
+        self.failure: Optional[str] = None
+
+    @property
+    def rows_rejected(self) -> int:
+        return sum(self.errors.values())
+
+    def summary(self) -> str:
+        if self.failure:
+            return f"{self.source}: not loaded ({self.failure})"
+        text = f"{self.source}: loaded {self.rows_loaded} of {self.rows_read} rows"
+        if self.updated or self.deleted:
+            text += f" ({self.inserted} new, {self.updated} updated, {self.deleted} deleted)"
+        if self.errors:
+            reasons = ", ".join(f"{reason}: {count}" for reason, count in self.errors.most_common())
+            text += f" (skipped {self.rows_rejected}: {reasons})"
+        return text
+
+
+def detect_format(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(b"PK\x03\x04"):
+        return "xlsx"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return "xls"
+    # Some exports named .xls are really CSV text, so sniff rather than trust the suffix.
+    return "csv"
+
+
+def read_rows(path: str, stats: IngestStats) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """Stream ``(row number, {header: value})`` pairs from a CSV or Excel file."""
+    fmt = detect_format(path)
+    if fmt == "csv":
+        rows = _read_csv(path, stats)
+    elif fmt == "xlsx":
+        rows = _read_xlsx(path)
+    else:
+        rows = _read_xls(path)
+    header = None
+    for values in rows:
+        if header is None:
+            header = [str(h).strip().lower() for h in values]
+            continue
+        if not any(v not in (None, "") for v in values):
+            continue
+        stats.rows_read += 1
+        if len(values) != len(header):
+            stats.errors["wrong column count"] += 1
+            continue
+        yield stats.rows_read - 1, dict(zip(header, values))
+
+
+def _read_csv(path: str, stats: IngestStats) -> Iterator[list]:
+    with open(path, newline="", encoding="utf-8") as f:
+        for values in csv.reader(f):
+            stats.bytes_read = f.buffer.tell()
+            yield values
+
+
+def _read_xlsx(path: str) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _read_xls(path: str) -> Iterator[list]:
+    try:
+        import xlrd
+    except ImportError as e:
+        raise ImportError("Reading legacy .xls workbooks requires the 'xlrd' package") from e
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        for i in range(sheet.nrows):
+            yield sheet.row_values(i)
+    finally:
+        workbook.release_resources()
+
+
+def listing_id(row: Dict[str, object]) -> str:
+    for field in ID_FIELDS:
+        value = row.get(field)
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+
+def normalise_row(row: Dict[str, object]) -> Dict[str, object]:
+    record = {"id": listing_id(row)}
+    for field in CATEGORY_FIELDS:
+        value = row.get(field)
+        record[field] = "" if value is None else str(value).strip()
+    for field in NUMERIC_FIELDS:
+        number = _number(row.get(field, 0), field)
+        if number < 0:
+            raise RowError(f"negative {field}")
+        record[field] = int(number) if field in ROOM_FIELDS else number
+    return record
+
+
+def _number(value, field: str) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = "" if value is None else str(value).strip().replace(",", "")
+    # Capped buckets such as "10+" bedrooms keep their floor value.
+    if text.endswith("+"):
+        text = text[:-1]
+    try:
+        return float(text)
+    except ValueError:
+        raise RowError(f"missing {field}" if not text else f"invalid {field}") from None
+
+
+def validated(rows: Iterable[Tuple[int, Dict[str, object]]], stats: IngestStats) -> Iterator[Tuple[int, dict]]:
+    for idx, row in rows:
+        try:
+            yield idx, normalise_row(row)
+        except RowError as e:
+            stats.errors[e.reason] += 1
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def default_key(record: dict, idx: int) -> str:
+    # Feeds with a listing id keep it as the key; otherwise fall back to compound + row number.
+    return record["id"] or derived_key(record, idx)
+
+
+def derived_key(record: dict, idx: int) -> str:
+    return f"{record['compound'].lower().replace(' ', '_')}_{idx}"
+
+
+def ingest(
+    path: str,
+    store: Optional[PropertyStore] = None,
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[IngestStats], None]] = None,
+    make_key: Callable[[dict, int], str] = default_key,
+) -> Tuple[PropertyStore, IngestStats]:
+    """Stream ``path`` into ``store`` one chunk at a time.
+
+    Only one chunk of parsed rows is alive at once; everything else lives in
+    the store's columns. Bad rows are skipped and tallied in the returned
+    stats rather than aborting the load; so are rows whose key was already
+    loaded (the first row for a key wins).
+    """
+    store = store if store is not None else PropertyStore(capacity=chunk_size)
+    stats = IngestStats(path)
+    for chunk in chunked(validated(read_rows(path, stats), stats), chunk_size):
+        keys, records = [], []
+        seen = set()
+        for idx, record in chunk:
+            key = make_key(record, idx)
+            if key in seen or key in store:
+                stats.errors["duplicate id"] += 1
+                continue
+            seen.add(key)
+            keys.append(key)
+            records.append(record)
+        if keys:
+            store.append_columns(keys, records_to_columns(records))
+        stats.rows_loaded += len(keys)
+        stats.chunks += 1
+        if progress:
+            progress(stats)
+    return store, stats
+
+
+def print_progress(stats: IngestStats):
+    # On stderr, so it never mixes with replies written to stdout.
+    done = f" ({stats.bytes_read / stats.total_bytes:.0%})" if stats.total_bytes and stats.bytes_read else ""
+    print(f"Loading {stats.source}: {stats.rows_loaded} rows{done}, {stats.rows_rejected} skipped", file=sys.stderr)
+
+
+SOURCE_PATTERNS = ("*.csv", "*.xls", "*.xlsx")
+
+
+def is_multi_source(path: str) -> bool:
+    return os.path.isdir(path) or any(c in path for c in "*?[")
+
+
+def expand_sources(path: str) -> List[str]:
+    if os.path.isdir(path):
+        found = set()
+        for pattern in SOURCE_PATTERNS:
+            found.update(glob.glob(os.path.join(path, "**", pattern), recursive=True))
+        return sorted(found)
+    if is_multi_source(path):
+        return sorted(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+    return [path]
+
+
+def shard_prefix(path: str, root: str) -> str:
+    # Keys are namespaced by the shard's path so two shards never share one.
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    return os.path.splitext(relative)[0].replace(os.sep, "/")
+
+
+def _ingest_shard(path: str, prefix: str, chunk_size: int) -> Tuple[PropertyStore, IngestStats]:
+    def make_key(record, idx):
+        return record["id"] or f"{prefix}/{derived_key(record, idx)}"
+
+    # One unreadable shard is reported on its own instead of failing the whole load.
+    try:
+        return ingest(path, chunk_size=chunk_size, make_key=make_key)
+    except (OSError, ImportError) as e:
+        stats = IngestStats(path)
+        stats.failure = str(e)
+        return PropertyStore(capacity=1), stats
+
+
+def ingest_many(
+    path: str,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[IngestStats], None]] = None,
+) -> Tuple[PropertyStore, List[IngestStats]]:
+    """Ingest every shard under a directory or glob, parsing shards in parallel.
+
+    Each worker process builds a private store for its shard; the parent
+    merges them in sorted shard order, so keys and row order do not depend
+    on which worker finishes first. A listing id already loaded from an
+    earlier shard is skipped and counted against the later shard.
+    """
+    shards = expand_sources(path)
+    root = path if os.path.isdir(path) else os.path.commonpath([os.path.abspath(os.path.dirname(s)) for s in shards or ["."]])
+    prefixes = [shard_prefix(s, root) for s in shards]
+    chunk_sizes = [chunk_size] * len(shards)
+    store = PropertyStore(capacity=chunk_size)
+    all_stats = []
+
+    def merge(results):
+        for shard_store, stats in results:
+            duplicates = [key for key in shard_store if key in store]
+            if duplicates:
+                shard_store.delete(duplicates)
+                stats.errors["duplicate id"] += len(duplicates)
+                stats.rows_loaded -= len(duplicates)
+            store.append_store(shard_store)
+            all_stats.append(stats)
+            if progress:
+                progress(stats)
+
+    if workers == 1 or len(shards) <= 1:
+        merge(map(_ingest_shard, shards, prefixes, chunk_sizes))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            merge(pool.map(_ingest_shard, shards, prefixes, chunk_sizes))
+    return store, all_stats
+
+
+def apply_delta(
+    store: PropertyStore,
+    path: str,
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[IngestStats], None]] = None,
+) -> IngestStats:
+    """Apply a delta feed of upserts and deletes to ``store`` in place.
+
+    Every row needs a listing id (see ``ID_FIELDS``). Rows whose ``action``
+    column says ``delete`` remove that listing; all other rows are full
+    records that insert or replace it. Within a chunk the last row for a
+    key wins.
+    """
+    stats = IngestStats(path)
+    for chunk in chunked(read_rows(path, stats), chunk_size):
+        latest: Dict[str, Optional[dict]] = {}
+        for _, row in chunk:
+            key = listing_id(row)
+            if not key:
+                stats.errors["missing id"] += 1
+                continue
+            if str(row.get("action") or "").strip().lower() == "delete":
+                latest[key] = None
+                continue
+            try:
+                latest[key] = normalise_row(row)
+            except RowError as e:
+                stats.errors[e.reason] += 1
+        upserts = [(key, record) for key, record in latest.items() if record is not None]
+        deletes = [key for key, record in latest.items() if record is None]
+        if upserts:
+            updated, inserted = store.upsert_columns(
+                [key for key, _ in upserts], records_to_columns(record for _, record in upserts)
+            )
+            stats.updated += len(updated)
+            stats.inserted += len(inserted)
+            stats.rows_loaded += len(upserts)
+        if deletes:
+            stats.deleted += len(store.delete(deletes))
+        stats.chunks += 1
+        if progress:
+            progress(stats)
+    return stats
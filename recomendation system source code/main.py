@@ -1,258 +1,487 @@
-import csv
-from typing import Dict
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
 
-class Property:
-    def __init__(
-        self,
-        type: str,
-        price: float,
-        bedrooms: int,
-        bathrooms: int,
-        area: float,
-        furnished: str,
-        level: str,
-        compound: str,
-        payment_option: str,
-        delivery_date: str,
-        delivery_term: str,
-        city: str,
-    ):
-        self.type = type
-        self.price = price
-        self.bedrooms = bedrooms
-        self.bathrooms = bathrooms
-        self.area = area
-        self.furnished = furnished
-        self.level = level
-        self.compound = compound
-        self.payment_option = payment_option
-        self.delivery_date = delivery_date
-        self.delivery_term = delivery_term
-        self.city = city
-
-    def to_dict(self):
-        return {
-            "type": self.type,
-            "price": self.price,
-            "bedrooms": self.bedrooms,
-            "bathrooms": self.bathrooms,
-            "area": self.area,
-            "furnished": self.furnished,
-            "level": self.level,
-            "compound": self.compound,
-            "payment_option": self.payment_option,
-            "delivery_date": self.delivery_date,
-            "delivery_term": self.delivery_term,
-            "city": self.city,
-        }
+from commands import Command, free_terms, parse_command
+from metrics import Metrics, cache_samples, log_to_stderr, registry
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from favorites import FavoritesDB
+    from similarity import SimilarityIndex
+    from stats import CatalogueStats
+    from store import PropertyStore
+    from valuation import ValuationIndex
+    from vocabulary import Vocabulary
+
+# numpy, the store and everything built on it are imported where first
+# needed, so the prompt (or window) comes up before any of that is loaded.
+
+
+def __getattr__(name):
+    # ``Property`` moved to store.py; ``from main import Property`` still works
+    # without importing numpy along with main.
+    if name == "Property":
+        from store import Property
+
+        return Property
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class DataLoader:
+    # Diagnostics go to stderr, so stdout carries only replies (batch.py writes JSON lines there).
     @staticmethod
-    def load_properties_csv(filename="properties.csv") -> Dict[str, Property]:
-        properties = {}
+    def load_properties(
+        filename="properties.csv", use_snapshot=True, chunk_size=None, progress=None, workers=None
+    ) -> "PropertyStore":
+        from ingest import CHUNK_SIZE, ingest, is_multi_source
+        from snapshot import load_snapshot, write_snapshot
+        from store import PropertyStore
+
+        chunk_size = chunk_size or CHUNK_SIZE
+        if is_multi_source(filename):
+            return DataLoader.load_shards(filename, chunk_size=chunk_size, progress=progress, workers=workers)
+        if use_snapshot:
+            store = load_snapshot(filename)
+            if store is not None:
+                return store
         try:
-            with open(filename, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                reader.fieldnames = [h.strip().lower() for h in reader.fieldnames]
-                for idx, row in enumerate(reader):
-                    row = {k.strip().lower(): v for k, v in row.items()}
-                    prop = Property(
-                        type=row.get("type", ""),
-                        price=float(row.get("price", 0)),
-                        bedrooms=int(float(row.get("bedrooms", 0))),
-                        bathrooms=int(float(row.get("bathrooms", 0))),
-                        area=float(row.get("area", 0)),
-                        furnished=row.get("furnished", ""),
-                        level=row.get("level", ""),
-                        compound=row.get("compound", ""),
-                        payment_option=row.get("payment_option", ""),
-                        delivery_date=row.get("delivery_date", ""),
-                        delivery_term=row.get("delivery_term", ""),
-                        city=row.get("city", ""),
-                    )
-                    properties[f"{prop.compound.lower().replace(' ', '_')}_{idx}"] = prop
-        except Exception as e:
-            print(f"Error loading properties: {e}")
-        return properties
+            store, stats = ingest(filename, chunk_size=chunk_size, progress=progress)
+        except (OSError, ImportError) as e:
+            print(f"Error loading properties: {e}", file=sys.stderr)
+            return PropertyStore()
+        if stats.rows_rejected:
+            print(stats.summary(), file=sys.stderr)
+        store.build_indexes()
+        if use_snapshot:
+            try:
+                write_snapshot(store, filename)
+            except OSError as e:
+                print(f"Could not write snapshot: {e}", file=sys.stderr)
+        return store
+
+    @staticmethod
+    def load_shards(pattern, chunk_size=None, progress=None, workers=None) -> "PropertyStore":
+        from ingest import CHUNK_SIZE, ingest_many
+
+        store, all_stats = ingest_many(pattern, workers=workers, chunk_size=chunk_size or CHUNK_SIZE, progress=progress)
+        if not all_stats:
+            print(f"Error loading properties: no data files match {pattern}", file=sys.stderr)
+        for stats in all_stats:
+            if stats.rows_rejected or stats.failure:
+                print(stats.summary(), file=sys.stderr)
+        store.build_indexes()
+        return store
+
+    @staticmethod
+    def load_properties_csv(filename="properties.csv", use_snapshot=True) -> "PropertyStore":
+        # The store is a read-only ``key -> Property`` mapping, so callers of the
+        # old dict-returning loader can keep indexing and iterating the result.
+        return DataLoader.load_properties(filename, use_snapshot=use_snapshot)
+
+class Catalogue:
+    """The shared half of the chatbot: the store plus the caches derived from it.
+
+    One catalogue can back any number of ``RealEstateChatbot`` sessions.
+    Sessions only read from it; updates go through ``apply_delta`` and each
+    session catches up on its next message. A ``deferred`` catalogue loads
+    its store the first time something asks for it.
+    """
+
+    def __init__(self, store: "PropertyStore" = None, loader=None):
+        self._store = store
+        self._loader = loader
+        self._query_cache = None
+        self._sort_orders = None
+        self._stats = None
+        self._valuation = None
+        self._vocabulary = None
+        self._similarity = None
+        self._live_rows = None
+        self._live_version = None
+
+    @classmethod
+    def load(cls, data_file="properties.csv", use_snapshot=True, progress=None) -> "Catalogue":
+        catalogue = cls(DataLoader.load_properties(data_file, use_snapshot=use_snapshot, progress=progress))
+        catalogue.vocabulary
+        return catalogue
+
+    @classmethod
+    def deferred(cls, data_file="properties.csv", use_snapshot=True, progress=None) -> "Catalogue":
+        return cls(loader=lambda: DataLoader.load_properties(data_file, use_snapshot=use_snapshot, progress=progress))
+
+    @property
+    def loaded(self) -> bool:
+        return self._store is not None
+
+    @property
+    def store(self) -> "PropertyStore":
+        if self._store is None:
+            self._store = self._loader()
+            self.vocabulary
+        return self._store
+
+    @property
+    def query_cache(self):
+        if self._query_cache is None:
+            from cache import QueryCache
+
+            self._query_cache = QueryCache()
+        return self._query_cache
+
+    @property
+    def sort_orders(self):
+        if self._sort_orders is None:
+            from sorting import SortOrders
+
+            self._sort_orders = SortOrders(self.store, computed={"value": lambda: self.valuation.deviation})
+        return self._sort_orders
+
+    @property
+    def stats(self) -> "CatalogueStats":
+        if self._stats is None:
+            from stats import CatalogueStats
+
+            self._stats = CatalogueStats(self.store)
+        return self._stats
+
+    @property
+    def vocabulary(self) -> "Vocabulary":
+        # Built with the store; rebuilt only when updates bring new distinct values.
+        if self._vocabulary is None or not self._vocabulary.current(self.store):
+            from vocabulary import Vocabulary
+
+            self._vocabulary = Vocabulary(self.store)
+        return self._vocabulary
+
+    @property
+    def valuation(self) -> "ValuationIndex":
+        # Rebuilt for each store version; every session shares the current one.
+        if self._valuation is None or self._valuation.version != self.store.version:
+            from valuation import ValuationIndex
+
+            self._valuation = ValuationIndex(self.store)
+        return self._valuation
+
+    def metric_samples(self):
+        """Prometheus samples for the shared caches, without creating any."""
+        samples = cache_samples(self._query_cache.info() if self._query_cache is not None else None)
+        if self.loaded:
+            samples.append(("catalogue_rows", "gauge", "Live listings in the catalogue.", len(self.store)))
+        return samples
+
+    def live_rows(self) -> "np.ndarray":
+        # One read-only array shared by every session listing the whole catalogue.
+        if self._live_version != self.store.version:
+            self._live_rows = self.store.live_rows()
+            self._live_rows.flags.writeable = False
+            self._live_version = self.store.version
+        return self._live_rows
+
+    def similarity(self) -> "SimilarityIndex":
+        if self._similarity is None:
+            from similarity import SimilarityIndex
+
+            self._similarity = SimilarityIndex(self.store)
+        return self._similarity
+
+    def warm(self):
+        """Build the shared indexes now rather than on the first request that needs them."""
+        self.valuation
+        self.similarity()
+        self.stats.refresh()
+
+    def apply_delta(self, path: str):
+        from ingest import apply_delta
+
+        return apply_delta(self.store, path)
+
+DEFAULT_USER = "default"
+# Earlier result sets a session keeps for "undo".
+UNDO_DEPTH = 10
 
 class RealEstateChatbot:
-    def __init__(self, data_file="properties.csv"):
-        self.data_loader = DataLoader()
-        self.properties = self.data_loader.load_properties_csv(data_file)
+    def __init__(
+        self, data_file="properties.csv", use_snapshot=True, catalogue=None, favorites_db=None, metrics=None, export_dir=None
+    ):
+        self.catalogue = catalogue if catalogue is not None else Catalogue.deferred(data_file, use_snapshot=use_snapshot)
+        self.metrics: Metrics = metrics if metrics is not None else registry
+        # When set (server and batch mode), exports may only be written below this directory.
+        self.export_dir = export_dir
+        self.timings = {}
+        self.version = None
+        self.favorites_db = favorites_db
         self.favorites = []
         self.last_results = None
+        self.last_query = None
+        self.history = deque(maxlen=UNDO_DEPTH)
         self.page = 0
         self.page_size = 10
-        self.user = "default"
+        self.user = DEFAULT_USER
+
+    @property
+    def store(self) -> "PropertyStore":
+        return self.catalogue.store
+
+    @property
+    def properties(self) -> "PropertyStore":
+        # Kept for callers of the old ``key -> Property`` dict; the store is a
+        # read-only mapping over the live listings.
+        return self.store
+
+    @property
+    def db(self) -> "FavoritesDB":
+        # Opened on first use, so sessions that never touch favorites never touch disk.
+        if self.favorites_db is None:
+            from favorites import FavoritesDB
+
+            self.favorites_db = FavoritesDB.shared()
+        return self.favorites_db
+
+    @property
+    def autosave(self) -> bool:
+        # Named users' favorites are written behind on every change; the shared
+        # default user keeps the old explicit save/load behaviour.
+        return self.user != DEFAULT_USER
+
+    @contextmanager
+    def timed(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
 
     def process_input(self, message: str) -> str:
-        msg = message.lower()
-        if "list" in msg:
+        # Every message is counted and timed per stage, even when it fails.
+        start = time.perf_counter()
+        self.timings = {}
+        command = None
+        error = True
+        try:
+            if self.catalogue.loaded and self.version != self.store.version:
+                self.sync_with_store()
+            with self.timed("parse"):
+                command = parse_command(message)
+            reply = self.dispatch(command)
+            error = False
+            return reply
+        finally:
+            intent = command.intent if command is not None else "unknown"
+            self.metrics.record(intent, time.perf_counter() - start, self.timings, command, error)
+
+    def dispatch(self, command: Command) -> str:
+        intent = command.intent
+        if intent == "list":
             self.page = 0
             return self.list_properties()
-        elif "find" in msg or "filter" in msg or "search" in msg:
+        elif intent == "filter":
             self.page = 0
-            return self.filter_properties(msg)
-        elif "sort" in msg:
-            return self.sort_results(msg)
-        elif "next" in msg:
+            return self.filter_properties(command)
+        elif intent == "refine":
+            return self.refine_results(command)
+        elif intent == "undo":
+            return self.undo_filter()
+        elif intent == "sort":
+            return self.sort_results(command)
+        elif intent == "next":
             return self.next_page()
-        elif "previous" in msg:
+        elif intent == "previous":
             return self.previous_page()
-        elif "compare" in msg:
-            return self.compare_properties(msg)
-        elif "details" in msg:
-            return self.show_details(msg)
-        elif "show favorites" in msg:
+        elif intent == "compare":
+            return self.compare_properties(command)
+        elif intent == "similar":
+            return self.similar_properties(command)
+        elif intent == "value":
+            return self.value_property(command)
+        elif intent == "details":
+            return self.show_details(command)
+        elif intent == "show_favorites":
             return self.show_favorites()
-        # Accept both "remove favorite" and "remove ... favorites"
-        elif "remove favorite" in msg or ("remove" in msg and ("favorite" in msg or "favorites" in msg)):
-            return self.remove_favorite(msg)
-        elif "favorite" in msg or "save" in msg:
-            return self.handle_favorites(msg)
-        elif "export favorites" in msg:
-            return self.export_favorites()
-        elif "export" in msg:
-            return self.export_results()
-        elif "save favorites" in msg:
+        elif intent == "remove_favorite":
+            return self.remove_favorite(command)
+        elif intent == "export_favorites":
+            return self.export_favorites(command)
+        elif intent == "save_favorites":
             return self.save_favorites()
-        elif "load favorites" in msg:
+        elif intent == "load_favorites":
             return self.load_favorites()
-        elif "user" in msg:
-            return self.switch_user(msg)
-        elif "help" in msg:
+        elif intent == "add_favorite":
+            return self.handle_favorites(command)
+        elif intent == "export":
+            return self.export_results(command)
+        elif intent == "user":
+            return self.switch_user(command)
+        elif intent == "save_search":
+            return self.save_search(command)
+        elif intent == "run_search":
+            return self.run_search(command)
+        elif intent == "delete_search":
+            return self.delete_search(command)
+        elif intent == "list_searches":
+            return self.list_searches()
+        elif intent == "stats":
+            return self.show_stats(command)
+        elif intent == "help":
             return self.help_message()
         else:
             return "I'm not sure what you mean. Type 'help' to see what I can do!"
 
     def list_properties(self) -> str:
-        if not self.properties:
+        if not len(self.store):
             return "No properties found."
-        props = list(self.properties.values())
-        self.last_results = [(k, v) for k, v in zip(self.properties.keys(), props)]
+        from results import ResultSet
+
+        self.remember_results()
+        with self.timed("query"):
+            self.last_results = ResultSet(self.catalogue.live_rows())
         return self.show_page()
 
-    def filter_properties(self, msg: str) -> str:
-        import re
-        results = []
-        area_min = area_max = price_min = price_max = bedrooms_min = bedrooms_max = bathrooms_min = bathrooms_max = None
+    def filter_properties(self, command: Command) -> str:
+        from results import ResultSet
 
-        # Area filters
-        area_between = re.search(r"area (?:between|from) (\d+)[^\d]+(\d+)", msg)
-        if area_between:
-            area_min = float(area_between.group(1))
-            area_max = float(area_between.group(2))
-        else:
-            area_over = re.search(r"area (?:over|greater than|above) (\d+)", msg)
-            area_under = re.search(r"area (?:under|less than|below) (\d+)", msg)
-            if area_over:
-                area_min = float(area_over.group(1))
-            if area_under:
-                area_max = float(area_under.group(1))
-
-        # Price filters
-        price_between = re.search(r"price (?:between|from) (\d+)[^\d]+(\d+)", msg)
-        if price_between:
-            price_min = int(price_between.group(1))
-            price_max = int(price_between.group(2))
-        else:
-            price_over = re.search(r"price (?:over|greater than|above) (\d+)", msg)
-            price_under = re.search(r"price (?:under|less than|below) (\d+)", msg)
-            if price_over:
-                price_min = int(price_over.group(1))
-            if price_under:
-                price_max = int(price_under.group(1))
-
-        # Bedrooms min
-        bedrooms_match = re.search(r"bedrooms? (?:at least|>=|more than|over) (\d+)", msg)
-        if bedrooms_match:
-            bedrooms_min = int(bedrooms_match.group(1))
-        # Bedrooms max
-        bedrooms_under = re.search(r"bedrooms? (?:under|less than|below) (\d+)", msg)
-        if bedrooms_under:
-            bedrooms_max = int(bedrooms_under.group(1)) - 1
-
-        # Bathrooms min
-        bathrooms_match = re.search(r"bathrooms? (?:at least|>=|more than|over) (\d+)", msg)
-        if bathrooms_match:
-            bathrooms_min = int(bathrooms_match.group(1))
-        # Bathrooms max
-        bathrooms_under = re.search(r"bathrooms? (?:under|less than|below) (\d+)", msg)
-        if bathrooms_under:
-            bathrooms_max = int(bathrooms_under.group(1)) - 1
-
-        for key, prop in self.properties.items():
-            # Location filter
-            if "new cairo" in msg and "new cairo" not in prop.city.lower():
-                continue
-            if "zayed" in msg and "zayed" not in prop.city.lower():
-                continue
-            if "madinaty" in msg and "madinaty" not in prop.city.lower():
-                continue
-            if "cairo" in msg and "new cairo" not in msg and "cairo" not in prop.city.lower():
-                continue
-            # Type filter
-            if "apartment" in msg and "apartment" not in prop.type.lower():
-                continue
-            if "villa" in msg and "villa" not in prop.type.lower():
-                continue
-            # Price filter
-            if price_min is not None and prop.price < price_min:
-                continue
-            if price_max is not None and prop.price > price_max:
-                continue
-            # Area filter
-            if area_min is not None and prop.area < area_min:
-                continue
-            if area_max is not None and prop.area > area_max:
-                continue
-            # Bedrooms filter
-            if bedrooms_min is not None and prop.bedrooms < bedrooms_min:
-                continue
-            if bedrooms_max is not None and prop.bedrooms > bedrooms_max:
-                continue
-            # Bathrooms filter
-            if bathrooms_min is not None and prop.bathrooms < bathrooms_min:
-                continue
-            if bathrooms_max is not None and prop.bathrooms > bathrooms_max:
-                continue
-            results.append((key, prop))
-        if not results:
-            self.last_results = []
-            return "No properties match your filter."
+        self.resolve(command)
+        with self.timed("query"):
+            results = self.catalogue.query_cache.evaluate(command.query(), self.store)
+        self.remember_results()
+        self.last_results = ResultSet(results)
+        self.last_query = command.text
+        if not len(results):
+            return self.unmatched_note(command) + "No properties match your filter."
+        return self.unmatched_note(command) + self.show_page()
+
+    def refine_results(self, command: Command) -> str:
+        # Narrowing only looks at the current rows, and keeps their sort order.
+        self.page = 0
+        if not self.has_results():
+            return self.filter_properties(command)
+        self.resolve(command)
+        query = command.query()
+        with self.timed("query"):
+            results = self.last_results.refine(lambda rows: query.matches(self.store, rows))
+        self.remember_results()
         self.last_results = results
+        self.last_query = f"{self.last_query} {command.text}" if self.last_query else command.text
+        if not len(results):
+            return self.unmatched_note(command) + "No results match that refinement. Type 'undo' to go back."
+        return self.unmatched_note(command) + self.show_page()
+
+    def resolve(self, command: Command):
+        # Words the grammar doesn't know are looked up among the catalogue's
+        # cities, types and compounds, allowing for typos; city and type words
+        # that are not part of a name still match as substrings.
+        if command.unmatched is not None or not command.phrases:
+            return
+        with self.timed("parse"):
+            command.values, command.unmatched, rest = self.catalogue.vocabulary.resolve(command.phrases)
+            command.terms = free_terms(rest)
+
+    @staticmethod
+    def unmatched_note(command: Command) -> str:
+        if not command.unmatched:
+            return ""
+        words = ", ".join(f"'{w}'" for w in command.unmatched)
+        return f"(No city, compound or type looks like {words}; ignored.)\n"
+
+    def remember_results(self):
+        # Result sets are never changed in place, so keeping a reference is enough.
+        if self.last_results is not None:
+            self.history.append((self.last_results, self.last_query, self.page, self.store.version))
+
+    def undo_filter(self) -> str:
+        if not self.history:
+            return "Nothing to undo."
+        results, self.last_query, page, version = self.history.pop()
+        if version != self.store.version:
+            results = results.keep(self.store.alive())
+        self.last_results = results
+        self.page = page if page * self.page_size < len(results) else 0
+        if not len(results):
+            return "Back to the previous results, which are empty."
         return self.show_page()
 
-    def sort_results(self, msg: str) -> str:
-        if not self.last_results:
+    def sort_results(self, command: Command) -> str:
+        if not self.has_results():
             return "No results to sort."
-        field = "price"
-        reverse = False
-        if "area" in msg:
-            field = "area"
-        elif "bedrooms" in msg:
-            field = "bedrooms"
-        elif "bathrooms" in msg:
-            field = "bathrooms"
-        if "desc" in msg or "descending" in msg:
-            reverse = True
-        self.last_results.sort(key=lambda x: getattr(x[1], field), reverse=reverse)
+        if any(field == "value" for field, _ in command.sort_keys):
+            # Building the valuation index is query time; ranking by it is then an ordinary sort.
+            with self.timed("query"):
+                self.catalogue.valuation
+        with self.timed("sort"):
+            self.last_results = self.catalogue.sort_orders.sort(self.last_results, command.sort_keys)
         self.page = 0
         return self.show_page()
 
+    def show_stats(self, command: Command) -> str:
+        import numpy as np
+        from stats import Summary, format_groups, group_summary
+
+        # The current results unless there are none or "all" was asked for;
+        # filters in the message ("stats villas by city") narrow either one.
+        self.resolve(command)
+        use_results = self.has_results() and command.options.get("scope") != "catalogue"
+        title = "current results" if use_results else "whole catalogue"
+        if not (command.terms or command.ranges or command.values or use_results):
+            # The whole catalogue is summarised from its precomputed aggregates.
+            with self.timed("render"):
+                if command.argument:
+                    return format_groups(command.argument, self.catalogue.stats.groups(command.argument), title)
+                return self.catalogue.stats.summary().format(title)
+        with self.timed("query"):
+            if command.terms or command.ranges or command.values:
+                rows = self.catalogue.query_cache.evaluate(command.query(), self.store)
+                if use_results:
+                    rows = np.intersect1d(rows, self.last_results.rows(), assume_unique=True)
+                title += ", filtered"
+            else:
+                rows = self.last_results.rows()
+        with self.timed("render"):
+            if not len(rows):
+                return "No listings to summarise."
+            if command.argument:
+                return format_groups(command.argument, group_summary(self.store, rows, command.argument), title)
+            return Summary.of_rows(self.store, rows).format(title)
+
+    def apply_delta(self, path: str) -> str:
+        stats = self.catalogue.apply_delta(path)
+        self.sync_with_store()
+        return stats.summary()
+
+    def sync_with_store(self):
+        # Row ids survive updates, but deleted listings must leave every per-user view.
+        self.favorites = [key for key in self.favorites if key in self.store]
+        if self.last_results is not None:
+            self.last_results = self.last_results.keep(self.store.alive())
+        self.version = self.store.version
+
+    def has_results(self) -> bool:
+        return self.last_results is not None and len(self.last_results) > 0
+
+    def result_at(self, idx: int):
+        if not self.has_results() or idx < 0 or idx >= len(self.last_results):
+            raise IndexError(idx)
+        return self.store.property_at(self.last_results[idx])
+
     def show_page(self):
-        if not self.last_results:
+        if not self.has_results():
             return "No results to show."
         start = self.page * self.page_size
         end = start + self.page_size
-        results = self.last_results[start:end]
-        return "\n".join(
-            f"{i+1+start}. {p.compound} | {p.type} | {p.city} | {p.price:,.0f} EGP | {p.bedrooms}BR/{p.bathrooms}BA | {p.area:.0f}m²"
-            for i, (k, p) in enumerate(results)
-        )
+        # The first page of a sorted result set is where its partial sort happens.
+        with self.timed("sort"):
+            rows = self.last_results.window(start, end)
+        with self.timed("render"):
+            results = self.store.properties_at(rows)
+            return "\n".join(
+                f"{i+1+start}. {p.compound} | {p.type} | {p.city} | {p.price:,.0f} EGP | {p.bedrooms}BR/{p.bathrooms}BA | {p.area:.0f}m²"
+                for i, p in enumerate(results)
+            )
 
     def next_page(self):
-        if not self.last_results:
+        if not self.has_results():
             return "No results to show."
         if (self.page + 1) * self.page_size >= len(self.last_results):
             return "No more pages."
@@ -260,49 +489,62 @@ class RealEstateChatbot:
         return self.show_page()
 
     def previous_page(self):
-        if not self.last_results:
+        if not self.has_results():
             return "No results to show."
         if self.page == 0:
             return "Already at the first page."
         self.page -= 1
         return self.show_page()
 
-    def remove_favorite(self, msg: str) -> str:
-        import re
-        idxs = re.findall(r"\d+", msg)
+    def refresh_favorites(self):
+        # A named user's list may have changed in another session or process
+        # since this one last looked; the database holds the current one.
+        if self.autosave:
+            self.favorites = [key for key in self.db.favorites(self.user) if key in self.store]
+
+    def remove_favorite(self, command: Command) -> str:
+        idxs = command.indices()
         if not idxs:
             return "Please specify a favorite number to remove."
+        self.refresh_favorites()
         idx = int(idxs[0]) - 1
         if idx < 0 or idx >= len(self.favorites):
             return "Invalid favorite number."
         removed_key = self.favorites.pop(idx)
+        if self.autosave:
+            self.db.remove_favorite(self.user, removed_key)
         return f"Removed property #{idx+1} from your favorites."
 
     def show_favorites(self) -> str:
+        self.refresh_favorites()
         if not self.favorites:
             return "You have no favorites yet."
         lines = []
         for idx, key in enumerate(self.favorites, 1):
-            prop = self.properties[key]
+            prop = self.store[key]
             lines.append(
                 f"{idx}. {prop.compound} | {prop.type} | {prop.city} | {prop.price:,.0f} EGP | {prop.bedrooms}BR/{prop.bathrooms}BA | {prop.area}m²"
             )
         return "\n".join(lines)
 
-    def show_details(self, msg: str) -> str:
-        import re
-        idxs = re.findall(r"\d+", msg)
+    def row_for_number(self, number: int):
+        # Numbers refer to the current results, or to the whole catalogue before any search.
+        idx = number - 1
+        if self.has_results() and 0 <= idx < len(self.last_results):
+            return self.last_results[idx]
+        rows = self.catalogue.live_rows()
+        if idx < 0 or idx >= len(rows):
+            return None
+        return int(rows[idx])
+
+    def show_details(self, command: Command) -> str:
+        idxs = command.indices()
         if not idxs:
             return "Please specify a property number for details."
-        idx = int(idxs[0]) - 1
-        if self.last_results and 0 <= idx < len(self.last_results):
-            prop = self.last_results[idx][1] if isinstance(self.last_results[idx], tuple) else self.last_results[idx]
-        else:
-            props = list(self.properties.values())
-            if idx < 0 or idx >= len(props):
-                return "Property not found."
-            prop = props[idx]
-        p = prop
+        row = self.row_for_number(idxs[0])
+        if row is None:
+            return "Property not found."
+        p = self.store.property_at(row)
         return (
             f"Details for {p.compound}:\n"
             f"Type: {p.type}\n"
@@ -320,72 +562,126 @@ class RealEstateChatbot:
         )
 
     def save_favorites(self):
-        filename = f"favorites_{self.user}.txt"
-        with open(filename, "w") as f:
-            for key in self.favorites:
-                f.write(key + "\n")
+        self.db.set_favorites(self.user, self.favorites)
+        self.db.flush()
         return "Favorites saved."
 
     def load_favorites(self):
+        keys = self.db.favorites(self.user)
+        if not self.db.legacy_imported(self.user):
+            if not keys:
+                keys = self.import_legacy_favorites()
+            # Recorded even when there was nothing to import, so emptying the
+            # list later never brings the old file back.
+            self.db.mark_legacy_imported(self.user)
+        self.favorites = [key for key in keys if key in self.store]
+        return "Favorites loaded." if keys else "No saved favorites found."
+
+    def import_legacy_favorites(self):
+        # One-time migration of the old per-user favorites_<user>.txt files.
         filename = f"favorites_{self.user}.txt"
-        try:
-            with open(filename, "r") as f:
-                self.favorites = [line.strip() for line in f if line.strip() in self.properties]
-            return "Favorites loaded."
-        except FileNotFoundError:
-            self.favorites = []
-            return "No favorites file found."
-
-    def export_favorites(self) -> str:
-        import pandas as pd
+        if not os.path.exists(filename):
+            return []
+        with open(filename, "r") as f:
+            keys = [line.strip() for line in f if line.strip()]
+        self.db.set_favorites(self.user, keys)
+        return keys
+
+    def export_favorites(self, command: Command) -> str:
+        self.refresh_favorites()
         if not self.favorites:
             return "No favorites to export."
-        data = [self.properties[key].to_dict() for key in self.favorites]
-        df = pd.DataFrame(data)
-        df.to_csv("exported_favorites.csv", index=False)
-        return "Exported favorites to exported_favorites.csv."
-
-    def switch_user(self, msg: str) -> str:
-        import re
-        user_match = re.search(r"user (\w+)", msg)
-        if not user_match:
+        import numpy as np
+        from export import export_rows
+
+        rows = np.array([self.store.row_of(key) for key in self.favorites], dtype=np.intp)
+        try:
+            path = self.export_path(command, "exported_favorites.csv")
+            export_rows(self.store, rows, path, compression=command.options.get("compression"))
+        except (OSError, ValueError, ImportError) as e:
+            return f"Export failed: {e}"
+        return f"Exported favorites to {path}."
+
+    def export_path(self, command: Command, default: str) -> str:
+        from export import FORMATS
+
+        # "export as jsonl" keeps the default name with that format's suffix.
+        target = command.argument or default
+        if target.lower() in FORMATS:
+            target = os.path.splitext(default)[0] + "." + target.lower()
+        if self.export_dir is None:
+            return target
+        # Remote clients name a file inside the export directory, never a path outside it.
+        if os.path.isabs(target) or os.path.splitdrive(target)[0] or ".." in target.replace("\\", "/").split("/"):
+            raise ValueError(f"{target!r} is not allowed; give a file name inside the export directory")
+        path = os.path.join(self.export_dir, target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def switch_user(self, command: Command) -> str:
+        if not command.argument:
             return "Please specify a username."
-        self.user = user_match.group(1)
+        self.user = command.argument
         self.favorites = []
         self.load_favorites()
         return f"Switched to user {self.user}."
 
-    def handle_favorites(self, msg: str) -> str:
-        import re
-        if not self.last_results:
+    def handle_favorites(self, command: Command) -> str:
+        if not self.has_results():
             return "Please list or filter properties first, then favorite by their number."
-        idxs = re.findall(r"\d+", msg)
+        idxs = command.indices()
         if not idxs:
             return "Please specify a property number to favorite."
         idx = int(idxs[0]) - 1
         try:
-            key, prop = self.last_results[idx]
+            key = self.store.key_at(self.last_results[idx])
         except IndexError:
             return "Invalid property number."
+        self.refresh_favorites()
         if key in self.favorites:
             return f"Property #{idx+1} is already in your favorites."
         self.favorites.append(key)
+        if self.autosave:
+            self.db.add_favorite(self.user, key)
         return f"Added property #{idx+1} to your favorites."
 
-    def compare_properties(self, msg: str) -> str:
-        import re
-        if not self.last_results or len(self.last_results) < 2:
+    def save_search(self, command: Command) -> str:
+        if not command.argument:
+            return "Please name the search (e.g. 'save search as cheap cairo')."
+        if not self.last_query:
+            return "Run a filter first, then save it as a search."
+        self.db.save_search(self.user, command.argument, self.last_query)
+        return f"Saved search '{command.argument}'."
+
+    def run_search(self, command: Command) -> str:
+        query = self.db.saved_searches(self.user).get(command.argument or "")
+        if query is None:
+            return "No saved search with that name. Type 'show searches' to see yours."
+        self.page = 0
+        return self.filter_properties(parse_command(query))
+
+    def delete_search(self, command: Command) -> str:
+        if not self.db.delete_search(self.user, command.argument or ""):
+            return "No saved search with that name."
+        return f"Deleted search '{command.argument}'."
+
+    def list_searches(self) -> str:
+        searches = self.db.saved_searches(self.user)
+        if not searches:
+            return "You have no saved searches yet."
+        return "\n".join(f"{i}. {name}: {query}" for i, (name, query) in enumerate(searches.items(), 1))
+
+    def compare_properties(self, command: Command) -> str:
+        if not self.has_results() or len(self.last_results) < 2:
             return "Please list or filter properties first, then compare by their numbers."
-        ids = re.findall(r"\d+", msg)
+        ids = command.indices()
         if len(ids) < 2:
             return "Please specify two property numbers to compare (e.g., 'compare 1 and 2')."
         try:
             idx1 = int(ids[0]) - 1
             idx2 = int(ids[1]) - 1
-            item1 = self.last_results[idx1]
-            item2 = self.last_results[idx2]
-            p1 = item1[1] if isinstance(item1, tuple) else item1
-            p2 = item2[1] if isinstance(item2, tuple) else item2
+            p1 = self.result_at(idx1)
+            p2 = self.result_at(idx2)
         except (IndexError, ValueError):
             return "Invalid property numbers for comparison."
         return (
@@ -403,39 +699,113 @@ class RealEstateChatbot:
             f"  Payment: {p2.payment_option}"
         )
 
-    def export_results(self) -> str:
-        import pandas as pd
-        if not self.last_results:
+    def value_property(self, command: Command) -> str:
+        idxs = command.indices()
+        if not idxs:
+            # "best value" ranks the current results by their deviation from comparables.
+            if not self.has_results():
+                return "Please list or filter properties first, or ask about one (e.g. 'value 7')."
+            return self.sort_results(Command("sort", sort_keys=[("value", False)]))
+        row = self.row_for_number(idxs[0])
+        if row is None:
+            return "Property not found."
+        with self.timed("query"):
+            valuation = self.catalogue.valuation
+        with self.timed("render"):
+            return valuation.describe(row, idxs[0])
+
+    def similar_properties(self, command: Command) -> str:
+        idxs = command.indices()
+        if not idxs:
+            return "Please specify a property number (e.g. 'similar to 3')."
+        row = self.row_for_number(idxs[0])
+        if row is None:
+            return "Property not found."
+        with self.timed("query"):
+            rows, _ = self.catalogue.similarity().similar(row, k=self.page_size)
+        p = self.store.property_at(row)
+        from results import ResultSet
+
+        self.remember_results()
+        self.last_results = ResultSet(rows)
+        self.page = 0
+        return f"Listings similar to {p.compound} | {p.type} | {p.city}:\n" + self.show_page()
+
+    def export_results(self, command: Command) -> str:
+        if not self.has_results():
             return "No results to export."
-        data = [p.to_dict() if hasattr(p, "to_dict") else p[1].to_dict() for p in self.last_results]
-        df = pd.DataFrame(data)
-        df.to_csv("exported_properties.csv", index=False)
-        return "Exported current results to exported_properties.csv."
+        from export import export_rows
+
+        try:
+            path = self.export_path(command, "exported_properties.csv")
+            export_rows(self.store, self.last_results.rows(), path, compression=command.options.get("compression"))
+        except (OSError, ValueError, ImportError) as e:
+            return f"Export failed: {e}"
+        return f"Exported current results to {path}."
 
-    def help_message(self) -> str:
+    @staticmethod
+    def help_message() -> str:
         return (
             "I can help you with:\n"
             "- Listing all properties\n"
             "- Filtering by price, area, bedrooms, bathrooms, or location\n"
             "- Combined filters (e.g. 'filter zayed apartment area under 150 price under 2000000')\n"
             "- Range filters (e.g. 'area between 100 and 200')\n"
-            "- Sorting results (e.g. 'sort by price ascending')\n"
+            "- Narrowing the current results (e.g. 'now only 3 bedrooms', 'refine price under 2000000'), then 'undo'\n"
+            "- Sorting results (e.g. 'sort by price ascending', 'sort by bedrooms desc then price')\n"
+            "- Sorting by price per m² or delivery date (e.g. 'sort by price per m2', 'sort by delivery')\n"
             "- Pagination (type 'next' or 'previous')\n"
             "- Comparing properties (e.g. 'compare 1 and 2')\n"
+            "- Finding similar listings (e.g. 'similar to 3')\n"
+            "- Valuing a listing against comparables (e.g. 'value 7', 'is 7 a good deal', 'sort by best value')\n"
+            "- Market statistics (e.g. 'stats', 'stats villas by city', 'stats all')\n"
             "- Showing property details (e.g. 'details 3')\n"
             "- Managing your favorites (add, remove, show, save, load, export)\n"
+            "- Saved searches (e.g. 'save search as cheap cairo', 'run search cheap cairo', 'show searches')\n"
             "- User profiles (e.g. 'user alice')\n"
-            "- Exporting results\n"
+            "- Exporting results (e.g. 'export to results.jsonl.gz', 'export favorites to favs.parquet with zstd')\n"
             "Type 'exit' to quit."
         )
 
 if __name__ == "__main__":
-    bot = RealEstateChatbot()
+    import argparse
+
+    from startup import StartupProfile
+
+    parser = argparse.ArgumentParser(description="Real estate chatbot (text mode).")
+    parser.add_argument("--profile-startup", action="store_true", help="report where start-up and the first reply spend time")
+    parser.add_argument("--data", default="properties.csv", help="catalogue file, directory or glob")
+    parser.add_argument("--progress", action="store_true", help="report progress on stderr while the catalogue loads")
+    parser.add_argument("--metrics-file", help="write a Prometheus metrics snapshot here after every reply")
+    parser.add_argument("--slow-ms", type=float, help=f"log messages slower than this many ms (default {registry.slow_seconds * 1000:g})")
+    args = parser.parse_args()
+    if args.slow_ms is not None:
+        registry.slow_seconds = args.slow_ms / 1000
+    if args.slow_ms is not None or args.metrics_file:
+        log_to_stderr()
+    profile = StartupProfile(args.profile_startup)
+    progress = None
+    if args.progress:
+        from ingest import print_progress as progress
+    bot = RealEstateChatbot(catalogue=Catalogue.deferred(args.data, progress=progress))
     print("Welcome to the Real Estate Chatbot!")
     print("Type 'help' for available commands. Type 'exit' to quit.")
-    while True:
-        user_input = input("> ")
-        if user_input.strip().lower() in ["exit", "quit"]:
-            print("Goodbye!")
-            break
-        print(bot.process_input(user_input))
\ No newline at end of file
+    profile.mark("ready for input")
+    try:
+        while True:
+            with profile.idle():
+                user_input = input("> ")
+            if user_input.strip().lower() in ["exit", "quit"]:
+                print("Goodbye!")
+                break
+            print(bot.process_input(user_input))
+            if args.metrics_file:
+                registry.write(args.metrics_file, bot.catalogue.metric_samples())
+            if profile.enabled and bot.catalogue.loaded:
+                profile.mark("first reply that needed the catalogue")
+                profile.report()
+    except (EOFError, KeyboardInterrupt):
+        print()
+    finally:
+        # Sessions that never needed the catalogue still get their report at exit.
+        profile.report()
\ No newline at end of file
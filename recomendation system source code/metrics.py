@@ -0,0 +1,150 @@
+import bisect
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Requests slower than this are logged with their parsed constraints.
+SLOW_QUERY_SECONDS = 0.25
+PREFIX = "realestate"
+
+slow_log = logging.getLogger("realestate.slow_queries")
+# Silent unless the application asks for the log (see ``log_to_stderr``), so
+# the interactive prompt and the window never get warnings written across them.
+slow_log.addHandler(logging.NullHandler())
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterable[Tuple[str, int]]:
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield ("+Inf" if bound == float("inf") else repr(bound)), total
+
+
+class Metrics:
+    """Per-intent request counters and latency histograms for each stage.
+
+    ``record`` is called once per handled message with the time spent in
+    each stage (parse, query, sort, render) and overall. ``prometheus``
+    renders everything in the Prometheus text exposition format.
+    """
+
+    def __init__(self, slow_seconds: float = SLOW_QUERY_SECONDS):
+        self.slow_seconds = slow_seconds
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.slow: Counter = Counter()
+        self.latency: Dict[str, Histogram] = {}
+        self.stages: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, intent: str, seconds: float, stages: Dict[str, float], command=None, error: bool = False):
+        with self._lock:
+            self.requests[intent] += 1
+            if error:
+                self.errors[intent] += 1
+            self.latency.setdefault(intent, Histogram()).observe(seconds)
+            for stage, value in stages.items():
+                self.stages.setdefault((stage, intent), Histogram()).observe(value)
+            slow = seconds >= self.slow_seconds
+            if slow:
+                self.slow[intent] += 1
+        if slow:
+            slow_log.warning(
+                "slow %s request took %.1f ms: %r terms=%r ranges=%r values=%r sort=%r stages=%s",
+                intent,
+                seconds * 1e3,
+                getattr(command, "text", ""),
+                getattr(command, "terms", {}),
+                getattr(command, "ranges", {}),
+                getattr(command, "values", {}),
+                getattr(command, "sort_keys", []),
+                ", ".join(f"{s}={v * 1e3:.1f}ms" for s, v in stages.items()),
+            )
+
+    def prometheus(self, extra: Iterable[Tuple[str, str, str, float]] = ()) -> str:
+        """Text-format snapshot; ``extra`` adds ``(name, type, help, value)`` samples."""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def histogram(name, labels, hist):
+            for bound, total in hist.cumulative():
+                lines.append(f'{PREFIX}_{name}_bucket{{{labels},le="{bound}"}} {total}')
+            lines.append(f"{PREFIX}_{name}_sum{{{labels}}} {hist.sum!r}")
+            lines.append(f"{PREFIX}_{name}_count{{{labels}}} {hist.count}")
+
+        with self._lock:
+            for name, counts, help_text in (
+                ("requests_total", self.requests, "Messages handled, by intent."),
+                ("request_errors_total", self.errors, "Messages that raised an error, by intent."),
+                ("slow_requests_total", self.slow, f"Messages slower than {self.slow_seconds}s, by intent."),
+            ):
+                header(name, "counter", help_text)
+                for intent, count in sorted(counts.items()):
+                    lines.append(f'{PREFIX}_{name}{{intent="{intent}"}} {count}')
+            header("request_seconds", "histogram", "End-to-end message latency, by intent.")
+            for intent, hist in sorted(self.latency.items()):
+                histogram("request_seconds", f'intent="{intent}"', hist)
+            header("stage_seconds", "histogram", "Latency of each stage (parse, query, sort, render), by intent.")
+            for (stage, intent), hist in sorted(self.stages.items()):
+                histogram("stage_seconds", f'stage="{stage}",intent="{intent}"', hist)
+        for name, kind, help_text, value in extra:
+            header(name, kind, help_text)
+            lines.append(f"{PREFIX}_{name} {value!r}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, extra: Iterable[Tuple[str, str, str, float]] = ()):
+        """Write a snapshot for a file-based scraper (e.g. node_exporter's textfile collector)."""
+        tmp = f"{path}.part"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus(extra))
+        os.replace(tmp, path)
+
+
+# Process-wide registry used by chatbots unless they are given their own.
+registry = Metrics()
+
+
+def log_to_stderr():
+    """Write the ``realestate`` loggers (slow requests, server errors) to stderr.
+
+    For the server and batch consoles, and the text chatbot when ``--slow-ms``
+    or ``--metrics-file`` is given. Calling it again adds no second handler.
+    """
+    logger = logging.getLogger(PREFIX)
+    if not any(getattr(h, "_realestate", False) for h in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handler._realestate = True
+        logger.addHandler(handler)
+
+
+def cache_samples(info: Optional[Dict[str, int]]) -> List[Tuple[str, str, str, float]]:
+    """Prometheus samples for a ``QueryCache.info()`` dict."""
+    if not info:
+        return []
+    return [
+        ("query_cache_hits_total", "counter", "Filter results served from the query cache.", info["hits"]),
+        ("query_cache_misses_total", "counter", "Filters evaluated against the store.", info["misses"]),
+        ("query_cache_evictions_total", "counter", "Query cache entries evicted.", info["evictions"]),
+        ("query_cache_entries", "gauge", "Query cache entries held.", info["entries"]),
+        ("query_cache_rows", "gauge", "Row ids held by the query cache.", info["rows"]),
+    ]
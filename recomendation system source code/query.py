@@ -0,0 +1,127 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from store import PropertyStore
+
+RANGE_FIELDS = ("price", "area", "bedrooms", "bathrooms")
+# Above this fraction of the catalogue a sequential mask scan beats gathering
+# candidates through an index.
+SCAN_FRACTION = 0.25
+
+
+class Query:
+    """Compiled filter over a PropertyStore.
+
+    ``terms`` maps a category field to substrings that must all appear in the
+    (lower-cased) value; ``values`` maps a category field to exact values of
+    which any one may match; ``ranges`` maps a numeric field to an inclusive
+    ``(low, high)`` pair where either bound may be None.
+    """
+
+    def __init__(
+        self,
+        terms: Optional[Dict[str, Sequence[str]]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        values: Optional[Dict[str, Sequence[str]]] = None,
+    ):
+        self.terms = {f: tuple(t) for f, t in (terms or {}).items() if t}
+        self.ranges = {f: r for f, r in (ranges or {}).items() if r != (None, None)}
+        self.values = {f: tuple(v) for f, v in (values or {}).items() if v}
+
+    def is_empty(self) -> bool:
+        return not self.terms and not self.ranges and not self.values
+
+    def cache_key(self) -> tuple:
+        """Canonical, hashable form: equal for queries that select the same rows
+        regardless of the order their constraints were written in."""
+        terms = tuple(sorted((f, tuple(sorted(set(t)))) for f, t in self.terms.items()))
+        ranges = tuple(
+            sorted((f, tuple(None if b is None else float(b) for b in r)) for f, r in self.ranges.items())
+        )
+        values = tuple(sorted((f, tuple(sorted(set(v)))) for f, v in self.values.items()))
+        return terms, ranges, values
+
+    def tables(self, store: PropertyStore) -> Dict[str, np.ndarray]:
+        """One boolean per distinct value of each constrained category field."""
+        tables = {f: category_table(store, f, t) for f, t in self.terms.items()}
+        for field, values in self.values.items():
+            allowed = value_table(store, field, values)
+            tables[field] = tables[field] & allowed if field in tables else allowed
+        return tables
+
+    def evaluate(self, store: PropertyStore) -> np.ndarray:
+        tables = self.tables(store)
+        driver, candidates = self._drive(store, tables)
+        return self._apply(store, candidates, tables, skip=driver)
+
+    def matches(self, store: PropertyStore, rows: np.ndarray) -> np.ndarray:
+        """Boolean mask over ``rows``; costs time in ``len(rows)``, not the catalogue size."""
+        return self._mask(store, rows, self.tables(store))
+
+    def _drive(self, store: PropertyStore, tables: Dict[str, np.ndarray]):
+        # Pick the most selective indexed predicate; its rows become the
+        # candidate set that the remaining predicates are checked against.
+        best, best_count = None, store.n_rows
+        for field, (low, high) in self.ranges.items():
+            index = store.sorted_index(field)
+            if index is not None:
+                count = index.count(low, high)
+                if count < best_count:
+                    best, best_count = field, count
+        for field, table in tables.items():
+            index = store.inverted_index(field)
+            if index is not None:
+                count = index.count(np.flatnonzero(table))
+                if count < best_count:
+                    best, best_count = field, count
+        if best is None or best_count > store.n_rows * SCAN_FRACTION:
+            return None, None
+        if best in tables:
+            return best, store.inverted_index(best).rows(np.flatnonzero(tables[best]))
+        low, high = self.ranges[best]
+        return best, np.sort(store.sorted_index(best).rows(low, high))
+
+    def _apply(self, store, rows, tables, skip=None) -> np.ndarray:
+        mask = self._mask(store, rows, tables, skip)
+        return np.flatnonzero(mask) if rows is None else rows[mask]
+
+    def _mask(self, store, rows, tables, skip=None) -> np.ndarray:
+        def column(field):
+            values = store.column(field)
+            return values if rows is None else values[rows]
+
+        if rows is None:
+            # Index postings only hold live rows; a full scan must skip tombstones itself.
+            mask = store.alive().copy()
+        else:
+            mask = np.ones(len(rows), dtype=bool)
+        for field, table in tables.items():
+            if field == skip:
+                continue
+            mask &= table[column(field)] if len(table) else False
+        for field, (low, high) in self.ranges.items():
+            if field == skip:
+                continue
+            values = column(field)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+
+def value_table(store: PropertyStore, field: str, values: Sequence[str]) -> np.ndarray:
+    table = np.zeros(len(store.categories(field)), dtype=bool)
+    codes = [store.category_code(field, v) for v in values]
+    table[[c for c in codes if c >= 0]] = True
+    return table
+
+
+def category_table(store: PropertyStore, field: str, terms: Sequence[str]) -> np.ndarray:
+    # One match per distinct value; rows then index into this table by code.
+    values = store.categories(field)
+    return np.fromiter(
+        (all(t in v.lower() for t in terms) for v in values), dtype=bool, count=len(values)
+    )
+
@@ -0,0 +1,12 @@
+# Kept apart from scoring.py so the GUI can show the quiz without importing numpy.
+QUIZ_QUESTIONS = [
+    {"q": "What's your maximum budget (EGP)?", "type": "numeric"},
+    {"q": "How many bedrooms do you need?", "type": "choice", "choices": ["1", "2", "3+"]},
+    {"q": "Preferred area(s)? (comma separated)", "type": "text"},
+    {"q": "Are you looking for a new or resale unit?", "type": "choice", "choices": ["New", "Resale", "Doesn’t matter"]},
+    {"q": "What's more important to you?", "type": "choice", "choices": ["Area size", "Price", "Location", "Amenities"]},
+    {"q": "Preferred type?", "type": "choice", "choices": ["Apartment", "Villa", "Duplex", "Studio"]},
+    {"q": "Minimum required amenities? (comma separated, e.g. Garden, Parking, Pool, Elevator)", "type": "text"},
+    {"q": "What's your intended use?", "type": "choice", "choices": ["Living", "Investment", "Rental"]},
+]
+TOP_K = 3
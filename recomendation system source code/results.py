@@ -0,0 +1,91 @@
+from typing import Optional
+
+import numpy as np
+
+# Windows ending past this share of the result fall back to one full argsort,
+# which is then kept for every later page.
+PARTIAL_SORT_FRACTION = 0.1
+
+
+class ResultSet:
+    """Row ids of a search result, optionally viewed through a lazy sort.
+
+    ``key`` holds one sort value per row (ascending order). Nothing is sorted
+    up front: ``window`` selects only the rows a page needs with a partial
+    sort, and the full permutation is computed at most once, when a page
+    deep enough into the result (or the whole ordered result) is asked for.
+    Ties keep the rows' original relative order, as a stable sort would.
+    """
+
+    def __init__(self, rows: np.ndarray, key: Optional[np.ndarray] = None):
+        self._rows = rows
+        self._key = key
+        self._order = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, idx: int) -> int:
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError(idx)
+        return int(self.window(idx, idx + 1)[0])
+
+    def sorted_by(self, column: np.ndarray, descending: bool = False) -> "ResultSet":
+        """Reorder by ``column`` (indexed by row id); the current order breaks ties."""
+        rows = self.rows()
+        key = column[rows]
+        return ResultSet(rows, -key if descending else key)
+
+    def in_row_order(self) -> bool:
+        """True if the result is unsorted and its rows ascend, as query results do."""
+        return self._key is None and bool(np.all(self._rows[1:] > self._rows[:-1]))
+
+    def window(self, start: int, stop: int) -> np.ndarray:
+        """Row ids at positions ``start:stop`` of the ordered result."""
+        stop = min(stop, len(self))
+        if start >= stop:
+            return self._rows[:0]
+        if self._key is None:
+            return self._rows[start:stop]
+        if self._order is None and stop > PARTIAL_SORT_FRACTION * len(self):
+            self._order = np.argsort(self._key, kind="stable")
+        if self._order is not None:
+            return self._rows[self._order[start:stop]]
+        return self._rows[self._first(stop)[start:]]
+
+    def _first(self, k: int) -> np.ndarray:
+        # Positions of the k smallest keys in stable order, without sorting the rest.
+        key = self._key
+        kth = np.partition(key, k - 1)[k - 1]
+        if kth == kth:
+            below = np.flatnonzero(key < kth)
+            band = np.flatnonzero(key == kth)
+        else:
+            # Fewer than k numbers: NaN sorts last, as in argsort, so take them all.
+            below = np.flatnonzero(~np.isnan(key))
+            band = np.flatnonzero(np.isnan(key))
+        band = band[: k - len(below)]
+        chosen = np.concatenate([below, band])
+        return chosen[np.lexsort((chosen, key[chosen]))]
+
+    def rows(self) -> np.ndarray:
+        """Every row id in order (materialises the sort if there is one)."""
+        return self.window(0, len(self))
+
+    def refine(self, predicate) -> "ResultSet":
+        """Rows for which ``predicate`` holds, in the same (still lazy) order.
+
+        ``predicate`` maps an array of row ids to a boolean mask, so only this
+        result's rows are ever examined.
+        """
+        keep = predicate(self._rows)
+        return ResultSet(self._rows[keep], None if self._key is None else self._key[keep])
+
+    def keep(self, mask: np.ndarray) -> "ResultSet":
+        """Drop rows whose entry in ``mask`` (indexed by row id) is False."""
+        keep = mask[self._rows]
+        if keep.all():
+            return self
+        return ResultSet(self._rows[keep], None if self._key is None else self._key[keep])
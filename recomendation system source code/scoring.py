@@ -0,0 +1,98 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from quiz import QUIZ_QUESTIONS, TOP_K
+from store import PropertyStore
+
+LARGE_AREA = 150
+
+
+def score_quiz(store: PropertyStore, answers: Sequence[str], rows: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Score ``rows`` (default: every live row) against the quiz answers.
+
+    Each answer adds one point to the rows it matches. Text answers are
+    resolved once per distinct category value and broadcast through the
+    codes, so the per-row work is a handful of array operations.
+    """
+    answers = [(a or "").strip() for a in answers] + [""] * (len(QUIZ_QUESTIONS) - len(answers))
+    rows = store.live_rows() if rows is None else rows
+    price = store.column("price")[rows]
+    scores = np.zeros(len(rows), dtype=np.int32)
+
+    # Q1: Budget
+    if answers[0]:
+        try:
+            scores += price <= int(answers[0])
+        except ValueError:
+            pass
+    # Q2: Bedrooms
+    bedrooms = answers[1]
+    if bedrooms == "3+":
+        scores += store.column("bedrooms")[rows] >= 3
+    elif bedrooms.isdigit():
+        scores += store.column("bedrooms")[rows] == int(bedrooms)
+    # Q3: Area/Location
+    areas = [a.strip().lower() for a in answers[2].split(",") if a.strip()]
+    if areas:
+        def mentions(value):
+            value = value.lower()
+            return any(area in value for area in areas)
+
+        scores += _category_match(store, "city", rows, mentions) | _category_match(store, "compound", rows, mentions)
+    # Q4: New/Resale
+    unit = answers[3].lower().replace("’", "'")
+    if unit == "new":
+        scores += _category_match(store, "delivery_date", rows, lambda v: "ready" in v.lower() or "202" in v)
+    elif unit == "resale":
+        scores += _category_match(store, "delivery_date", rows, lambda v: "ready" in v.lower())
+    elif unit == "doesn't matter":
+        scores += 1
+    # Q5: Key preference (boost score)
+    priority = answers[4].lower()
+    if priority == "area size":
+        scores += store.column("area")[rows] >= LARGE_AREA
+    elif priority in ("price", "location", "amenities"):
+        scores += 1
+    # Q6: Type
+    if answers[5]:
+        wanted = answers[5].lower()
+        scores += _category_match(store, "type", rows, lambda v: wanted in v.lower())
+    # Q7/Q8: Amenities and intended use are not in the data, so any answer counts.
+    scores += bool(answers[6]) + bool(answers[7])
+    return rows, scores
+
+
+def top_matches(store: PropertyStore, answers: Sequence[str], k: int = TOP_K) -> List[Tuple[int, int]]:
+    """Return up to ``k`` ``(score, row)`` pairs, best score first, cheaper first on ties."""
+    rows, scores = score_quiz(store, answers)
+    chosen = top_k(scores, store.column("price")[rows], k)
+    return [(int(scores[i]), int(rows[i])) for i in chosen]
+
+
+def top_k(scores: np.ndarray, tiebreak: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the ``k`` highest scores (lowest ``tiebreak``, then position, on ties).
+
+    Uses partial selection, so only the boundary band is ever sorted.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    band = np.flatnonzero(scores == kth)
+    need = k - len(above)
+    if need < len(band):
+        cut = np.partition(tiebreak[band], need - 1)[need - 1]
+        band = band[tiebreak[band] <= cut]
+    chosen = np.concatenate([above, band])
+    order = np.lexsort((chosen, tiebreak[chosen], -scores[chosen]))
+    return chosen[order[:k]]
+
+
+def _category_match(store: PropertyStore, field: str, rows: np.ndarray, predicate) -> np.ndarray:
+    table = np.fromiter((predicate(v) for v in store.categories(field)), dtype=bool, count=len(store.categories(field)))
+    if not len(table):
+        return np.zeros(len(rows), dtype=bool)
+    return table[store.column(field)[rows]]
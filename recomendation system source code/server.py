@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from main import Catalogue, RealEstateChatbot
+from metrics import log_to_stderr, registry
+
+HOST = "127.0.0.1"
+PORT = 8765
+# Idle sessions beyond this many are dropped, least recently used first.
+MAX_SESSIONS = 10000
+# Client exports are confined to this directory.
+EXPORT_DIR = "exports"
+
+log = logging.getLogger("realestate.server")
+
+
+class SessionManager:
+    """Per-user chatbot sessions over one shared catalogue.
+
+    A session holds only its own favorites, results and page; the store,
+    indexes and caches live once in the catalogue. Sessions can export
+    only into ``export_dir``.
+    """
+
+    def __init__(self, catalogue: Catalogue, max_sessions: int = MAX_SESSIONS, export_dir: str = EXPORT_DIR):
+        self.catalogue = catalogue
+        self.max_sessions = max_sessions
+        self.export_dir = export_dir
+        self.sessions: "OrderedDict[str, RealEstateChatbot]" = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def new_id(self) -> str:
+        return f"session-{next(self._ids)}"
+
+    def get(self, session_id: str) -> RealEstateChatbot:
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = RealEstateChatbot(catalogue=self.catalogue, export_dir=self.export_dir)
+            self.sessions[session_id] = session
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def handle(self, session_id: str, message: str) -> str:
+        return self.get(session_id).process_input(message)
+
+    def close(self, session_id: str):
+        self.sessions.pop(session_id, None)
+
+
+class ChatServer:
+    """Line protocol over TCP.
+
+    Each request is one line, either plain text (a message for the
+    connection's own session) or a JSON object ``{"session": id, "message":
+    text}`` addressing a named session. Replies are JSON lines
+    ``{"session": id, "reply": text}``, or ``{"session": id, "error": text}``
+    when a request fails; the connection stays open either way. Commands
+    run one at a time on a single worker thread, so sessions never touch
+    the catalogue concurrently while the event loop keeps accepting
+    connections and serving metrics.
+    """
+
+    def __init__(self, manager: SessionManager):
+        self.manager = manager
+        self._commands = ThreadPoolExecutor(max_workers=1, thread_name_prefix="commands")
+
+    async def run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._commands, function, *args)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        own_session = self.manager.new_id()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = line.decode("utf-8", errors="replace").strip()
+                if not text:
+                    continue
+                if text.lower() in ("exit", "quit"):
+                    break
+                reply = await self.run(self.reply_to, text, own_session)
+                writer.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception:
+            log.exception("connection %s failed", own_session)
+        finally:
+            await self.run(self.manager.close, own_session)
+            writer.close()
+
+    def reply_to(self, text: str, own_session: str) -> dict:
+        session_id, message = self.parse_request(text, own_session)
+        if message is None:
+            return {"error": "Expected a text line or {\"session\": ..., \"message\": ...}"}
+        try:
+            return {"session": session_id, "reply": self.manager.handle(session_id, message)}
+        except Exception as e:
+            log.exception("request %r for session %s failed", message, session_id)
+            return {"session": session_id, "error": f"{type(e).__name__}: {e}"}
+
+    @staticmethod
+    def parse_request(text: str, default_session: str):
+        if not text.startswith("{"):
+            return default_session, text
+        try:
+            request = json.loads(text)
+        except ValueError:
+            return default_session, None
+        if not isinstance(request, dict) or not isinstance(request.get("message"), str):
+            return default_session, None
+        return str(request.get("session") or default_session), request["message"]
+
+    async def handle_metrics(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Just enough HTTP for a Prometheus scrape: any GET gets the snapshot.
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            if request.split(b" ", 1)[0] == b"GET":
+                status = "200 OK"
+                body = registry.prometheus(self.manager.catalogue.metric_samples())
+                body += f"# TYPE realestate_sessions gauge\nrealestate_sessions {len(self.manager)}\n"
+            else:
+                status, body = "405 Method Not Allowed", ""
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n".encode("ascii") + payload
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception:
+            log.exception("metrics request failed")
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = HOST, port: int = PORT, metrics_port: Optional[int] = None):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving on {addresses}")
+        metrics_server = None
+        if metrics_port is not None:
+            metrics_server = await asyncio.start_server(self.handle_metrics, host, metrics_port)
+            print(f"Metrics on http://{host}:{metrics_port}/metrics")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if metrics_server is not None:
+                metrics_server.close()
+                await metrics_server.wait_closed()
+            self._commands.shutdown(wait=False)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Serve chatbot sessions over a local line protocol.")
+    parser.add_argument("--data", default="properties.csv", help="catalogue file, directory or glob")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--export-dir", default=EXPORT_DIR, help="directory client exports are written to")
+    parser.add_argument("--no-snapshot", action="store_true", help="always parse the source file")
+    parser.add_argument("--progress", action="store_true", help="report progress on stderr while the catalogue loads")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics over HTTP on this port")
+    parser.add_argument("--slow-ms", type=float, help=f"log messages slower than this many ms (default {registry.slow_seconds * 1000:g})")
+    args = parser.parse_args(argv)
+    if args.slow_ms is not None:
+        registry.slow_seconds = args.slow_ms / 1000
+    log_to_stderr()
+    progress = None
+    if args.progress:
+        from ingest import print_progress as progress
+    catalogue = Catalogue.load(args.data, use_snapshot=not args.no_snapshot, progress=progress)
+    # Built before accepting connections, so no client waits on them.
+    catalogue.warm()
+    manager = SessionManager(catalogue, max_sessions=args.max_sessions, export_dir=args.export_dir)
+    try:
+        asyncio.run(ChatServer(manager).serve(args.host, args.port, args.metrics_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from typing import Tuple
+
+import numpy as np
+
+from store import PropertyStore
+
+NUMERIC_FEATURES = ("price", "area", "price_per_m2", "bedrooms", "bathrooms")
+ONE_HOT_FIELDS = ("type", "city", "furnished", "delivery_term")
+# Skewed money/size features are compared on a log scale.
+LOG_FEATURES = ("price", "area", "price_per_m2")
+# Once this share of the indexed rows has changed, a rebuild beats patching.
+REBUILD_FRACTION = 0.1
+
+
+def price_per_m2(store: PropertyStore, rows: np.ndarray) -> np.ndarray:
+    price = store.column("price")[rows]
+    area = store.column("area")[rows]
+    return np.divide(price, area, out=np.zeros(len(rows)), where=area > 0)
+
+
+class FeatureEncoder:
+    """Maps rows to standardised numeric features plus one-hot category columns.
+
+    Scaling and vocabularies are frozen when the encoder is built, so rows
+    encoded later (after catalogue updates) land in the same space.
+    """
+
+    def __init__(self, store: PropertyStore, rows: np.ndarray):
+        raw = self._numeric(store, rows)
+        self.mean = raw.mean(axis=0) if len(rows) else np.zeros(raw.shape[1])
+        std = raw.std(axis=0) if len(rows) else np.ones(raw.shape[1])
+        self.std = np.where(std > 0, std, 1.0)
+        self.vocab = {f: len(store.categories(f)) for f in ONE_HOT_FIELDS}
+        self.width = len(NUMERIC_FEATURES) + sum(self.vocab.values())
+
+    def _numeric(self, store: PropertyStore, rows: np.ndarray) -> np.ndarray:
+        columns = {
+            "price": store.column("price")[rows],
+            "area": store.column("area")[rows],
+            "price_per_m2": price_per_m2(store, rows),
+            "bedrooms": store.column("bedrooms")[rows],
+            "bathrooms": store.column("bathrooms")[rows],
+        }
+        for f in LOG_FEATURES:
+            columns[f] = np.log1p(columns[f])
+        return np.column_stack([columns[f] for f in NUMERIC_FEATURES]).astype(np.float64)
+
+    def transform(self, store: PropertyStore, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.intp)
+        features = np.zeros((len(rows), self.width), dtype=np.float64)
+        features[:, : len(NUMERIC_FEATURES)] = (self._numeric(store, rows) - self.mean) / self.std
+        offset = len(NUMERIC_FEATURES)
+        for f in ONE_HOT_FIELDS:
+            codes = store.column(f)[rows]
+            known = codes < self.vocab[f]
+            features[np.flatnonzero(known), offset + codes[known]] = 1.0
+            offset += self.vocab[f]
+        return features
+
+
+class SimilarityIndex:
+    """Nearest-neighbour lookups over a PropertyStore's feature space.
+
+    The bulk of the catalogue sits in a scikit-learn KD-tree built once. Rows
+    changed since then (per ``PropertyStore.changed_since``) are masked out
+    of the tree's answers and kept in a small side buffer that is searched
+    by brute force, until they grow past ``REBUILD_FRACTION`` and the tree is
+    rebuilt.
+    """
+
+    def __init__(self, store: PropertyStore):
+        self.store = store
+        self.rebuild()
+
+    def rebuild(self):
+        from sklearn.neighbors import KDTree
+
+        self.rows = self.store.live_rows()
+        self.encoder = FeatureEncoder(self.store, self.rows)
+        self.tree = KDTree(self.encoder.transform(self.store, self.rows)) if len(self.rows) else None
+        # The tree keeps its own copy of the feature matrix; reuse it for query vectors.
+        self.features = np.asarray(self.tree.data) if self.tree is not None else None
+        self.stale = np.zeros(self.store.n_rows, dtype=bool)
+        self.extra_rows = np.zeros(0, dtype=np.intp)
+        self.extra_features = np.zeros((0, self.encoder.width))
+        self.version = self.store.version
+
+    def refresh(self):
+        if self.store.version == self.version:
+            return
+        changed = self.store.changed_since(self.version)
+        if changed is None or len(self.extra_rows) + len(changed) > REBUILD_FRACTION * max(len(self.rows), 1):
+            self.rebuild()
+            return
+        if len(self.stale) < self.store.n_rows:
+            self.stale = np.concatenate([self.stale, np.zeros(self.store.n_rows - len(self.stale), dtype=bool)])
+        self.stale[changed] = True
+        extra = np.union1d(self.extra_rows, changed)
+        self.extra_rows = extra[self.store.alive()[extra]]
+        self.extra_features = self.encoder.transform(self.store, self.extra_rows)
+        self.version = self.store.version
+
+    def similar(self, row: int, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """The ``k`` live rows closest to ``row`` (excluding it), nearest first."""
+        self.refresh()
+        query = self._query_vector(row)
+        rows, distances = self._from_tree(query, row, k)
+        if len(self.extra_rows):
+            extra = self.extra_rows != row
+            extra_distances = np.linalg.norm(self.extra_features[extra] - query, axis=1)
+            rows = np.concatenate([rows, self.extra_rows[extra]])
+            distances = np.concatenate([distances, extra_distances])
+        order = np.lexsort((rows, distances))[:k]
+        return rows[order], distances[order]
+
+    def _query_vector(self, row: int) -> np.ndarray:
+        if self.tree is not None and not (row < len(self.stale) and self.stale[row]):
+            position = np.searchsorted(self.rows, row)
+            if position < len(self.rows) and self.rows[position] == row:
+                return self.features[position : position + 1]
+        return self.encoder.transform(self.store, [row])
+
+    def _from_tree(self, query: np.ndarray, row: int, k: int):
+        if self.tree is None:
+            return np.zeros(0, dtype=np.intp), np.zeros(0)
+        fetch = k + 1
+        while True:
+            fetch = min(fetch, len(self.rows))
+            distances, positions = self.tree.query(query, k=fetch)
+            rows = self.rows[positions[0]]
+            keep = (rows != row) & ~self.stale[rows]
+            if keep.sum() >= k or fetch == len(self.rows):
+                return rows[keep], distances[0][keep]
+            fetch *= 2
+
+
+def brute_force_similar(store: PropertyStore, encoder: FeatureEncoder, row: int, k: int = 10):
+    rows = store.live_rows()
+    rows = rows[rows != row]
+    distances = np.linalg.norm(encoder.transform(store, rows) - encoder.transform(store, [row]), axis=1)
+    order = np.lexsort((rows, distances))[:k]
+    return rows[order], distances[order]
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+from store import CATEGORY_FIELDS, PropertyStore
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = ".snapshot"
+META_FILE = "meta.json"
+
+
+def snapshot_path(source: str) -> str:
+    return source + SNAPSHOT_SUFFIX
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_snapshot(store: PropertyStore, source: str, path: Optional[str] = None) -> str:
+    """Write ``store`` as one .npy file per array plus a JSON string table.
+
+    The directory is assembled under a temporary name and swapped in at the
+    end, so a reader never sees a half-written snapshot.
+    """
+    path = path or snapshot_path(source)
+    stat = os.stat(source)
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_sha1": file_digest(source),
+        "keys": store.row_keys(),
+        "categories": {f: store.categories(f) for f in CATEGORY_FIELDS},
+        "arrays": [],
+    }
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp = tempfile.mkdtemp(prefix=".snapshot-", dir=parent)
+    try:
+        for name, array in store.to_arrays().items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+            meta["arrays"].append(name)
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+def load_snapshot(source: str, path: Optional[str] = None) -> Optional[PropertyStore]:
+    """Return the snapshotted store for ``source``, or None if it is missing or stale."""
+    path = path or snapshot_path(source)
+    try:
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        stat = os.stat(source)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != SNAPSHOT_VERSION or meta["source_size"] != stat.st_size:
+        return None
+    # A changed mtime alone (checkout, touch) is re-checked against the content hash.
+    if meta["source_mtime_ns"] != stat.st_mtime_ns and meta["source_sha1"] != file_digest(source):
+        return None
+    try:
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="c", allow_pickle=False)
+            for name in meta["arrays"]
+        }
+    except (OSError, ValueError):
+        return None
+    return PropertyStore.from_arrays(meta["keys"], meta["categories"], arrays)
+
@@ -0,0 +1,124 @@
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from results import ResultSet
+from similarity import price_per_m2
+from store import NUMERIC_FIELDS, PropertyStore
+
+SORT_KEYS = tuple(NUMERIC_FIELDS) + ("price_per_m2", "delivery")
+# Presorted orders kept per store version (each costs ~12 bytes per row).
+MAX_CACHED_ORDERS = 8
+# Results covering more than this share of the catalogue are ordered by
+# walking a presorted permutation instead of sorting their own keys.
+INTERSECT_FRACTION = 0.05
+
+YEAR_RE = re.compile(r"\b(?:19|20)\d\d\b")
+MONTHS_RE = re.compile(r"(\d+)\s*month")
+
+SortSpec = Sequence[Tuple[str, bool]]
+
+
+def delivery_years(value: str) -> float:
+    """Sortable delivery time: ready units first, then near-term, then by year."""
+    text = value.lower()
+    if "ready" in text:
+        return 0.0
+    months = MONTHS_RE.search(text)
+    if months:
+        return int(months.group(1)) / 12
+    if "soon" in text:
+        return 0.5
+    year = YEAR_RE.search(text)
+    return float(year.group()) if year else np.nan
+
+
+def sort_values(store: PropertyStore, key: str) -> np.ndarray:
+    """One float per row id; NaN marks an unknown value, which always sorts last."""
+    if key in NUMERIC_FIELDS:
+        return store.column(key).astype(np.float64)
+    if key == "price_per_m2":
+        rows = np.arange(store.n_rows)
+        values = price_per_m2(store, rows)
+        values[store.column("area")[rows] <= 0] = np.nan
+        return values
+    if key == "delivery":
+        table = np.array([delivery_years(v) for v in store.categories("delivery_date")], dtype=np.float64)
+        return table[store.column("delivery_date")] if len(table) else np.zeros(store.n_rows)
+    raise KeyError(key)
+
+
+class SortOrders:
+    """Presorted permutations of the live catalogue, one per sort spec.
+
+    A spec is a list of ``(key, descending)`` pairs. For each spec used the
+    cache holds the live rows in sorted order (ties by row id) and a dense
+    rank per row, so a multi-key sort collapses to a single integer key.
+    Entries are rebuilt lazily after the store changes. ``computed`` adds
+    keys beyond ``sort_values``, each a callable returning one float per row.
+    """
+
+    def __init__(
+        self,
+        store: PropertyStore,
+        max_entries: int = MAX_CACHED_ORDERS,
+        computed: Optional[Dict[str, Callable[[], np.ndarray]]] = None,
+    ):
+        self.store = store
+        self.max_entries = max_entries
+        self.computed = computed or {}
+        self._orders: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._version = store.version
+
+    def order(self, spec: SortSpec) -> Tuple[np.ndarray, np.ndarray]:
+        """``(rows in sorted order, rank per row id)`` for ``spec``."""
+        if self._version != self.store.version:
+            self._orders.clear()
+            self._version = self.store.version
+        spec = tuple((key, bool(descending)) for key, descending in spec)
+        cached = self._orders.get(spec)
+        if cached is not None:
+            self._orders.move_to_end(spec)
+            return cached
+        cached = self._build(spec)
+        self._orders[spec] = cached
+        if len(self._orders) > self.max_entries:
+            self._orders.popitem(last=False)
+        return cached
+
+    def _build(self, spec: SortSpec) -> Tuple[np.ndarray, np.ndarray]:
+        rows = self.store.live_rows()
+        keys = []
+        for key, descending in spec:
+            values = self.computed[key]() if key in self.computed else sort_values(self.store, key)
+            values = values[rows]
+            keys.append(-values if descending else values)
+        # lexsort is stable and rows are ascending, so ties fall back to row id.
+        position = np.lexsort(keys[::-1])
+        order = rows[position]
+        new_rank = np.zeros(max(len(rows) - 1, 0), dtype=bool)
+        for values in keys:
+            ordered = values[position]
+            a, b = ordered[1:], ordered[:-1]
+            new_rank |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+        rank = np.zeros(self.store.n_rows, dtype=np.int32 if len(rows) < 2**31 else np.int64)
+        if len(rows):
+            rank[order] = np.concatenate([[0], np.cumsum(new_rank)])
+        # Shared by every session sorting with this spec.
+        order.flags.writeable = False
+        rank.flags.writeable = False
+        return order, rank
+
+    def sort(self, results: ResultSet, spec: SortSpec) -> ResultSet:
+        """Reorder ``results`` by ``spec``; their current order breaks ties."""
+        order, rank = self.order(spec)
+        if len(results) > INTERSECT_FRACTION * len(order) and results.in_row_order():
+            if len(results) == len(order):
+                return ResultSet(order)
+            # Ties are by row id here, which is also the current order.
+            member = np.zeros(self.store.n_rows, dtype=bool)
+            member[results.rows()] = True
+            return ResultSet(order[member[order]])
+        return results.sorted_by(rank)
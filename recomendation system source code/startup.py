@@ -0,0 +1,71 @@
+import cProfile
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+
+TOP_FUNCTIONS = 20
+
+
+class StartupProfile:
+    """Timeline of start-up phases plus a cProfile of the same span.
+
+    ``mark`` records the wall time since the previous mark. Time spent
+    inside ``idle()`` (waiting for the user) is left out of both. Work on
+    other threads can be included with ``run``. A disabled profile does
+    nothing, so callers don't need to branch on it.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.marks = []
+        self._profilers = []
+        if not enabled:
+            return
+        # Interpreter start-up and module imports happened before we could time
+        # them; the process CPU clock still covers them.
+        self.marks.append(("interpreter start-up and imports (CPU)", time.process_time()))
+        self._profiler = cProfile.Profile()
+        self._profilers.append(self._profiler)
+        self._last = time.perf_counter()
+        self._profiler.enable()
+
+    def mark(self, label: str):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.marks.append((label, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def idle(self):
+        if not self.enabled:
+            yield
+            return
+        self._profiler.disable()
+        try:
+            yield
+        finally:
+            self._last = time.perf_counter()
+            self._profiler.enable()
+
+    def run(self, func, *args):
+        """Call ``func`` under its own profiler (for work on another thread)."""
+        if not self.enabled:
+            return func(*args)
+        profiler = cProfile.Profile()
+        self._profilers.append(profiler)
+        return profiler.runcall(func, *args)
+
+    def report(self, out=None, top: int = TOP_FUNCTIONS):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._profiler.disable()
+        out = out or sys.stderr
+        print("Start-up profile:", file=out)
+        for label, seconds in self.marks:
+            print(f"  {label:<45} {seconds * 1000:9.1f} ms", file=out)
+        print(f"  {'modules loaded':<45} {len(sys.modules):9d}", file=out)
+        stats = pstats.Stats(*self._profilers, stream=out)
+        stats.sort_stats("cumulative").print_stats(top)
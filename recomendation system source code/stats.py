@@ -0,0 +1,214 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from similarity import price_per_m2
+from store import PropertyStore
+
+FACET_FIELDS = ("city", "type", "compound", "furnished", "delivery_term")
+# Fixed bin edges (EGP per m²) so histograms can be updated by adding and
+# subtracting counts; the last bin is open-ended.
+PER_M2_EDGES = np.arange(0, 50001, 5000)
+# Values shown per facet in the summary; "stats by FIELD" shows them all.
+TOP_VALUES = 5
+BAR_WIDTH = 20
+
+
+def per_m2_bins(store: PropertyStore, rows: np.ndarray) -> np.ndarray:
+    """Histogram bin of each row's price per m², or -1 when its area is unknown."""
+    bins = np.searchsorted(PER_M2_EDGES, price_per_m2(store, rows), side="right") - 1
+    bins[store.column("area")[rows] <= 0] = -1
+    return bins
+
+
+def facet_counts(store: PropertyStore, rows: np.ndarray, field: str) -> np.ndarray:
+    return np.bincount(store.column(field)[rows], minlength=len(store.categories(field)))
+
+
+def histogram(store: PropertyStore, rows: np.ndarray) -> np.ndarray:
+    bins = per_m2_bins(store, rows)
+    return np.bincount(bins[bins >= 0], minlength=len(PER_M2_EDGES))
+
+
+def price_summary(sorted_prices: np.ndarray) -> Optional[Dict[str, float]]:
+    if not len(sorted_prices):
+        return None
+    return {
+        "min": float(sorted_prices[0]),
+        "median": float(np.median(sorted_prices[(len(sorted_prices) - 1) // 2 : len(sorted_prices) // 2 + 1])),
+        "max": float(sorted_prices[-1]),
+    }
+
+
+def group_summary(store: PropertyStore, rows: np.ndarray, field: str) -> List[tuple]:
+    """``(value, count, median price, median price per m²)`` per group, largest first.
+
+    One lexsort by (group, price) puts every group's prices in order, so all
+    the medians come from index arithmetic rather than a loop over groups.
+    """
+    if not len(rows):
+        return []
+    codes = store.column(field)[rows]
+    prices = store.column("price")[rows].astype(np.float64)
+    order = np.lexsort((prices, codes))
+    counts = np.bincount(codes, minlength=len(store.categories(field)))
+    present = np.flatnonzero(counts)
+    starts = np.concatenate(([0], np.cumsum(counts)))[present]
+    sizes = counts[present]
+    sorted_prices = prices[order]
+    medians = (sorted_prices[starts + (sizes - 1) // 2] + sorted_prices[starts + sizes // 2]) / 2
+
+    per_m2 = price_per_m2(store, rows)
+    per_m2[store.column("area")[rows] <= 0] = np.nan
+    order = np.lexsort((per_m2, codes))
+    sorted_per_m2 = per_m2[order]
+    known = np.bincount(codes[~np.isnan(per_m2)], minlength=len(counts))[present]
+    # NaNs sort to the end of each group, so the known values come first.
+    low = sorted_per_m2[starts + np.maximum(known - 1, 0) // 2]
+    high = sorted_per_m2[starts + known // 2]
+    per_m2_medians = np.where(known > 0, (low + high) / 2, np.nan)
+
+    names = store.categories(field)
+    groups = [(names[c], int(n), float(m), float(p)) for c, n, m, p in zip(present, sizes, medians, per_m2_medians)]
+    groups.sort(key=lambda g: (-g[1], g[0]))
+    return groups
+
+
+class Summary:
+    """Aggregates for one set of rows, ready to be formatted."""
+
+    def __init__(self, store: PropertyStore, size: int, facets: Dict[str, np.ndarray], price: Optional[dict], per_m2: np.ndarray):
+        self.store = store
+        self.size = size
+        self.facets = facets
+        self.price = price
+        self.per_m2 = per_m2
+
+    @classmethod
+    def of_rows(cls, store: PropertyStore, rows: np.ndarray) -> "Summary":
+        facets = {f: facet_counts(store, rows, f) for f in FACET_FIELDS}
+        prices = np.sort(store.column("price")[rows])
+        return cls(store, len(rows), facets, price_summary(prices), histogram(store, rows))
+
+    def top(self, field: str, limit: Optional[int] = TOP_VALUES) -> List[tuple]:
+        counts = self.facets[field]
+        present = np.flatnonzero(counts)
+        present = present[np.lexsort((present, -counts[present]))]
+        names = self.store.categories(field)
+        return [(names[c], int(counts[c])) for c in present[:limit]]
+
+    def format(self, title: str) -> str:
+        if not self.size:
+            return "No listings to summarise."
+        lines = [f"Statistics for {self.size:,} listings ({title}):"]
+        if self.price:
+            lines.append(
+                f"Price: min {self.price['min']:,.0f} | median {self.price['median']:,.0f} | max {self.price['max']:,.0f} EGP"
+            )
+        lines.append("Price per m²:")
+        filled = np.flatnonzero(self.per_m2)
+        peak = max(int(self.per_m2.max()), 1)
+        for i in range(filled[0], filled[-1] + 1) if len(filled) else ():
+            count = int(self.per_m2[i])
+            low = PER_M2_EDGES[i]
+            label = f"{low:,}+" if i == len(PER_M2_EDGES) - 1 else f"{low:,}-{PER_M2_EDGES[i + 1]:,}"
+            lines.append(f"  {label:>15} {count:>8,} {'#' * round(BAR_WIDTH * count / peak)}")
+        for field in FACET_FIELDS:
+            values = self.top(field)
+            more = int(np.count_nonzero(self.facets[field])) - len(values)
+            text = ", ".join(f"{name} {count:,}" for name, count in values)
+            lines.append(f"{field.replace('_', ' ').capitalize()}: {text}" + (f" (+{more} more)" if more > 0 else ""))
+        return "\n".join(lines)
+
+
+class CatalogueStats:
+    """Facet counts and the price-per-m² histogram for every live listing.
+
+    Built once, then kept current from ``store.changed_since``: each row's
+    last counted category codes and histogram bin are remembered, so an
+    update only subtracts the old contribution of the changed rows and adds
+    the new one. The price summary reads the store's sorted price index,
+    which the store already maintains incrementally. Group summaries are
+    cached per store version.
+    """
+
+    def __init__(self, store: PropertyStore):
+        self.store = store
+        self.version = None
+        self._groups: Dict[str, List[tuple]] = {}
+
+    def refresh(self):
+        store = self.store
+        if self.version == store.version:
+            return
+        changed = store.changed_since(self.version) if self.version is not None else None
+        if changed is None:
+            self._rebuild()
+        else:
+            self._update(changed)
+        self._groups = {}
+        self.version = store.version
+
+    def _rebuild(self):
+        store = self.store
+        rows = store.live_rows()
+        self._codes = {}
+        self.counts = {}
+        for f in FACET_FIELDS:
+            self._codes[f] = np.full(store.n_rows, -1, dtype=np.int32)
+            self._codes[f][rows] = store.column(f)[rows]
+            self.counts[f] = facet_counts(store, rows, f)
+        self._bins = np.full(store.n_rows, -1, dtype=np.int32)
+        self._bins[rows] = per_m2_bins(store, rows)
+        self.per_m2 = histogram(store, rows)
+
+    def _update(self, rows: np.ndarray):
+        store = self.store
+        rows = np.asarray(rows, dtype=np.intp)
+        alive = store.alive()[rows]
+        extra = store.n_rows - len(self._bins)
+        if extra > 0:
+            self._bins = np.concatenate([self._bins, np.full(extra, -1, dtype=np.int32)])
+        for f in FACET_FIELDS:
+            codes = self._codes[f]
+            if extra > 0:
+                codes = self._codes[f] = np.concatenate([codes, np.full(extra, -1, dtype=np.int32)])
+            n_categories = len(store.categories(f))
+            counts = np.zeros(n_categories, dtype=np.int64)
+            counts[: len(self.counts[f])] = self.counts[f]
+            old = codes[rows]
+            counts -= np.bincount(old[old >= 0], minlength=n_categories)
+            new = np.where(alive, store.column(f)[rows], -1)
+            counts += np.bincount(new[new >= 0], minlength=n_categories)
+            codes[rows] = new
+            self.counts[f] = counts
+        old = self._bins[rows]
+        self.per_m2 = self.per_m2 - np.bincount(old[old >= 0], minlength=len(PER_M2_EDGES))
+        new = np.where(alive, per_m2_bins(store, rows), -1)
+        self.per_m2 = self.per_m2 + np.bincount(new[new >= 0], minlength=len(PER_M2_EDGES))
+        self._bins[rows] = new
+
+    def summary(self) -> Summary:
+        self.refresh()
+        index = self.store.sorted_index("price")
+        if index is not None:
+            prices = index.values
+        else:
+            prices = np.sort(self.store.column("price")[self.store.live_rows()])
+        return Summary(self.store, len(self.store), dict(self.counts), price_summary(prices), self.per_m2)
+
+    def groups(self, field: str) -> List[tuple]:
+        self.refresh()
+        if field not in self._groups:
+            self._groups[field] = group_summary(self.store, self.store.live_rows(), field)
+        return self._groups[field]
+
+
+def format_groups(field: str, groups: List[tuple], title: str) -> str:
+    if not groups:
+        return "No listings to summarise."
+    lines = [f"Listings by {field.replace('_', ' ')} ({title}):"]
+    for name, count, median, per_m2 in groups:
+        per_m2_text = f"{per_m2:,.0f}/m²" if not np.isnan(per_m2) else "n/a"
+        lines.append(f"  {name}: {count:,} listings | median {median:,.0f} EGP | {per_m2_text}")
+    return "\n".join(lines)
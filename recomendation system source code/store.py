@@ -0,0 +1,408 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from indexes import InvertedIndex, SortedIndex
+
+FIELDS = (
+    "type",
+    "price",
+    "bedrooms",
+    "bathrooms",
+    "area",
+    "furnished",
+    "level",
+    "compound",
+    "payment_option",
+    "delivery_date",
+    "delivery_term",
+    "city",
+)
+NUMERIC_FIELDS = {
+    "price": np.float64,
+    "area": np.float64,
+    "bedrooms": np.int32,
+    "bathrooms": np.int32,
+}
+CATEGORY_FIELDS = tuple(f for f in FIELDS if f not in NUMERIC_FIELDS)
+INDEXED_CATEGORIES = ("city", "type", "compound")
+# How many incremental updates ``changed_since`` can replay before callers must rebuild.
+CHANGE_LOG_SIZE = 64
+
+
+class Property:
+    def __init__(
+        self,
+        type: str,
+        price: float,
+        bedrooms: int,
+        bathrooms: int,
+        area: float,
+        furnished: str,
+        level: str,
+        compound: str,
+        payment_option: str,
+        delivery_date: str,
+        delivery_term: str,
+        city: str,
+    ):
+        self.type = type
+        self.price = price
+        self.bedrooms = bedrooms
+        self.bathrooms = bathrooms
+        self.area = area
+        self.furnished = furnished
+        self.level = level
+        self.compound = compound
+        self.payment_option = payment_option
+        self.delivery_date = delivery_date
+        self.delivery_term = delivery_term
+        self.city = city
+
+    def to_dict(self):
+        return {
+            "type": self.type,
+            "price": self.price,
+            "bedrooms": self.bedrooms,
+            "bathrooms": self.bathrooms,
+            "area": self.area,
+            "furnished": self.furnished,
+            "level": self.level,
+            "compound": self.compound,
+            "payment_option": self.payment_option,
+            "delivery_date": self.delivery_date,
+            "delivery_term": self.delivery_term,
+            "city": self.city,
+        }
+
+
+class PropertyStore(Mapping):
+    """Columnar property catalogue.
+
+    Numeric fields live in contiguous arrays and text fields are dictionary
+    encoded (an int32 code per row plus one list of distinct values per
+    field). Rows are addressed by position; ``Property`` objects are only
+    built on demand via ``property_at``. The store also behaves as a
+    read-only ``key -> Property`` mapping over its live rows.
+
+    Deleted rows are tombstoned rather than removed, so row ids held by
+    callers never shift. ``n_rows`` counts every physical row while
+    ``len()`` counts live ones; ``version`` increases on every change.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._numeric = {f: np.zeros(capacity, dtype=t) for f, t in NUMERIC_FIELDS.items()}
+        self._codes = {f: np.zeros(capacity, dtype=np.int32) for f in CATEGORY_FIELDS}
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._categories: Dict[str, List[str]] = {f: [] for f in CATEGORY_FIELDS}
+        self._category_ids: Dict[str, Dict[str, int]] = {f: {} for f in CATEGORY_FIELDS}
+        self._sorted: Dict[str, SortedIndex] = {}
+        self._inverted: Dict[str, InvertedIndex] = {}
+        self.version = 0
+        self._changes: List[Tuple[int, Optional[np.ndarray]]] = []
+
+    @classmethod
+    def from_records(cls, keys: Sequence[str], records: Sequence[dict]) -> "PropertyStore":
+        store = cls(capacity=len(keys))
+        store.append_columns(keys, records_to_columns(records))
+        return store
+
+    @classmethod
+    def from_arrays(
+        cls, keys: List[str], categories: Dict[str, List[str]], arrays: Dict[str, np.ndarray]
+    ) -> "PropertyStore":
+        """Rebuild a store from the output of ``to_arrays`` without copying columns."""
+        store = cls.__new__(cls)
+        store._size = len(keys)
+        store._keys = list(keys)
+        store._alive = arrays["alive"] if "alive" in arrays else np.ones(len(keys), dtype=bool)
+        store._rows = {key: row for row, key in enumerate(store._keys) if store._alive[row]}
+        store._numeric = {f: arrays[f] for f in NUMERIC_FIELDS}
+        store._codes = {f: arrays[f] for f in CATEGORY_FIELDS}
+        store._categories = {f: list(categories[f]) for f in CATEGORY_FIELDS}
+        store._category_ids = {f: {v: i for i, v in enumerate(values)} for f, values in store._categories.items()}
+        store._sorted = {
+            f: SortedIndex.from_arrays(arrays[f"sorted_{f}_order"], arrays[f"sorted_{f}_values"])
+            for f in NUMERIC_FIELDS
+            if f"sorted_{f}_order" in arrays
+        }
+        store._inverted = {
+            f: InvertedIndex.from_arrays(arrays[f"inverted_{f}_rows"], arrays[f"inverted_{f}_offsets"])
+            for f in INDEXED_CATEGORIES
+            if f"inverted_{f}_rows" in arrays
+        }
+        store.version = 0
+        store._changes = []
+        return store
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {f: self.column(f) for f in FIELDS}
+        arrays["alive"] = self.alive()
+        for f, index in self._sorted.items():
+            arrays[f"sorted_{f}_order"] = index.order
+            arrays[f"sorted_{f}_values"] = index.values
+        for f, index in self._inverted.items():
+            arrays[f"inverted_{f}_rows"] = index.rows_by_code
+            arrays[f"inverted_{f}_offsets"] = index.offsets
+        return arrays
+
+    # --- Mapping interface ---
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rows)
+
+    def __getitem__(self, key: str) -> Property:
+        return self.property_at(self._rows[key])
+
+    def __contains__(self, key) -> bool:
+        return key in self._rows
+
+    # --- Row and column access ---
+    @property
+    def n_rows(self) -> int:
+        return self._size
+
+    @property
+    def has_deletions(self) -> bool:
+        return len(self._rows) != self._size
+
+    def alive(self) -> np.ndarray:
+        return self._alive[: self._size]
+
+    def live_rows(self) -> np.ndarray:
+        if not self.has_deletions:
+            return np.arange(self._size)
+        return np.flatnonzero(self.alive())
+
+    def changed_since(self, version: int) -> Optional[np.ndarray]:
+        """Rows touched by incremental updates after ``version``.
+
+        Returns None when that history is no longer available (a bulk load
+        happened or the log was trimmed), meaning "assume everything changed".
+        """
+        if version == self.version:
+            return np.zeros(0, dtype=np.intp)
+        relevant = [rows for v, rows in self._changes if v > version]
+        if not self._changes or self._changes[0][0] > version + 1 or any(r is None for r in relevant):
+            return None
+        return np.unique(np.concatenate(relevant))
+
+    def _log_change(self, rows: Optional[np.ndarray]):
+        self.version += 1
+        self._changes.append((self.version, rows))
+        del self._changes[:-CHANGE_LOG_SIZE]
+
+    def row_keys(self) -> List[str]:
+        return self._keys
+
+    def column(self, field: str) -> np.ndarray:
+        if field in NUMERIC_FIELDS:
+            return self._numeric[field][: self._size]
+        return self._codes[field][: self._size]
+
+    def categories(self, field: str) -> List[str]:
+        return self._categories[field]
+
+    def category_code(self, field: str, value: str) -> int:
+        return self._category_ids[field].get(value, -1)
+
+    def decode(self, field: str, rows) -> List[str]:
+        values = self._categories[field]
+        return [values[c] for c in self._codes[field][rows]]
+
+    def row_of(self, key: str) -> int:
+        return self._rows[key]
+
+    def key_at(self, row: int) -> str:
+        return self._keys[row]
+
+    def keys_at(self, rows) -> List[str]:
+        return [self._keys[r] for r in rows]
+
+    def value_at(self, row: int, field: str):
+        if field in NUMERIC_FIELDS:
+            return self._numeric[field][row].item()
+        return self._categories[field][self._codes[field][row]]
+
+    def property_at(self, row: int) -> Property:
+        if row < 0 or row >= self._size:
+            raise IndexError(row)
+        return Property(**{f: self.value_at(row, f) for f in FIELDS})
+
+    def properties_at(self, rows) -> List[Property]:
+        return [self.property_at(int(r)) for r in rows]
+
+    # --- Secondary indexes ---
+    def build_indexes(self):
+        rows = self.live_rows()
+        self._sorted = {f: SortedIndex(self.column(f), rows) for f in NUMERIC_FIELDS}
+        self._inverted = {
+            f: InvertedIndex(self.column(f), len(self._categories[f]), rows) for f in INDEXED_CATEGORIES
+        }
+
+    def sorted_index(self, field: str) -> Optional[SortedIndex]:
+        return self._sorted.get(field)
+
+    def inverted_index(self, field: str) -> Optional[InvertedIndex]:
+        return self._inverted.get(field)
+
+    def _index_remove(self, rows: np.ndarray):
+        for index in self._sorted.values():
+            index.remove(rows)
+        for f, index in self._inverted.items():
+            index.remove(rows, self._codes[f][rows])
+
+    def _index_add(self, rows: np.ndarray):
+        for f, index in self._sorted.items():
+            index.add(rows, self._numeric[f][rows])
+        for f, index in self._inverted.items():
+            index.add(rows, self._codes[f][rows], len(self._categories[f]))
+
+    # --- Bulk building ---
+    def append_columns(self, keys: Sequence[str], columns: Dict[str, Sequence]) -> np.ndarray:
+        rows = self._append(keys, columns)
+        # Indexes describe the old row set; bulk loaders rebuild them once at the end.
+        self._sorted = {}
+        self._inverted = {}
+        self._log_change(None)
+        return rows
+
+    def append_store(self, other: "PropertyStore") -> np.ndarray:
+        """Append the live rows of ``other``, translating its category codes into ours."""
+        source = other.live_rows()
+        keys = other.keys_at(source)
+        n = len(keys)
+        start = self._size
+        self._check_new(keys)
+        self._reserve(start + n)
+        for f in NUMERIC_FIELDS:
+            self._numeric[f][start : start + n] = other.column(f)[source]
+        for f in CATEGORY_FIELDS:
+            remap = self._encode(f, other.categories(f))
+            self._codes[f][start : start + n] = remap[other.column(f)[source]]
+        self._commit_rows(keys, start)
+        self._sorted = {}
+        self._inverted = {}
+        self._log_change(None)
+        return np.arange(start, start + n)
+
+    def append(self, key: str, prop: Property) -> int:
+        columns = {f: [getattr(prop, f)] for f in FIELDS}
+        return int(self.append_columns([key], columns)[0])
+
+    # --- Incremental updates ---
+    def upsert_columns(self, keys: Sequence[str], columns: Dict[str, Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+        """Insert new keys and overwrite existing ones in place, keeping indexes current.
+
+        Returns ``(updated_rows, inserted_rows)``. Existing rows keep their
+        row id, so result sets and favorites that refer to them stay valid.
+        """
+        latest = {key: i for i, key in enumerate(keys)}
+        updates = [i for key, i in latest.items() if key in self._rows]
+        inserts = [i for key, i in latest.items() if key not in self._rows]
+
+        updated = np.asarray([self._rows[keys[i]] for i in updates], dtype=np.intp)
+        if len(updated):
+            self._index_remove(updated)
+            for f, t in NUMERIC_FIELDS.items():
+                self._numeric[f][updated] = np.asarray([columns[f][i] for i in updates], dtype=np.float64).astype(t)
+            for f in CATEGORY_FIELDS:
+                self._codes[f][updated] = self._encode(f, [columns[f][i] for i in updates])
+            self._index_add(updated)
+            self._log_change(updated)
+
+        inserted = np.zeros(0, dtype=np.intp)
+        if inserts:
+            inserted = self._append([keys[i] for i in inserts], {f: [columns[f][i] for i in inserts] for f in FIELDS})
+            self._index_add(inserted)
+            self._log_change(inserted)
+        return updated, inserted
+
+    def delete(self, keys: Sequence[str]) -> np.ndarray:
+        """Tombstone ``keys`` (unknown keys are ignored) and drop them from the indexes."""
+        rows = np.asarray(sorted({self._rows[k] for k in keys if k in self._rows}), dtype=np.intp)
+        if not len(rows):
+            return rows
+        self._index_remove(rows)
+        self._alive[rows] = False
+        for row in rows:
+            del self._rows[self._keys[row]]
+        self._log_change(rows)
+        return rows
+
+    # --- Internals ---
+    def _append(self, keys: Sequence[str], columns: Dict[str, Sequence]) -> np.ndarray:
+        n = len(keys)
+        start = self._size
+        self._check_new(keys)
+        self._reserve(start + n)
+        for f, t in NUMERIC_FIELDS.items():
+            self._numeric[f][start : start + n] = np.asarray(columns[f], dtype=np.float64).astype(t)
+        for f in CATEGORY_FIELDS:
+            self._codes[f][start : start + n] = self._encode(f, columns[f])
+        self._commit_rows(keys, start)
+        return np.arange(start, start + n)
+
+    def _check_new(self, keys: Sequence[str]):
+        seen = set()
+        for key in keys:
+            if key in self._rows or key in seen:
+                raise KeyError(f"Duplicate property key: {key}")
+            seen.add(key)
+
+    def _commit_rows(self, keys: Sequence[str], start: int):
+        for i, key in enumerate(keys):
+            self._rows[key] = start + i
+        self._keys.extend(keys)
+        self._size = start + len(keys)
+        self._alive[start : self._size] = True
+
+    def _encode(self, field: str, values: Sequence[str]) -> np.ndarray:
+        ids = self._category_ids[field]
+        names = self._categories[field]
+        if not len(values):
+            return np.zeros(0, dtype=np.int32)
+        # Encode each distinct value once rather than each row.
+        uniques, inverse = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+        mapped = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            code = ids.get(value)
+            if code is None:
+                code = ids[value] = len(names)
+                names.append(value)
+            mapped[i] = code
+        return mapped[inverse.reshape(-1)]
+
+    def _reserve(self, needed: int):
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        for f in NUMERIC_FIELDS:
+            self._numeric[f] = _resized(self._numeric[f], capacity)
+        for f in CATEGORY_FIELDS:
+            self._codes[f] = _resized(self._codes[f], capacity)
+        self._alive = _resized(self._alive, capacity)
+
+
+def records_to_columns(records) -> Dict[str, List]:
+    columns: Dict[str, List] = {f: [] for f in FIELDS}
+    for record in records:
+        for f in FIELDS:
+            columns[f].append(record.get(f, "" if f in CATEGORY_FIELDS else 0))
+    return columns
+
+
+def _resized(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros(capacity, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
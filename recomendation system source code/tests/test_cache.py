@@ -0,0 +1,73 @@
+import numpy as np
+
+from cache import QueryCache
+from query import Query
+from store import PropertyStore, records_to_columns
+
+
+def record(price, city="Madinaty"):
+    return {"type": "Apartment", "price": price, "bedrooms": 2, "bathrooms": 1, "area": 100, "compound": "Eastown", "city": city}
+
+
+def make_store(n=20):
+    store = PropertyStore.from_records([f"k{i}" for i in range(n)], [record(100 * i) for i in range(n)])
+    store.build_indexes()
+    return store
+
+
+def price_under(high):
+    return Query(ranges={"price": (None, high)})
+
+
+def test_repeat_queries_hit_and_equivalent_queries_share_an_entry():
+    store, cache = make_store(), QueryCache()
+    first = cache.evaluate(Query(terms={"city": ["mad"]}, ranges={"price": (None, 500)}), store)
+    again = cache.evaluate(Query(ranges={"price": (None, 500.0)}, terms={"city": ["mad", "mad"]}), store)
+    assert again is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert not first.flags.writeable
+
+
+def test_upsert_invalidates_cached_results():
+    store, cache = make_store(), QueryCache()
+    assert len(cache.evaluate(price_under(250), store)) == 3
+    store.upsert_columns(["k10", "new"], records_to_columns([record(50), record(150)]))
+    rows = cache.evaluate(price_under(250), store)
+    assert sorted(store.keys_at(rows)) == ["k0", "k1", "k10", "k2", "new"]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_delete_invalidates_cached_results():
+    store, cache = make_store(), QueryCache()
+    cache.evaluate(price_under(250), store)
+    store.delete(["k1"])
+    rows = cache.evaluate(price_under(250), store)
+    assert sorted(store.keys_at(rows)) == ["k0", "k2"]
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    store, cache = make_store(), QueryCache(max_entries=2)
+    a, b, c = price_under(100), price_under(200), price_under(300)
+    cache.evaluate(a, store)
+    cache.evaluate(b, store)
+    cache.evaluate(a, store)
+    cache.evaluate(c, store)
+    assert cache.evictions == 1
+    hits = cache.hits
+    cache.evaluate(a, store)
+    cache.evaluate(c, store)
+    assert cache.hits == hits + 2
+    cache.evaluate(b, store)
+    assert cache.misses == 4
+
+
+def test_row_budget_evicts_and_skips_oversized_results():
+    store, cache = make_store(), QueryCache(max_rows=10)
+    cache.evaluate(price_under(500), store)
+    cache.evaluate(price_under(400), store)
+    assert cache.info()["rows"] == 5
+    assert cache.evictions == 1
+    cache.evaluate(price_under(10_000), store)
+    assert cache.info()["entries"] == 1
+    np.testing.assert_array_equal(cache.evaluate(price_under(400), store), np.arange(5))
@@ -0,0 +1,113 @@
+import pytest
+
+from commands import parse_command
+
+# (message, intent, expected attributes). Unlisted terms, ranges, argument and
+# options must be empty; numbers and sort keys are checked only when listed.
+CASES = [
+    # Phrasings the original regex parser understood.
+    ("list", "list", {}),
+    ("list all properties", "list", {}),
+    ("find apartments in zayed", "filter", {"terms": {"city": ["zayed"], "type": ["apartment"]}}),
+    ("filter villas in madinaty", "filter", {"terms": {"city": ["madinaty"], "type": ["villa"]}}),
+    ("search new cairo apartments", "filter", {"terms": {"city": ["new cairo"], "type": ["apartment"]}}),
+    ("filter cairo", "filter", {"terms": {"city": ["cairo"]}}),
+    ("filter area between 100 and 200", "filter", {"ranges": {"area": (100, 200)}}),
+    ("filter area from 100 to 200", "filter", {"ranges": {"area": (100, 200)}}),
+    ("filter area over 150", "filter", {"ranges": {"area": (150, None)}}),
+    ("filter area greater than 150", "filter", {"ranges": {"area": (150, None)}}),
+    ("filter area under 90", "filter", {"ranges": {"area": (None, 90)}}),
+    ("filter area less than 90", "filter", {"ranges": {"area": (None, 90)}}),
+    ("filter price between 1000000 and 2000000", "filter", {"ranges": {"price": (1000000, 2000000)}}),
+    ("filter price from 1000000 to 2000000", "filter", {"ranges": {"price": (1000000, 2000000)}}),
+    ("filter price above 3000000", "filter", {"ranges": {"price": (3000000, None)}}),
+    ("filter bedrooms at least 3", "filter", {"ranges": {"bedrooms": (3, None)}}),
+    ("filter bedroom >= 2", "filter", {"ranges": {"bedrooms": (2, None)}}),
+    ("filter bedrooms more than 2", "filter", {"ranges": {"bedrooms": (2, None)}}),
+    ("filter bedrooms under 3", "filter", {"ranges": {"bedrooms": (None, 2)}}),
+    ("filter bathrooms at least 2", "filter", {"ranges": {"bathrooms": (2, None)}}),
+    ("filter bathrooms less than 3", "filter", {"ranges": {"bathrooms": (None, 2)}}),
+    (
+        "find cairo apartment bathrooms at least 2 bedrooms over 2",
+        "filter",
+        {"terms": {"city": ["cairo"], "type": ["apartment"]}, "ranges": {"bathrooms": (2, None), "bedrooms": (2, None)}},
+    ),
+    ("sort by price", "sort", {"sort_keys": [("price", False)]}),
+    ("sort by area", "sort", {"sort_keys": [("area", False)]}),
+    ("next", "next", {}),
+    ("previous", "previous", {}),
+    ("compare 1 and 2", "compare", {"numbers": [1, 2]}),
+    ("details 3", "details", {"numbers": [3]}),
+    ("show favorites", "show_favorites", {}),
+    ("remove favorite 2", "remove_favorite", {"numbers": [2]}),
+    ("remove 2 from favorites", "remove_favorite", {"numbers": [2]}),
+    ("favorite 3", "add_favorite", {"numbers": [3]}),
+    ("save 3", "add_favorite", {"numbers": [3]}),
+    ("save favorite 3", "add_favorite", {"numbers": [3]}),
+    ("export", "export", {}),
+    ("user alice", "user", {"argument": "alice"}),
+    ("help", "help", {}),
+    ("hello there", "unknown", {}),
+    # Thousands separators and decimals.
+    ("filter price under 2,000,000", "filter", {"ranges": {"price": (None, 2000000)}, "numbers": [2000000]}),
+    ("filter price below 1,250,000.5", "filter", {"ranges": {"price": (None, 1250000.5)}}),
+    ("filter 3 bedrooms", "filter", {"ranges": {"bedrooms": (3, 3)}}),
+    ("filter new cairo", "filter", {"terms": {"city": ["new cairo"]}}),
+    # Verbs added since.
+    ("sort by price desc", "sort", {"sort_keys": [("price", True)]}),
+    ("sort by area descending then price", "sort", {"sort_keys": [("area", True), ("price", False)]}),
+    ("sort by price per m2", "sort", {"sort_keys": [("price_per_m2", False)]}),
+    ("sort by delivery", "sort", {"sort_keys": [("delivery", False)]}),
+    ("sort by best value", "sort", {"sort_keys": [("value", False)]}),
+    ("prev", "previous", {}),
+    ("save favorites", "save_favorites", {}),
+    ("load favorites", "load_favorites", {}),
+    ("export favorites", "export_favorites", {}),
+    ("export to results.jsonl.gz", "export", {"argument": "results.jsonl.gz"}),
+    ("export to out.csv with gzip", "export", {"argument": "out.csv", "options": {"compression": "gzip"}}),
+    (
+        "export favorites to favs.parquet with zstd",
+        "export_favorites",
+        {"argument": "favs.parquet", "options": {"compression": "zstd"}},
+    ),
+    ("export to list.csv", "export", {"argument": "list.csv"}),
+    ("similar to 0", "similar", {"numbers": [0]}),
+    ("similar 4", "similar", {"numbers": [4]}),
+    ("value 7", "value", {"numbers": [7]}),
+    ("is 7 a good deal", "value", {"numbers": [7]}),
+    ("refine price under 2000000", "refine", {"ranges": {"price": (None, 2000000)}}),
+    ("narrow to apartments", "refine", {"terms": {"type": ["apartment"]}}),
+    ("only villas", "refine", {"terms": {"type": ["villa"]}}),
+    ("within madinaty", "refine", {"terms": {"city": ["madinaty"]}}),
+    ("filter only apartments in madinaty", "filter", {"terms": {"city": ["madinaty"], "type": ["apartment"]}}),
+    ("narrow it", "unknown", {}),
+    ("undo", "undo", {}),
+    ("stats", "stats", {}),
+    ("stats villas by city", "stats", {"terms": {"type": ["villa"]}, "argument": "city"}),
+    ("stats all", "stats", {"options": {"scope": "catalogue"}}),
+    ("save search as cheap cairo", "save_search", {"terms": {"city": ["cairo"]}, "argument": "cheap cairo"}),
+    ("run search cheap cairo", "run_search", {"terms": {"city": ["cairo"]}, "argument": "cheap cairo"}),
+    ("delete search cheap cairo", "delete_search", {"terms": {"city": ["cairo"]}, "argument": "cheap cairo"}),
+    ("show searches", "list_searches", {}),
+]
+DEFAULTS = {"terms": {}, "ranges": {}, "argument": None, "options": {}}
+
+
+@pytest.mark.parametrize("message, intent, expected", CASES, ids=[case[0] for case in CASES])
+def test_parse_command(message, intent, expected):
+    command = parse_command(message)
+    assert command.intent == intent
+    for attr, want in dict(DEFAULTS, **expected).items():
+        assert getattr(command, attr) == want, attr
+
+
+def test_free_words_are_kept_as_typed_for_name_lookup():
+    command = parse_command("filter 2 bedrooms in the taj city price under 3000000")
+    assert command.phrases == [["2"], ["in", "the", "taj", "city"]]
+    assert command.ranges == {"bedrooms": (2, 2), "price": (None, 3000000)}
+
+
+def test_export_path_is_not_read_as_commands():
+    command = parse_command("export to next/list.csv")
+    assert command.intent == "export"
+    assert command.argument == "next/list.csv"
@@ -0,0 +1,75 @@
+from favorites import FavoritesDB
+from main import Catalogue, RealEstateChatbot
+from store import PropertyStore
+
+
+def test_flushed_writes_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "favorites.db")
+    db = FavoritesDB(path)
+    for key in ("c", "a", "b"):
+        db.add_favorite("alice", key)
+    db.remove_favorite("alice", "a")
+    db.save_search("alice", "cheap", "filter price under 1000000")
+    db.mark_legacy_imported("alice")
+    db.flush()
+    db.close()
+
+    reopened = FavoritesDB(path)
+    assert reopened.favorites("alice") == ["c", "b"]
+    assert reopened.saved_searches("alice") == {"cheap": "filter price under 1000000"}
+    assert reopened.legacy_imported("alice")
+    assert reopened.favorites("bob") == [] and not reopened.legacy_imported("bob")
+    reopened.close()
+
+
+def test_two_writers_for_one_user_merge(tmp_path):
+    # Two processes (batch workers, servers) each hold their own instance.
+    path = str(tmp_path / "favorites.db")
+    first, second = FavoritesDB(path), FavoritesDB(path)
+    assert first.favorites("alice") == second.favorites("alice") == []
+    first.add_favorite("alice", "x")
+    second.add_favorite("alice", "y")
+    first.flush()
+    second.flush()
+    assert first.favorites("alice") == second.favorites("alice") == ["x", "y"]
+    second.remove_favorite("alice", "x")
+    second.flush()
+    assert first.favorites("alice") == ["y"]
+    first.close()
+    second.close()
+
+
+def test_queued_writes_are_kept_when_another_writer_commits(tmp_path):
+    path = str(tmp_path / "favorites.db")
+    first, second = FavoritesDB(path, flush_interval=60), FavoritesDB(path, flush_interval=60)
+    first.add_favorite("alice", "x")
+    second.add_favorite("alice", "y")
+    second.flush()
+    # first still has "x" queued; it is committed before the reload, so it
+    # lands after second's "y".
+    assert first.favorites("alice") == ["y", "x"]
+    first.close()
+    second.close()
+
+
+def test_sessions_in_different_processes_see_each_others_favorites(tmp_path):
+    path = str(tmp_path / "favorites.db")
+    records = [{"type": "Apartment", "price": 1_000_000 * (i + 1), "area": 100, "city": "Madinaty"} for i in range(3)]
+    catalogue = Catalogue(PropertyStore.from_records(["a", "b", "c"], records))
+    sessions = [RealEstateChatbot(catalogue=catalogue, favorites_db=FavoritesDB(path)) for _ in range(2)]
+    for session, number in zip(sessions, (1, 2)):
+        session.process_input("user alice")
+        session.process_input("list")
+        assert session.process_input(f"favorite {number}") == f"Added property #{number} to your favorites."
+        session.db.flush()
+    for session in sessions:
+        assert len(session.process_input("show favorites").splitlines()) == 2
+    sessions[0].process_input("remove favorite 2")
+    sessions[0].db.flush()
+    assert sessions[1].process_input("show favorites").startswith("1. ")
+    assert len(sessions[1].process_input("show favorites").splitlines()) == 1
+    for session in sessions:
+        session.db.close()
+    reopened = FavoritesDB(path)
+    assert reopened.favorites("alice") == ["a"]
+    reopened.close()
@@ -0,0 +1,87 @@
+import numpy as np
+
+from indexes import InvertedIndex, SortedIndex
+from ingest import apply_delta, ingest, ingest_many
+from store import INDEXED_CATEGORIES, NUMERIC_FIELDS
+
+HEADER = "id,type,price,bedrooms,bathrooms,area,furnished,level,compound,payment_option,delivery_date,delivery_term,city\n"
+
+
+def row(key, price, compound="Eastown", city="New Cairo", type="Apartment", bedrooms=2, action=None):
+    line = f"{key},{type},{price},{bedrooms},2,120,No,1,{compound},Cash,2025,Finished,{city}"
+    return line + (f",{action or ''}" if action is not None else "") + "\n"
+
+
+def write(path, rows, header=HEADER):
+    path.write_text(header + "".join(rows), encoding="utf-8")
+    return str(path)
+
+
+def assert_store_consistent(store):
+    rows = store.live_rows()
+    assert len(store) == len(rows)
+    assert sorted(store) == sorted(store.keys_at(rows))
+    assert all(store.row_of(key) == r for key, r in zip(store.keys_at(rows), rows))
+
+
+def assert_indexes_current(store):
+    rows = store.live_rows()
+    for field in NUMERIC_FIELDS:
+        fresh = SortedIndex(store.column(field), rows)
+        index = store.sorted_index(field)
+        np.testing.assert_array_equal(index.values, fresh.values)
+        assert sorted(index.order.tolist()) == sorted(fresh.order.tolist())
+    for field in INDEXED_CATEGORIES:
+        fresh = InvertedIndex(store.column(field), len(store.categories(field)), rows)
+        index = store.inverted_index(field)
+        for code in range(len(store.categories(field))):
+            np.testing.assert_array_equal(index.postings(code), fresh.postings(code))
+
+
+def test_duplicate_id_in_one_file_keeps_first_row(tmp_path):
+    path = write(tmp_path / "feed.csv", [row("a", 100), row("b", 200), row("a", 300)])
+    store, stats = ingest(path, chunk_size=2)
+    assert len(store) == store.n_rows == 2
+    assert store["a"].price == 100
+    assert stats.rows_loaded == 2
+    assert stats.errors["duplicate id"] == 1
+    assert_store_consistent(store)
+
+
+def test_duplicate_id_within_one_chunk(tmp_path):
+    path = write(tmp_path / "feed.csv", [row("a", 100), row("a", 300), row("b", 200)])
+    store, stats = ingest(path)
+    assert len(store) == store.n_rows == 2
+    assert store["a"].price == 100
+    assert stats.errors["duplicate id"] == 1
+
+
+def test_duplicate_id_across_shards_is_a_row_error(tmp_path):
+    write(tmp_path / "a.csv", [row("x", 100), row("y", 200)])
+    write(tmp_path / "b.csv", [row("y", 300), row("z", 400)])
+    store, all_stats = ingest_many(str(tmp_path), workers=1)
+    assert sorted(store) == ["x", "y", "z"]
+    assert store["y"].price == 200
+    assert [s.errors["duplicate id"] for s in all_stats] == [0, 1]
+    assert [s.rows_loaded for s in all_stats] == [2, 1]
+    assert_store_consistent(store)
+
+
+def test_indexes_follow_upserts_and_deletes(tmp_path):
+    base = [row(f"k{i}", 1000 + 37 * (i % 11), compound=f"C{i % 4}", city=f"City{i % 3}") for i in range(40)]
+    store, _ = ingest(write(tmp_path / "base.csv", base))
+    store.build_indexes()
+    delta = [
+        row("k3", 5, compound="C9", city="City7", action=""),
+        row("k5", 0, action="delete"),
+        row("k40", 2000, compound="C1", city="City0", action=""),
+        row("k7", 0, action="delete"),
+        row("k40", 2500, compound="C2", city="City1", action=""),
+    ]
+    stats = apply_delta(store, write(tmp_path / "delta.csv", delta, HEADER.rstrip("\n") + ",action\n"))
+    assert (stats.updated, stats.inserted, stats.deleted) == (1, 1, 2)
+    assert "k5" not in store and "k7" not in store
+    assert store["k3"].compound == "C9"
+    assert store["k40"].price == 2500
+    assert_store_consistent(store)
+    assert_indexes_current(store)
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from query import Query
+from store import PropertyStore, records_to_columns
+
+CITIES = ["New Cairo", "Sheikh Zayed", "Madinaty", "6th of October", "New Capital City"]
+TYPES = ["Apartment", "Duplex", "Villa", "Twin House", "Stand Alone Villa"]
+COMPOUNDS = [f"Compound {c}" for c in "ABCDEFGHIJKL"] + ["Unknown"]
+
+
+def random_record(rng):
+    return {
+        "type": str(rng.choice(TYPES)),
+        "price": float(rng.integers(5, 120)) * 50_000,
+        "bedrooms": int(rng.integers(1, 6)),
+        "bathrooms": int(rng.integers(1, 4)),
+        "area": float(rng.integers(60, 400)),
+        "furnished": "No",
+        "level": "1",
+        "compound": str(rng.choice(COMPOUNDS)),
+        "payment_option": "Cash",
+        "delivery_date": "2025",
+        "delivery_term": "Finished",
+        "city": str(rng.choice(CITIES)),
+    }
+
+
+def random_store(rng, n, indexed=True):
+    store = PropertyStore.from_records([f"k{i}" for i in range(n)], [random_record(rng) for _ in range(n)])
+    if indexed:
+        store.build_indexes()
+    return store
+
+
+def mutate(rng, store, n):
+    # Deletes and upserts applied after the indexes were built; upserts may
+    # bring values the store has not seen before.
+    keys = list(store)
+    store.delete(list(rng.choice(keys, size=n // 10, replace=False)))
+    keys = list(store)
+    updated = list(rng.choice(keys, size=n // 10, replace=False))
+    inserted = [f"new{i}" for i in range(n // 10)]
+    records = [random_record(rng) for _ in updated + inserted]
+    for record in records[::5]:
+        record["compound"] = f"Compound {rng.integers(100, 103)}"
+    store.upsert_columns(updated + inserted, records_to_columns(records))
+
+
+def random_query(rng) -> Query:
+    terms, values, ranges = {}, {}, {}
+    if rng.random() < 0.4:
+        terms["city"] = [str(rng.choice(["new", "cairo", "zayed", "city", "october"]))]
+    if rng.random() < 0.3:
+        terms["type"] = [str(rng.choice(["villa", "apartment", "house"]))]
+    if rng.random() < 0.4:
+        values["compound"] = [str(c) for c in rng.choice(COMPOUNDS + ["Compound 101", "Nowhere"], size=rng.integers(1, 4))]
+    if rng.random() < 0.3:
+        values["city"] = [str(rng.choice(CITIES))]
+    for field, low, high in (("price", 250_000, 6_000_000), ("area", 60, 400), ("bedrooms", 1, 5), ("bathrooms", 1, 3)):
+        if rng.random() < 0.35:
+            bounds = sorted(rng.uniform(low, high, size=2))
+            if field in ("bedrooms", "bathrooms"):
+                bounds = [int(b) for b in bounds]
+            ranges[field] = (
+                None if rng.random() < 0.25 else bounds[0],
+                None if rng.random() < 0.25 else bounds[1],
+            )
+    return Query(terms=terms, ranges=ranges, values=values)
+
+
+def brute_force(store, query, rows=None):
+    # Row by row over decoded values, sharing nothing with Query or the indexes.
+    rows = store.live_rows() if rows is None else np.asarray(rows)
+    keep = np.ones(len(rows), dtype=bool)
+    for field, terms in query.terms.items():
+        keep &= [all(t in value.lower() for t in terms) for value in store.decode(field, rows)]
+    for field, values in query.values.items():
+        keep &= [value in values for value in store.decode(field, rows)]
+    for field, (low, high) in query.ranges.items():
+        column = [store.value_at(int(row), field) for row in rows]
+        keep &= [(low is None or v >= low) and (high is None or v <= high) for v in column]
+    return rows[keep]
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("indexed", [True, False])
+def test_evaluate_matches_brute_force(seed, indexed):
+    rng = np.random.default_rng(seed)
+    store = random_store(rng, 600, indexed)
+    for _ in range(40):
+        query = random_query(rng)
+        np.testing.assert_array_equal(query.evaluate(store), brute_force(store, query))
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_evaluate_after_deletes_and_upserts(seed):
+    rng = np.random.default_rng(100 + seed)
+    store = random_store(rng, 600)
+    mutate(rng, store, 600)
+    assert not store.alive()[: store.n_rows].all()
+    for _ in range(40):
+        query = random_query(rng)
+        np.testing.assert_array_equal(query.evaluate(store), brute_force(store, query))
+
+
+def test_selective_queries_use_the_index_and_skip_tombstones():
+    rng = np.random.default_rng(7)
+    store = random_store(rng, 2000)
+    mutate(rng, store, 2000)
+    for query in (
+        Query(values={"compound": ["Compound 101"]}),
+        Query(ranges={"price": (1_000_000, 1_100_000)}),
+        Query(ranges={"area": (None, 70)}, terms={"city": ["zayed"]}),
+    ):
+        assert query._drive(store, query.tables(store))[0] is not None
+        np.testing.assert_array_equal(query.evaluate(store), brute_force(store, query))
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_agrees_on_any_row_subset(seed):
+    rng = np.random.default_rng(200 + seed)
+    store = random_store(rng, 500)
+    mutate(rng, store, 500)
+    rows = np.sort(rng.choice(store.live_rows(), size=150, replace=False))
+    for _ in range(30):
+        query = random_query(rng)
+        np.testing.assert_array_equal(rows[query.matches(store, rows)], brute_force(store, query, rows))
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from results import ResultSet
+
+
+def reference(rows, key):
+    # Stable ascending sort with NaN last, written out with sorted().
+    positions = sorted(range(len(rows)), key=lambda i: (np.isnan(key[i]), 0.0 if np.isnan(key[i]) else key[i], i))
+    return [int(rows[i]) for i in positions]
+
+
+def random_keys(rng, n, nan_share):
+    # Few distinct values, so most keys tie.
+    key = rng.integers(0, 8, size=n).astype(np.float64)
+    key[rng.random(n) < nan_share] = np.nan
+    return key
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("nan_share", [0.0, 0.2, 0.97])
+def test_page_windows_match_sorted(seed, nan_share):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(50, 2000))
+    rows = np.sort(rng.choice(10 * n, size=n, replace=False))
+    column = np.full(10 * n, np.nan)
+    column[rows] = random_keys(rng, n, nan_share)
+    descending = bool(seed % 2)
+    expected = reference(rows, -column[rows] if descending else column[rows])
+    for _ in range(10):
+        start = int(rng.integers(0, n))
+        stop = start + int(rng.integers(1, 30))
+        # A fresh result takes the partial sort for early pages.
+        fresh = ResultSet(rows).sorted_by(column, descending)
+        assert fresh.window(start, stop).tolist() == expected[start:stop]
+    paged = ResultSet(rows).sorted_by(column, descending)
+    for start in range(0, n, 10):
+        assert paged.window(start, start + 10).tolist() == expected[start : start + 10]
+    assert paged.rows().tolist() == expected
+    assert paged[0] == expected[0] and paged[-1] == expected[-1]
+
+
+def test_sorting_again_keeps_the_current_order_for_ties():
+    rows = np.arange(6)
+    first = ResultSet(rows).sorted_by(np.array([2.0, 1.0, 2.0, 1.0, 0.0, 0.0]))
+    second = first.sorted_by(np.array([1.0, 1.0, 0.0, 0.0, 1.0, 1.0]))
+    assert second.rows().tolist() == [3, 2, 4, 5, 1, 0]
+
+
+def test_refine_and_keep_preserve_the_lazy_order():
+    rng = np.random.default_rng(3)
+    rows = np.arange(500)
+    key = random_keys(rng, 500, 0.1)
+    result = ResultSet(rows).sorted_by(key)
+    expected = reference(rows, key)
+    refined = result.refine(lambda r: r % 3 == 0)
+    assert refined.window(0, 7).tolist() == [r for r in expected if r % 3 == 0][:7]
+    mask = rng.random(500) < 0.5
+    assert refined.keep(mask).rows().tolist() == [r for r in expected if r % 3 == 0 and mask[r]]
+
+
+def test_out_of_range_index_raises():
+    result = ResultSet(np.arange(3))
+    with pytest.raises(IndexError):
+        result[3]
+    assert result.window(5, 10).tolist() == []
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import threading
+import time
+
+from main import Catalogue
+from server import ChatServer, SessionManager
+from store import PropertyStore
+
+
+def make_server():
+    records = [{"type": "Apartment", "price": 1_000_000 * (i + 1), "area": 100, "city": "Madinaty"} for i in range(3)]
+    return ChatServer(SessionManager(Catalogue(PropertyStore.from_records(["a", "b", "c"], records))))
+
+
+async def ask(port, message):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(message.encode("utf-8") + b"\n")
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply
+
+
+def test_a_slow_command_does_not_block_the_event_loop():
+    chat = make_server()
+    release = threading.Event()
+    handle = chat.manager.handle
+
+    def slow_handle(session_id, message):
+        if message == "slow":
+            release.wait(5)
+        return handle(session_id, message)
+
+    chat.manager.handle = slow_handle
+
+    async def scenario():
+        server = await asyncio.start_server(chat.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            # Only the event loop can release the slow command; were it
+            # blocked, the command would wait out its full timeout instead.
+            asyncio.get_running_loop().call_later(0.05, release.set)
+            started = time.monotonic()
+            reply = await ask(port, json.dumps({"session": "s", "message": "slow"}))
+            assert time.monotonic() - started < 2
+            assert reply["session"] == "s" and "reply" in reply
+            assert "1." in (await ask(port, "list"))["reply"]
+
+    asyncio.run(scenario())
+    chat._commands.shutdown()
+
+
+def test_warm_builds_the_shared_indexes():
+    catalogue = make_server().manager.catalogue
+    catalogue.warm()
+    assert catalogue._valuation is not None and catalogue._similarity is not None
+    assert catalogue.stats.version == catalogue.store.version
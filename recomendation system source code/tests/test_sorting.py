@@ -0,0 +1,120 @@
+import math
+
+import numpy as np
+import pytest
+
+from results import ResultSet
+from sorting import SortOrders, delivery_years, sort_values
+from store import PropertyStore, records_to_columns
+
+DELIVERY = ["Ready to move", "2024", "2026", "within 6 months", "soon", "Unknown"]
+
+
+def random_record(rng):
+    return {
+        "type": "Apartment",
+        "price": float("nan") if rng.random() < 0.1 else float(rng.integers(1, 6)) * 1_000_000,
+        "bedrooms": int(rng.integers(1, 4)),
+        "bathrooms": int(rng.integers(1, 3)),
+        "area": float(rng.choice([0, 100, 150, 200])),
+        "compound": "Eastown",
+        "delivery_date": str(rng.choice(DELIVERY)),
+        "city": "New Cairo",
+    }
+
+
+def random_store(rng, n):
+    store = PropertyStore.from_records([f"k{i}" for i in range(n)], [random_record(rng) for _ in range(n)])
+    store.build_indexes()
+    return store
+
+
+def row_value(store, row, key, computed):
+    if key in computed:
+        return computed[key]()[row]
+    if key == "price_per_m2":
+        area = store.value_at(row, "area")
+        return store.value_at(row, "price") / area if area > 0 else math.nan
+    if key == "delivery":
+        return delivery_years(store.value_at(row, "delivery_date"))
+    return float(store.value_at(row, key))
+
+
+def reference(store, rows, spec, computed):
+    # Unknown (NaN) values last whatever the direction; then the given order.
+    def sort_key(position):
+        row = int(rows[position])
+        parts = []
+        for key, descending in spec:
+            value = row_value(store, row, key, computed)
+            missing = math.isnan(value)
+            parts.append((missing, 0.0 if missing else (-value if descending else value)))
+        return parts, position
+
+    return [int(rows[i]) for i in sorted(range(len(rows)), key=sort_key)]
+
+
+SPECS = [
+    [("price", False)],
+    [("price", True)],
+    [("bedrooms", True), ("price", False)],
+    [("price_per_m2", False), ("area", True)],
+    [("delivery", False), ("bathrooms", True), ("price", True)],
+    [("score", True), ("bedrooms", False)],
+]
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("spec", SPECS, ids=lambda spec: ",".join(f"{k}{'-' if d else '+'}" for k, d in spec))
+def test_sort_matches_sorted(seed, spec):
+    rng = np.random.default_rng(seed)
+    store = random_store(rng, 400)
+    score = rng.integers(0, 5, size=store.n_rows).astype(np.float64)
+    computed = {"score": lambda: score}
+    orders = SortOrders(store, computed=computed)
+    live = store.live_rows()
+    subsets = {
+        "all": live,
+        "large": np.sort(rng.choice(live, size=200, replace=False)),
+        "small": np.sort(rng.choice(live, size=12, replace=False)),
+    }
+    for name, rows in subsets.items():
+        sorted_rows = orders.sort(ResultSet(rows), spec)
+        assert sorted_rows.rows().tolist() == reference(store, rows, spec, computed), name
+        assert sorted_rows.window(0, 5).tolist() == reference(store, rows, spec, computed)[:5], name
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_ties_keep_the_current_order_of_sorted_results(seed):
+    rng = np.random.default_rng(10 + seed)
+    store = random_store(rng, 300)
+    orders = SortOrders(store)
+    for rows in (store.live_rows(), np.sort(rng.choice(store.live_rows(), size=10, replace=False))):
+        by_price = orders.sort(ResultSet(rows), [("price", True)])
+        by_bedrooms = orders.sort(by_price, [("bedrooms", False)])
+        assert by_bedrooms.rows().tolist() == reference(store, by_price.rows(), [("bedrooms", False)], {})
+
+
+def test_orders_follow_store_changes():
+    rng = np.random.default_rng(20)
+    store = random_store(rng, 200)
+    orders = SortOrders(store)
+    spec = [("price", False), ("area", True)]
+    orders.sort(ResultSet(store.live_rows()), spec)
+    store.delete([f"k{i}" for i in range(0, 200, 7)])
+    store.upsert_columns(["k1", "new"], records_to_columns([random_record(rng), random_record(rng)]))
+    rows = store.live_rows()
+    assert orders.sort(ResultSet(rows), spec).rows().tolist() == reference(store, rows, spec, {})
+
+
+def test_ranks_are_dense_and_shared_by_ties():
+    rng = np.random.default_rng(30)
+    store = random_store(rng, 100)
+    spec = [("bedrooms", False), ("price", False)]
+    order, rank = SortOrders(store).order(spec)
+    ranks = rank[order]
+    assert ranks[0] == 0 and np.all(np.diff(ranks) >= 0) and np.all(np.diff(ranks) <= 1)
+    values = [tuple(sort_values(store, key)[row] for key, _ in spec) for row in order]
+    for a, b, ra, rb in zip(values, values[1:], ranks, ranks[1:]):
+        same = all(x == y or (math.isnan(x) and math.isnan(y)) for x, y in zip(a, b))
+        assert (ra == rb) == same
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from main import Catalogue, RealEstateChatbot
+from stats import FACET_FIELDS, CatalogueStats
+from store import PropertyStore, records_to_columns
+
+
+def random_record(rng, cities=("New Cairo", "Sheikh Zayed", "Madinaty")):
+    return {
+        "type": str(rng.choice(["Apartment", "Duplex", "Villa"])),
+        "price": float(rng.integers(1, 60)) * 100_000,
+        "bedrooms": int(rng.integers(1, 5)),
+        "bathrooms": int(rng.integers(1, 4)),
+        "area": float(rng.choice([0, 80, 120, 200, 350])),
+        "furnished": str(rng.choice(["Yes", "No"])),
+        "compound": str(rng.choice(["Eastown", "Gardenia", "Unknown"])),
+        "delivery_term": str(rng.choice(["Finished", "Semi Finished"])),
+        "city": str(rng.choice(cities)),
+    }
+
+
+def assert_same(incremental, fresh):
+    fresh.refresh()
+    for f in FACET_FIELDS:
+        n = len(fresh.counts[f])
+        np.testing.assert_array_equal(incremental.counts[f][:n], fresh.counts[f])
+        assert not incremental.counts[f][n:].any()
+    np.testing.assert_array_equal(incremental.per_m2, fresh.per_m2)
+    assert incremental.summary().format("t") == fresh.summary().format("t")
+    for f in ("city", "compound"):
+        assert incremental.groups(f) == fresh.groups(f)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_updates_equal_a_full_recompute(seed, monkeypatch):
+    rng = np.random.default_rng(seed)
+    n = 300
+    store = PropertyStore.from_records([f"k{i}" for i in range(n)], [random_record(rng) for _ in range(n)])
+    store.build_indexes()
+    stats = CatalogueStats(store)
+    stats.summary()
+    monkeypatch.setattr(stats, "_rebuild", lambda: pytest.fail("rebuilt instead of updating"))
+    next_key = n
+    for round_ in range(6):
+        live = list(store)
+        store.delete(list(rng.choice(live, size=15, replace=False)))
+        live = list(store)
+        updated = list(rng.choice(live, size=20, replace=False))
+        inserted = [f"k{next_key + i}" for i in range(10)]
+        next_key += 10
+        # Later rounds bring a city the first build never saw.
+        cities = ("New Cairo", "Sheikh Zayed", "Madinaty") + (("New Capital City",) if round_ >= 3 else ())
+        records = [random_record(rng, cities) for _ in updated + inserted]
+        store.upsert_columns(updated + inserted, records_to_columns(records))
+        stats.refresh()
+        assert stats.version == store.version
+        assert_same(stats, CatalogueStats(store))
+
+
+def test_deleting_every_listing_empties_the_counts():
+    rng = np.random.default_rng(9)
+    store = PropertyStore.from_records(["a", "b"], [random_record(rng), random_record(rng)])
+    store.build_indexes()
+    stats = CatalogueStats(store)
+    stats.summary()
+    store.delete(["a", "b"])
+    stats.refresh()
+    assert all(not stats.counts[f].any() for f in FACET_FIELDS)
+    assert not stats.per_m2.any()
+
+
+def test_empty_catalogue_has_nothing_to_summarise():
+    bot = RealEstateChatbot(catalogue=Catalogue(PropertyStore()))
+    assert bot.process_input("stats") == "No listings to summarise."
+    assert bot.process_input("stats by city") == "No listings to summarise."
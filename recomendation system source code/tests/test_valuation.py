@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from store import PropertyStore, records_to_columns
+from valuation import BEDROOM_BANDS, LEVELS, MIN_COMPARABLES, NO_COMPOUND, ValuationIndex
+
+COMPOUNDS = ["Eastown", "Gardenia", "Sea View", "Unknown", "Not in Compound"]
+
+
+def random_record(rng):
+    return {
+        "type": str(rng.choice(["Apartment", "Duplex", "Penthouse"], p=[0.6, 0.3, 0.1])),
+        "price": float(rng.integers(10, 40)) * 100_000,
+        "bedrooms": int(rng.integers(1, 6)),
+        "bathrooms": 2,
+        "area": float(rng.choice([0, 100, 125, 160, 200])),
+        "compound": str(rng.choice(COMPOUNDS, p=[0.3, 0.15, 0.05, 0.3, 0.2])),
+        "city": str(rng.choice(["New Cairo", "Sheikh Zayed", "Maadi"], p=[0.6, 0.38, 0.02])),
+    }
+
+
+def random_store(rng, n=500):
+    records = [random_record(rng) for _ in range(n)]
+    # Small cities that can only be valued at the last two levels.
+    fixed = dict(bathrooms=1, area=100, compound="Eastown", price=1_000_000)
+    records += [dict(fixed, city="Rehab City", type="Apartment", bedrooms=b) for b in (1, 2, 3, 4, 5, 6)]
+    records += [dict(fixed, city="Badr City", type=t, bedrooms=2) for t in ("Apartment", "Duplex")]
+    store = PropertyStore.from_records([f"k{i}" for i in range(len(records))], records)
+    store.build_indexes()
+    store.delete([f"k{i}" for i in range(0, n, 9)])
+    store.upsert_columns([f"k{i}" for i in range(1, 40, 4)], records_to_columns([random_record(rng) for _ in range(10)]))
+    return store
+
+
+def expected_valuations(store):
+    """``row -> (level, median, cheaper_than, comparables)`` for every scored listing.
+
+    Each group is written out plainly and summarised with numpy.
+    """
+    attrs = {}
+    for r in map(int, store.live_rows()):
+        p = store.property_at(r)
+        if p.area > 0:
+            band = int(np.searchsorted(BEDROOM_BANDS, p.bedrooms, side="right"))
+            attrs[r] = dict(compound=p.compound, city=p.city, type=p.type, band=band, per_m2=p.price / p.area)
+    expected = {}
+    for row, mine in attrs.items():
+        for level, fields in enumerate(LEVELS):
+            if "compound" in fields and mine["compound"] in NO_COMPOUND:
+                continue
+            group = [r for r, a in attrs.items() if all(a[f] == mine[f] for f in fields)]
+            others = np.array([attrs[r]["per_m2"] for r in group if r != row])
+            if len(others) >= (MIN_COMPARABLES if level < len(LEVELS) - 1 else 1):
+                median = np.median([attrs[r]["per_m2"] for r in group])
+                value = mine["per_m2"]
+                cheaper_than = (np.sum(others > value) + 0.5 * np.sum(others == value)) / len(others)
+                expected[row] = (level, median, cheaper_than, len(others))
+                break
+    return expected
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_every_listing_matches_its_group_computed_with_numpy(seed):
+    rng = np.random.default_rng(seed)
+    store = random_store(rng)
+    index = ValuationIndex(store)
+    expected = expected_valuations(store)
+    levels = set()
+    for row in map(int, store.live_rows()):
+        if row not in expected:
+            assert index.level[row] == -1 and np.isnan(index.deviation[row])
+            continue
+        level, median, cheaper_than, comparables = expected[row]
+        levels.add(level)
+        assert index.level[row] == level
+        assert index.comparables[row] == comparables
+        assert index.median[row] == pytest.approx(median)
+        assert index.cheaper_than[row] == pytest.approx(cheaper_than)
+        assert index.deviation[row] == pytest.approx(index.per_m2[row] / median - 1)
+    # Every fallback level was exercised.
+    assert levels == set(range(len(LEVELS)))
+    assert np.isnan(index.per_m2[~store.alive()[: store.n_rows]]).all()
+
+
+def test_listing_outside_any_compound_is_valued_against_its_city():
+    base = {"type": "Apartment", "bedrooms": 2, "bathrooms": 1, "area": 100, "city": "Maadi"}
+    records = [dict(base, compound="Unknown", price=1_000_000 + 10_000 * i) for i in range(8)]
+    records += [dict(base, compound="Not in Compound", price=2_000_000)]
+    store = PropertyStore.from_records([f"k{i}" for i in range(len(records))], records)
+    index = ValuationIndex(store)
+    # Eight "Unknown" rows would form a large enough compound group; they
+    # are compared with every listing of their kind in the city instead.
+    assert index.level[0] == 1
+    assert index.comparables[0] == 8
+    assert index.median[0] == pytest.approx(np.median([r["price"] / 100 for r in records]))
+    text = index.describe(8, 9)
+    assert "Compared with 8 other 2-bedroom apartments in Maadi:" in text
+    assert "Not in Compound," not in text.splitlines()[1]
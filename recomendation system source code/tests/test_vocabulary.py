@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pytest
+
+from commands import parse_command
+from main import Catalogue, RealEstateChatbot
+from store import PropertyStore, records_to_columns
+from vocabulary import FUZZY_FIELDS, Vocabulary, normalize, similarity
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "properties.csv")
+
+CITIES = ["6th of October", "Madinaty", "New Cairo - El Tagamoa", "New Capital City", "Sheikh Zayed"]
+TYPES = ["Apartment", "Duplex", "Twin House", "Stand Alone Villa"]
+COMPOUNDS = [
+    "2020 Compound",
+    "Not in Compound",
+    "Gardenia",
+    "Continental Gardens",
+    "Trio Gardens",
+    "Garden Hills",
+    "Mountain View iCity",
+    "Beit Al Watan",
+    "Eastown",
+    "Sea View",
+]
+
+
+@pytest.fixture(scope="module")
+def vocabulary():
+    values = {"city": CITIES, "type": TYPES, "compound": COMPOUNDS}
+    n = max(len(v) for v in values.values())
+    records = [{f: values[f][i % len(values[f])] for f in values} for i in range(n)]
+    return Vocabulary(PropertyStore.from_records([f"k{i}" for i in range(n)], records))
+
+
+def resolve(vocabulary, message):
+    return vocabulary.resolve(parse_command(message).phrases)
+
+
+@pytest.mark.parametrize(
+    "message",
+    ["filter ground floor", "apartments with garden", "filter gardens", "show me a view", "filter floor 3"],
+)
+def test_common_words_do_not_restrict_results(vocabulary, message):
+    values, _, _ = resolve(vocabulary, message)
+    assert values == {}
+
+
+@pytest.mark.parametrize(
+    "message, field, expected",
+    [
+        ("filter madinatty", "city", ["Madinaty"]),
+        ("filter apartmnt", "type", ["Apartment"]),
+        ("filter mountain veiw icity", "compound", ["Mountain View iCity"]),
+        ("filter beit el watan", "compound", ["Beit Al Watan"]),
+        ("filter sheikh zayd", "city", ["Sheikh Zayed"]),
+        ("filter twinhouse", "type", ["Twin House"]),
+        ("filter sea view", "compound", ["Sea View"]),
+        ("filter 6th of october", "city", ["6th of October"]),
+        ("filter tagamoa", "city", ["New Cairo - El Tagamoa"]),
+        ("filter new capital city", "city", ["New Capital City"]),
+    ],
+)
+def test_typos_and_city_words_resolve(vocabulary, message, field, expected):
+    values, unmatched, _ = resolve(vocabulary, message)
+    assert values == {field: expected}
+    assert unmatched == []
+
+
+def test_one_good_word_does_not_carry_its_neighbour(vocabulary):
+    values, _, _ = resolve(vocabulary, "filter eastown duplex")
+    assert values == {"compound": ["Eastown"], "type": ["Duplex"]}
+
+
+def test_similarity_is_symmetric_and_counts_transpositions():
+    assert similarity("view", "veiw") == similarity("veiw", "view") == 0.75
+    assert similarity("garden", "gardenia") < 0.8 <= similarity("apartmnt", "apartment")
+
+
+def test_run_spans_filler_and_numbers_in_a_name(vocabulary):
+    values, unmatched, rest = resolve(vocabulary, "filter 2020 compound apartments")
+    assert values == {"compound": ["2020 Compound"]}
+    assert unmatched == []
+    assert rest == [["apartments"]]
+
+
+def test_two_words_of_a_name_select_it(vocabulary):
+    values, _, _ = resolve(vocabulary, "filter continental gardens in zayed")
+    assert values == {"compound": ["Continental Gardens"]}
+    values, _, _ = resolve(vocabulary, "filter mountain view")
+    assert values == {"compound": ["Mountain View iCity"]}
+
+
+@pytest.fixture(scope="module")
+def catalogue():
+    return Catalogue.load(DATA_FILE, use_snapshot=False)
+
+
+def filtered_rows(catalogue, message):
+    bot = RealEstateChatbot(catalogue=catalogue)
+    bot.process_input(message)
+    return set(bot.last_results.rows().tolist())
+
+
+def rows_named(store, name):
+    # A name shared by several fields belongs to the first, as in Vocabulary.lookup.
+    field = next(f for f in FUZZY_FIELDS if name in store.categories(f))
+    codes = [i for i, v in enumerate(store.categories(field)) if normalize(v) == normalize(name)]
+    return set(np.flatnonzero(np.isin(store.column(field), codes) & store.alive()).tolist())
+
+
+def catalogue_names():
+    store = Catalogue.load(DATA_FILE, use_snapshot=False).store
+    return sorted({v for f in FUZZY_FIELDS for v in store.categories(f) if v})
+
+
+@pytest.mark.parametrize("name", catalogue_names())
+def test_every_name_in_the_catalogue_selects_only_its_rows(catalogue, name):
+    assert filtered_rows(catalogue, f"filter {name}") == rows_named(catalogue.store, name)
+
+
+def test_a_compound_added_by_an_update_can_be_selected():
+    catalogue = Catalogue.load(DATA_FILE, use_snapshot=False)
+    record = dict(catalogue.store.property_at(0).to_dict(), compound="Brand New Compound")
+    _, inserted = catalogue.store.upsert_columns(["brand-new-1"], records_to_columns([record]))
+    assert filtered_rows(catalogue, "filter brand new compound") == set(inserted.tolist())
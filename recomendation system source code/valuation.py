@@ -0,0 +1,130 @@
+from typing import Optional
+
+import numpy as np
+
+from similarity import price_per_m2
+from store import PropertyStore
+
+# Upper bedroom counts that start a new band: studio/1, 2, 3, 4+.
+BEDROOM_BANDS = (2, 3, 4)
+BAND_LABELS = ("studio or 1-bedroom", "2-bedroom", "3-bedroom", "4+ bedroom")
+# Comparable groups from most to least specific; "band" is the bedroom band.
+LEVELS = (
+    ("compound", "city", "type", "band"),
+    ("city", "type", "band"),
+    ("city", "type"),
+    ("city",),
+)
+# A group needs this many other listings before it is trusted; the last
+# level accepts any group with at least one.
+MIN_COMPARABLES = 5
+# Compound values that name no actual compound; such listings skip the compound level.
+NO_COMPOUND = ("Unknown", "Not in Compound", "")
+# Deviation from the comparables' median price per m² that counts as a
+# good deal or as overpriced.
+DEAL_THRESHOLD = 0.10
+
+
+class ValuationIndex:
+    """Price per m² of every listing relative to its comparables.
+
+    For each level in ``LEVELS`` the live listings are grouped and every
+    group's prices per m² are kept as one sorted slice of a shared array.
+    Each listing is then placed in its most specific group with enough
+    comparables, and its rank there is found by binary search. Rank,
+    median and deviation are computed for every row at once, so scoring a
+    whole result set is an array lookup. Built for one store version.
+    """
+
+    def __init__(self, store: PropertyStore):
+        self.store = store
+        self.version = store.version
+        n = store.n_rows
+        self.per_m2 = np.full(n, np.nan)
+        self.median = np.full(n, np.nan)
+        self.deviation = np.full(n, np.nan)
+        self.cheaper_than = np.full(n, np.nan)
+        self.comparables = np.zeros(n, dtype=np.int64)
+        self.level = np.full(n, -1, dtype=np.int8)
+
+        rows = store.live_rows()
+        rows = rows[store.column("area")[rows] > 0]
+        if not len(rows):
+            return
+        values = price_per_m2(store, rows)
+        bands = np.searchsorted(BEDROOM_BANDS, store.column("bedrooms")[rows], side="right")
+        # Dense value ranks make (group, value) one exact integer to search on.
+        _, value_rank = np.unique(values, return_inverse=True)
+        value_rank = value_rank.reshape(-1).astype(np.int64)
+        codes = [store.category_code("compound", name) for name in NO_COMPOUND]
+        in_compound = ~np.isin(store.column("compound")[rows], [c for c in codes if c >= 0])
+
+        for i in reversed(range(len(LEVELS))):
+            fields = LEVELS[i]
+            key = np.zeros(len(rows), dtype=np.int64)
+            for field in fields:
+                if field == "band":
+                    key = key * (len(BEDROOM_BANDS) + 1) + bands
+                else:
+                    key = key * max(len(store.categories(field)), 1) + store.column(field)[rows]
+            _, group = np.unique(key, return_inverse=True)
+            group = group.reshape(-1)
+            composite = group * (len(values) + 1) + value_rank
+            order = np.argsort(composite, kind="stable")
+            sizes = np.bincount(group)
+            starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            ordered = values[order]
+            medians = (ordered[starts + (sizes - 1) // 2] + ordered[starts + sizes // 2]) / 2
+
+            # Searching for the keys in sorted order keeps the binary searches cache friendly.
+            composite = composite[order]
+            below = np.empty(len(rows), dtype=np.int64)
+            equal = np.empty(len(rows), dtype=np.int64)
+            below[order] = np.searchsorted(composite, composite, side="left")
+            equal[order] = np.searchsorted(composite, composite, side="right")
+            equal -= below
+            below -= starts[group]
+
+            others = sizes[group] - 1
+            eligible = others >= (MIN_COMPARABLES if i < len(LEVELS) - 1 else 1)
+            if "compound" in fields:
+                eligible &= in_compound
+            chosen = rows[eligible]
+            others = others[eligible]
+            above = sizes[group][eligible] - below[eligible] - equal[eligible]
+            self.level[chosen] = i
+            self.comparables[chosen] = others
+            self.median[chosen] = medians[group][eligible]
+            self.cheaper_than[chosen] = (above + 0.5 * (equal[eligible] - 1)) / others
+        self.per_m2[rows] = values
+        scored = self.level >= 0
+        self.deviation[scored] = self.per_m2[scored] / self.median[scored] - 1
+
+    def describe(self, row: int, number: Optional[int] = None) -> str:
+        store = self.store
+        p = store.property_at(row)
+        label = f"#{number}" if number is not None else p.compound
+        if np.isnan(self.per_m2[row]):
+            return f"{label} has no area on record, so it can't be valued per m²."
+        if self.level[row] < 0:
+            return f"{label}: no comparable listings in {p.city} to value it against."
+        fields = LEVELS[self.level[row]]
+        band = BAND_LABELS[int(np.searchsorted(BEDROOM_BANDS, p.bedrooms, side="right"))]
+        kind = p.type.lower() + "s" if "type" in fields else "listings"
+        what = f"{band} {kind}" if "band" in fields else kind
+        where = f"{p.compound}, {p.city}" if "compound" in fields else p.city
+        deviation = self.deviation[row]
+        if deviation <= -DEAL_THRESHOLD:
+            verdict = "a good deal"
+        elif deviation >= DEAL_THRESHOLD:
+            verdict = "priced above its comparables"
+        else:
+            verdict = "fairly priced"
+        direction = "below" if deviation < 0 else "above"
+        return (
+            f"{label}: {p.compound} | {p.type} | {p.bedrooms}BR | {p.price:,.0f} EGP | {self.per_m2[row]:,.0f} EGP/m²\n"
+            f"Compared with {self.comparables[row]:,} other {what} in {where}:\n"
+            f"Median {self.median[row]:,.0f} EGP/m²; this listing is {abs(deviation):.0%} {direction} it "
+            f"and cheaper per m² than {self.cheaper_than[row]:.0%} of them.\n"
+            f"Verdict: {verdict}."
+        )
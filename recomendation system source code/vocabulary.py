@@ -0,0 +1,195 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from commands import LOCATIONS, STOPWORDS, TYPES, is_content
+from store import PropertyStore
+
+# Fields free text is matched against; on equal scores the earlier one wins.
+FUZZY_FIELDS = ("city", "type", "compound")
+# Candidates need this Dice coefficient over the two trigram sets, and at
+# least MIN_SHARED trigrams in common. Both sides count, so a short word is
+# not a candidate for a longer value that merely contains it ("ground" in
+# "2020 Compound").
+MIN_DICE = 0.5
+MIN_SHARED = 2
+# Candidates are then confirmed by edit similarity (1 - OSA distance / longer
+# length). Typos and transpositions score about 0.85 or more ("apartmnt",
+# "mountain veiw icity"), while a word that is only part of a name stays
+# below ("garden" vs "Gardenia" or "Garden Hills", "eastown duplex" vs "Eastown").
+MIN_SCORE = 0.8
+# Longest run of words tried as one mention ("palm hills new cairo").
+MAX_MENTION_WORDS = 4
+# A mention of this many content words also matches the values it appears in
+# word for word ("palm hills" in "Palm Hills New Cairo"); one word alone is
+# too common to ("view", "gardens").
+MIN_PART_WORDS = 2
+
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+REPEAT_RE = re.compile(r"(.)\1+")
+
+
+def normalize(text: str) -> List[str]:
+    # Doubled letters are the commonest transliteration slip ("madinatty"), so fold them.
+    return [REPEAT_RE.sub(r"\1", word) for word in NON_ALNUM_RE.sub(" ", text.lower()).split()]
+
+
+def trigrams(text: str) -> set:
+    grams = set()
+    for word in normalize(text):
+        padded = f" {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    """1 - optimal string alignment distance / length of the longer string."""
+    if not a or not b:
+        return 0.0
+    before, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            cur.append(cost)
+        before, prev = prev, cur
+    return 1 - prev[-1] / max(len(a), len(b))
+
+
+class TrigramIndex:
+    """Posting lists from character trigram to the distinct values containing it.
+
+    A lookup walks only the postings of the mention's own trigrams, so its
+    cost grows with the mention and the vocabulary, never with the number
+    of listings. Values close enough by Dice coefficient are then scored
+    by edit similarity of the normalised text, so whole matches score 1.0
+    and small typos a little less.
+    """
+
+    def __init__(self, values: Sequence[str]):
+        self.values = list(values)
+        self.texts = [" ".join(normalize(value)) for value in self.values]
+        postings = defaultdict(list)
+        sizes = []
+        for i, value in enumerate(self.values):
+            grams = trigrams(value)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(i)
+        self.sizes = np.asarray(sizes, dtype=np.int32)
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def best(self, text: str) -> Tuple[List[str], float]:
+        """The top-scoring values for ``text`` and their score (0.0 if none qualifies)."""
+        grams = trigrams(text)
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if not hits:
+            return [], 0.0
+        ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+        dice = 2 * shared / (len(grams) + self.sizes[ids])
+        candidates = ids[(shared >= MIN_SHARED) & (dice >= MIN_DICE)]
+        mention = " ".join(normalize(text))
+        scores = [similarity(mention, self.texts[i]) for i in candidates]
+        top = max(scores, default=0.0)
+        if top < MIN_SCORE:
+            return [], 0.0
+        return [self.values[i] for i, score in zip(candidates, scores) if score == top], top
+
+    def containing(self, text: str) -> List[str]:
+        """The values in which ``text`` appears as a run of whole words."""
+        grams = trigrams(text)
+        if not grams or any(g not in self.postings for g in grams):
+            return []
+        ids, shared = np.unique(np.concatenate([self.postings[g] for g in grams]), return_counts=True)
+        mention = f" {' '.join(normalize(text))} "
+        return [self.values[i] for i in ids[shared == len(grams)] if mention in f" {self.texts[i]} "]
+
+
+class Vocabulary:
+    """Trigram indexes over the distinct cities, types and compounds of a store.
+
+    Cities are also known by their distinctive words ("october", "tagamoa",
+    "capital"), since the rest of the name is filler the grammar drops. A
+    single word that matches no whole value falls back to those. Compounds
+    get no such fallback: their words ("garden", "view", "park") are too
+    common to identify one, though two of them in a row may ("palm hills").
+    """
+
+    def __init__(self, store: PropertyStore):
+        self.sizes = {f: len(store.categories(f)) for f in FUZZY_FIELDS}
+        self.indexes = {f: TrigramIndex(store.categories(f)) for f in FUZZY_FIELDS}
+        self.city_words: Dict[str, List[str]] = defaultdict(list)
+        for city in store.categories("city"):
+            for word in normalize(city):
+                if len(word) > 2 and word not in STOPWORDS and not word[0].isdigit() and city not in self.city_words[word]:
+                    self.city_words[word].append(city)
+        self.city_word_index = TrigramIndex(list(self.city_words))
+
+    def current(self, store: PropertyStore) -> bool:
+        # Categories only ever grow, so unchanged sizes mean unchanged values.
+        return all(len(store.categories(f)) == n for f, n in self.sizes.items())
+
+    def lookup(self, words: Sequence[str]) -> Optional[Tuple[str, List[str]]]:
+        """The field and values a run of words names, or None.
+
+        A run that starts or ends with filler or a number must spell a value
+        out in full; otherwise typos are forgiven, and the fallbacks apply.
+        """
+        text = " ".join(words)
+        min_score = MIN_SCORE if is_content(words[0]) and is_content(words[-1]) else 1.0
+        best = None
+        for field in FUZZY_FIELDS:
+            values, score = self.indexes[field].best(text)
+            if values and score >= min_score and (best is None or score > best[2]):
+                best = (field, values, score)
+        if best is not None or min_score == 1.0:
+            return best[:2] if best else None
+        if sum(map(is_content, words)) >= MIN_PART_WORDS:
+            for field in FUZZY_FIELDS:
+                values = self.indexes[field].containing(text)
+                if values:
+                    return field, values
+        elif len(normalize(text)) == 1:
+            matched, _ = self.city_word_index.best(text)
+            if matched:
+                return "city", [city for word in matched for city in self.city_words[word]]
+        return None
+
+    def resolve(
+        self, phrases: Sequence[Sequence[str]]
+    ) -> Tuple[Dict[str, List[str]], List[str], List[List[str]]]:
+        """``(values per field, words that matched nothing, runs left over)``.
+
+        Each run of free words is read left to right as typed, filler and
+        all, taking the longest span of words at each point that matches
+        some value. A known city or type word on its own ("zayed",
+        "apartments") is left over, to be matched as a substring as before.
+        """
+        values: Dict[str, List[str]] = {}
+        unmatched = []
+        rest = []
+        for words in phrases:
+            left = []
+            i = 0
+            while i < len(words):
+                for n in range(min(MAX_MENTION_WORDS, len(words) - i), 0, -1):
+                    span = words[i : i + n]
+                    hit = None if n == 1 and (span[0] in LOCATIONS or span[0] in TYPES) else self.lookup(span)
+                    if hit:
+                        field, matched = hit
+                        values.setdefault(field, []).extend(v for v in matched if v not in values.get(field, ()))
+                        rest.append(left)
+                        left = []
+                        i += n
+                        break
+                else:
+                    if is_content(words[i]) and words[i] not in LOCATIONS and words[i] not in TYPES:
+                        unmatched.append(words[i])
+                    left.append(words[i])
+                    i += 1
+            rest.append(left)
+        return values, unmatched, [r for r in rest if r]